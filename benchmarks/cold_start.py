@@ -0,0 +1,69 @@
+"""
+Cold Start Benchmark
+
+Measures how long a fresh process takes to load datos.sav through SAVReader,
+parsing the SAV file versus restoring the columnar snapshot.
+
+Usage:
+    python benchmarks/cold_start.py [--runs N] [--file PATH]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter so every measurement is a real cold start
+_CHILD_SCRIPT = """
+import sys, time
+sys.path.insert(0, {root!r})
+from services.sav_reader import SAVReader
+reader = SAVReader({file!r}, cache_dir={cache_dir!r}, use_snapshot={use_snapshot!r})
+start = time.perf_counter()
+reader.load_data()
+print(time.perf_counter() - start)
+"""
+
+
+def time_cold_load(file_path: str, cache_dir: str, use_snapshot: bool) -> float:
+    """Load the data in a new process and return the elapsed seconds."""
+    script = _CHILD_SCRIPT.format(
+        root=ROOT, file=file_path, cache_dir=cache_dir, use_snapshot=use_snapshot
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script], check=True, capture_output=True, text=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def summarize(name: str, samples: list) -> None:
+    """Print median and min of the samples in milliseconds."""
+    print(f"{name:<22} median {statistics.median(samples) * 1000:8.1f} ms"
+          f"   min {min(samples) * 1000:8.1f} ms   (n={len(samples)})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--file", default=os.path.join(ROOT, "datos.sav"))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        parse_samples = [time_cold_load(args.file, cache_dir, False) for _ in range(args.runs)]
+
+        # First snapshot-enabled start parses and writes the snapshot
+        first_start = time_cold_load(args.file, cache_dir, True)
+        snapshot_samples = [time_cold_load(args.file, cache_dir, True) for _ in range(args.runs)]
+
+    summarize("parse .sav", parse_samples)
+    summarize("parse + write snapshot", [first_start])
+    summarize("restore snapshot", snapshot_samples)
+    print(f"speedup: {statistics.median(parse_samples) / statistics.median(snapshot_samples):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Encoding Report
+
+Prints the size of every column of datos.sav before and after the compact
+encoding applied by the column store, plus the dataset totals.
+
+The report needs the eager store (the whole file loaded), so it always
+loads the file without SAV_COLUMN_BUDGET_BYTES; a lazy store only reports
+the columns it holds at the time.
+
+Usage:
+    python benchmarks/encoding_report.py [--file PATH] [--all]
+"""
+
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from services.sav_reader import SAVReader  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--file", default=os.path.join(ROOT, "datos.sav"))
+    parser.add_argument("--all", action="store_true", help="list every column, not just a sample")
+    args = parser.parse_args()
+
+    store, _ = SAVReader(args.file, use_snapshot=False).load_data()
+    report = store.encoding_report()
+
+    rows = [
+        row for position, row in enumerate(report)
+        if args.all or position < 5 or row["codificacion"] != "coded"
+    ]
+    print(f"{'columna':<12} {'antes':>10} {'despues':>10}  {'dtype_original':<15} {'dtype':<15} codificacion")
+    for row in rows:
+        print(f"{row['columna']:<12} {row['bytes_antes']:>10} {row['bytes_despues']:>10}  "
+              f"{row['dtype_original']:<15} {row['dtype']:<15} {row['codificacion']}")
+
+    before = sum(row["bytes_antes"] for row in report)
+    after = sum(row["bytes_despues"] for row in report)
+    coded = [row for row in report if row["codificacion"] == "coded"]
+    print(f"\n{len(coded)} coded columns: {sum(r['bytes_antes'] for r in coded)} -> "
+          f"{sum(r['bytes_despues'] for r in coded)} bytes")
+    print(f"total: {before} -> {after} bytes ({before / after:.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    main()
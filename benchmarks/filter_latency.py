@@ -0,0 +1,68 @@
+"""
+Filter Latency Benchmark
+
+Measures the latency of filtered response counts (the work behind
+POST /respuestas/{question_id}/filtros) over a fixed mix of questions and
+filter combinations, reporting p50 and p99.
+
+Usage:
+    python benchmarks/filter_latency.py [--requests N] [--file PATH]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from services.sav_reader import SAVReader  # noqa: E402
+
+QUESTIONS = ["Q_1", "Q_4", "Q_34_O1", "T_Q_12_1", "T_Q_72_3", "Q_95"]
+
+FILTERS = [
+    {"sexo": 2},
+    {"municipio": 3, "nse": 2},
+    {"calidad_vida": 3, "escolaridad": 1},
+    {"sexo": 1, "municipio": 6, "escolaridad": 3, "nse": 3, "calidad_vida": 3},
+    {"edad": {"min": 18, "max": 30}},
+    {"sexo": 2, "edad": {"min": 60}},
+    {"municipio": 2, "nse": 1, "edad": {"min": 30, "max": 45}},
+]
+
+
+def measure(reader: SAVReader, n_requests: int, seed: int = 0) -> np.ndarray:
+    """Run random (question, filters) requests and return their latencies in ms."""
+    rng = random.Random(seed)
+    latencies = []
+    for _ in range(n_requests):
+        question = rng.choice(QUESTIONS)
+        filtros = rng.choice(FILTERS)
+        start = time.perf_counter()
+        reader.get_question_responses_with_filters(question, "cantidad", filtros)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--file", default=os.path.join(ROOT, "datos.sav"))
+    args = parser.parse_args()
+
+    reader = SAVReader(args.file)
+    reader.load_data()
+    measure(reader, 200)
+
+    latencies = measure(reader, args.requests)
+    print(f"{args.requests} requests   p50 {np.percentile(latencies, 50):.3f} ms"
+          f"   p99 {np.percentile(latencies, 99):.3f} ms"
+          f"   mean {latencies.mean():.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
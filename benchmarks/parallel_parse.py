@@ -0,0 +1,81 @@
+"""
+Parallel Parse Benchmark
+
+Measures how the load time of a large SAV file scales with the number of
+parse worker processes. The file is a synthetic copy of datos.sav with its
+rows repeated (50x by default).
+
+Usage:
+    python benchmarks/parallel_parse.py [--scale N] [--workers 1,2,4] [--runs N]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+import pyreadstat
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter so every measurement is a real cold parse
+_CHILD_SCRIPT = """
+import sys, time
+sys.path.insert(0, {root!r})
+from services.sav_reader import SAVReader
+reader = SAVReader({file!r}, use_snapshot=False, parse_workers={workers!r})
+start = time.perf_counter()
+reader.load_data()
+print(time.perf_counter() - start)
+"""
+
+
+def write_scaled_file(source: str, target: str, scale: int) -> int:
+    """Write a copy of the source file with its rows repeated, returning the row count."""
+    df, meta = pyreadstat.read_sav(source)
+    scaled = pd.concat([df] * scale, ignore_index=True)
+    pyreadstat.write_sav(
+        scaled, target,
+        column_labels=meta.column_names_to_labels,
+        variable_value_labels=meta.variable_value_labels,
+    )
+    return len(scaled)
+
+
+def time_cold_load(file_path: str, workers: int) -> float:
+    """Load the data in a new process and return the elapsed seconds."""
+    script = _CHILD_SCRIPT.format(root=ROOT, file=file_path, workers=workers)
+    output = subprocess.run(
+        [sys.executable, "-c", script], check=True, capture_output=True, text=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, default=50)
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--file", default=os.path.join(ROOT, "datos.sav"))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        scaled_file = os.path.join(tmp_dir, f"datos_x{args.scale}.sav")
+        n_rows = write_scaled_file(args.file, scaled_file, args.scale)
+        size_mb = os.path.getsize(scaled_file) / 1e6
+        print(f"{n_rows} rows, {size_mb:.1f} MB, {os.cpu_count()} CPUs")
+
+        baseline = None
+        for workers in [int(w) for w in args.workers.split(",")]:
+            samples = [time_cold_load(scaled_file, workers) for _ in range(args.runs)]
+            median = statistics.median(samples)
+            baseline = baseline or median
+            print(f"{workers:>2} workers   median {median * 1000:8.1f} ms"
+                  f"   min {min(samples) * 1000:8.1f} ms   speedup {baseline / median:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,15 +5,20 @@ This module contains the FastAPI application and all the API route definitions.
 The data reading logic is handled by the services.sav_reader module.
 """
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from enum import Enum
 import os
+import threading
+import time
 
-from services.sav_reader import SAVReader, SAVReaderError, QuestionNotFoundError, CategoryNotFoundError
-
-app = FastAPI()
+from services.sav_reader import (
+    SAVReader, SAVReaderError, QuestionNotFoundError, CategoryNotFoundError, InvalidFilterError,
+    InvalidVariableError, UnsupportedInModeError
+)
 
 
 class RangoEdad(BaseModel):
@@ -34,6 +39,8 @@ class FiltrosRequest(BaseModel):
         edad: Age filter - can be a range with min/max
         escolaridad: Education level (1="Sec<", 2="Prep", 3="Univ+")
         nse: Socioeconomic level (1="D+/D/E", 2="C/C-", 3="A/B/C+", 4="SIN DATOS SUFICIENTES")
+        expresion: Filter expression over any variable, combined with the
+            filters above (see services.filters)
     """
     calidad_vida: Optional[int] = None
     municipio: Optional[int] = None
@@ -41,12 +48,130 @@ class FiltrosRequest(BaseModel):
     edad: Optional[RangoEdad] = None
     escolaridad: Optional[int] = None
     nse: Optional[int] = None
+    expresion: Optional[Dict[str, Any]] = None
+    
+    def to_dict(self) -> dict:
+        """Convert to the filter dict of SAVReader, without unset filters."""
+        # Convert Pydantic model to dict, excluding None values
+        filtros_dict = self.model_dump(exclude_none=True)
+        
+        # Handle nested edad model
+        if "edad" in filtros_dict and isinstance(filtros_dict["edad"], dict):
+            # Remove empty edad dict if both min and max are None
+            if not filtros_dict["edad"]:
+                del filtros_dict["edad"]
+        
+        return filtros_dict
+
+
+class BatchRequest(BaseModel):
+    """
+    Model for batch response request body.
+    
+    Attributes:
+        preguntas: Question identifiers (e.g., ["Q_1", "T_Q_12_1"])
+        filtros: Filters applied to every question
+    """
+    preguntas: List[str]
+    filtros: FiltrosRequest = FiltrosRequest()
+
+
+class CrosstabRequest(BaseModel):
+    """
+    Model for crosstab request body.
+    
+    Attributes:
+        var1: Variable along the rows (e.g., "SEXO")
+        var2: Variable along the columns (e.g., "Q_1")
+        weight: Optional numeric variable summed instead of counting
+            respondents (e.g., "FACTOR")
+        filtros: Filters applied before crossing
+    """
+    var1: str
+    var2: str
+    weight: Optional[str] = None
+    filtros: FiltrosRequest = FiltrosRequest()
+
 
 # Path to the data file
 DATA_FILE_PATH = os.path.join(os.path.dirname(__file__), "datos.sav")
 
+# Optional byte budget for loading columns on demand (unset = load the whole file)
+COLUMN_BUDGET_BYTES = (
+    int(os.environ["SAV_COLUMN_BUDGET_BYTES"]) if os.environ.get("SAV_COLUMN_BUDGET_BYTES") else None
+)
+
+# Stream the file and answer from precomputed aggregates instead of row data
+STREAMING = os.environ.get("SAV_STREAMING", "0") == "1"
+
+# Memory budget of the response result cache
+RESULT_CACHE_BYTES = int(os.environ.get("SAV_RESULT_CACHE_BYTES", str(16 * 1024 * 1024)))
+
+# Processes used to parse the data file (1 = parse in the server process)
+PARSE_WORKERS = int(os.environ.get("SAV_PARSE_WORKERS", "1"))
+
+# Processes that share large exhaustive TURF searches (1 = search in the server process)
+TURF_WORKERS = int(os.environ.get("SAV_TURF_WORKERS", "1"))
+
+# Seconds between checks for a replaced data file (0 disables hot reload)
+RELOAD_INTERVAL_SECONDS = float(os.environ.get("SAV_RELOAD_INTERVAL_SECONDS", "5"))
+
 # Initialize the SAV reader service
-sav_reader = SAVReader(DATA_FILE_PATH)
+sav_reader = SAVReader(
+    DATA_FILE_PATH, column_budget_bytes=COLUMN_BUDGET_BYTES, streaming=STREAMING,
+    parse_workers=PARSE_WORKERS, turf_workers=TURF_WORKERS,
+    result_cache_bytes=RESULT_CACHE_BYTES
+)
+
+# Progress of the startup warmup, reported by /ready
+warmup_state = {"listo": False, "fases": {}, "total_ms": None, "error": None}
+
+
+def run_warmup():
+    """Load the data and build the question catalog, recording each phase's duration."""
+    start = time.perf_counter()
+    try:
+        sav_reader.warmup(warmup_state["fases"])
+    except SAVReaderError as e:
+        warmup_state["error"] = str(e)
+        return
+    warmup_state["total_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    warmup_state["listo"] = True
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start the warmup in the background so the server accepts connections right
+    away, and watch the data file for replacements while the app runs. On
+    shutdown, stop the watcher and the TURF worker processes.
+    """
+    threading.Thread(target=run_warmup, name="sav-warmup", daemon=True).start()
+    if RELOAD_INTERVAL_SECONDS > 0:
+        sav_reader.start_watching(RELOAD_INTERVAL_SECONDS)
+    yield
+    sav_reader.stop_watching()
+    sav_reader.shutdown_workers()
+
+
+# Held while a reload requested through POST /recargar runs
+reload_lock = threading.Lock()
+
+
+def run_reload():
+    """
+    Reload the data file if it changed, keeping the current data if the new
+    file cannot be read. Releases reload_lock when done.
+    """
+    try:
+        sav_reader.reload(if_changed=True)
+    except SAVReaderError:
+        pass
+    finally:
+        reload_lock.release()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 class TipoRespuesta(str, Enum):
@@ -59,6 +184,72 @@ def welcome():
     return {"message": "Bienvenido a la API"}
 
 
+@app.get("/ready")
+def get_ready():
+    """
+    Readiness endpoint for the load balancer.
+    
+    Returns 503 until the startup warmup has loaded the data and built the
+    question catalog, then 200.
+    
+    Returns:
+    - listo: Whether the warmup finished
+    - fases: Duration in milliseconds of each completed warmup phase
+    - total_ms: Total warmup duration in milliseconds, once finished
+    - error: Error message if the warmup failed
+    """
+    return JSONResponse(
+        status_code=200 if warmup_state["listo"] else 503,
+        content={
+            "listo": warmup_state["listo"],
+            "fases": dict(warmup_state["fases"]),
+            "total_ms": warmup_state["total_ms"],
+            "error": warmup_state["error"],
+        }
+    )
+
+
+@app.post("/recargar", status_code=202)
+def recargar():
+    """
+    Endpoint that reloads datos.sav in the background.
+    
+    Requests keep being answered from the current data until the new data
+    is ready and swapped in. The data is not rebuilt if the file has the
+    same contents as the loaded one. Only one reload runs at a time: while
+    one is running, the request is rejected with 409. Replacing the file is
+    also detected automatically every SAV_RELOAD_INTERVAL_SECONDS.
+    
+    Returns:
+    - recargando: True once the reload has been started
+    """
+    if not reload_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="Ya hay una recarga en curso")
+    try:
+        threading.Thread(target=run_reload, name="sav-reload", daemon=True).start()
+    except RuntimeError:
+        reload_lock.release()
+        raise
+    return {"recargando": True}
+
+
+@app.get("/cache")
+def get_cache():
+    """
+    Endpoint that returns the cache counters of the SAV reader.
+    
+    Returns:
+    - columnas: Hit, miss and eviction counters of the on-demand column cache,
+      or null if columns are not loaded on demand
+    - resultados: Hit, miss and eviction counters and hit ratio of the
+      response result cache, or null before the data is loaded
+    """
+    return {
+        "columnas": sav_reader.get_column_cache_stats(),
+        "resultados": sav_reader.get_result_cache_stats(),
+    }
+
+
 @app.get("/preguntas")
 def get_preguntas():
     """
@@ -121,12 +312,94 @@ def get_preguntas_por_categoria(categoria_id: int):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/respuestas/batch")
+def get_respuestas_batch(
+    request: BatchRequest,
+    tipo: TipoRespuesta = Query(
+        default=TipoRespuesta.cantidad,
+        description="Tipo de respuesta: 'cantidad' para conteo o 'porcentaje' para porcentaje"
+    ),
+    ponderado: bool = Query(
+        default=False,
+        description="Si es true, suma el factor de expansión (FACTOR) en lugar de contar"
+    )
+):
+    """
+    Endpoint that returns the responses for several questions under one set of filters.
+    
+    The filters are evaluated once and all the frequency tables are computed
+    together, so a dashboard needs one request instead of one per question.
+    
+    Parameters:
+    - tipo: Type of response - 'cantidad' (count) or 'porcentaje' (percentage)
+    - ponderado: If true, responses are weighted by the expansion factor
+      (FACTOR) and cantidad is the weighted total of each answer
+    - request: JSON body with "preguntas" (list of question identifiers) and
+      optional "filtros" (same options as /respuestas/{question_id}/filtros)
+    
+    Returns:
+    - tipo_respuesta: The type of response (cantidad or porcentaje)
+    - preguntas: The response of every question, as in /respuestas/{question_id}
+    - filtros_aplicados: Dictionary of filters that were applied
+    """
+    try:
+        return sav_reader.get_batch_responses(
+            request.preguntas, tipo.value, request.filtros.to_dict(), ponderado
+        )
+    except QuestionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except (InvalidFilterError, InvalidVariableError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UnsupportedInModeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except SAVReaderError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/crosstab")
+def get_crosstab(request: CrosstabRequest):
+    """
+    Endpoint that returns the contingency table between two variables.
+    
+    Parameters:
+    - request: JSON body with "var1", "var2", optional "weight" (e.g. "FACTOR")
+      and optional "filtros" (same options as /respuestas/{question_id}/filtros)
+    
+    Returns:
+    - var1, var2: Identifier and text of each variable
+    - ponderacion: The weight variable, or null
+    - filas, columnas: Values and labels of var1 and var2 present in the data
+    - cantidades: Count (or weighted sum) of every row x column cell
+    - porcentaje_fila, porcentaje_columna: Percentages of every cell over its
+      row and column totals
+    - total_filas, total_columnas, total: Row, column and grand totals
+    - chartType, chartData: The table as a stackedBar chart
+    - filtros_aplicados: Dictionary of filters that were applied
+    """
+    try:
+        return sav_reader.get_crosstab(
+            request.var1, request.var2, request.weight, request.filtros.to_dict()
+        )
+    except QuestionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except (InvalidFilterError, InvalidVariableError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UnsupportedInModeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except SAVReaderError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/respuestas/{question_id}")
 def get_respuestas(
     question_id: str,
     tipo: TipoRespuesta = Query(
         default=TipoRespuesta.cantidad,
         description="Tipo de respuesta: 'cantidad' para conteo o 'porcentaje' para porcentaje"
+    ),
+    ponderado: bool = Query(
+        default=False,
+        description="Si es true, suma el factor de expansión (FACTOR) en lugar de contar"
     )
 ):
     """
@@ -135,6 +408,8 @@ def get_respuestas(
     Parameters:
     - question_id: The question identifier (e.g., Q_1, T_Q_12_1)
     - tipo: Type of response - 'cantidad' (count) or 'porcentaje' (percentage)
+    - ponderado: If true, responses are weighted by the expansion factor
+      (FACTOR) and cantidad is the weighted total of each answer
     
     Returns:
     - identificador: The question identifier
@@ -142,11 +417,16 @@ def get_respuestas(
     - tipo_respuesta: The type of response (cantidad or porcentaje)
     - respuestas: List of responses with value, label, and count/percentage
     - total_respuestas: Total number of valid responses (excludes NaN values)
+    - ponderacion: The weight variable, only when ponderado is true
     """
     try:
-        return sav_reader.get_question_responses(question_id, tipo.value)
+        return sav_reader.get_question_responses(question_id, tipo.value, ponderado)
     except QuestionNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except InvalidVariableError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UnsupportedInModeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except SAVReaderError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -158,6 +438,10 @@ def get_respuestas_con_filtros(
     tipo: TipoRespuesta = Query(
         default=TipoRespuesta.cantidad,
         description="Tipo de respuesta: 'cantidad' para conteo o 'porcentaje' para porcentaje"
+    ),
+    ponderado: bool = Query(
+        default=False,
+        description="Si es true, suma el factor de expansión (FACTOR) en lugar de contar"
     )
 ):
     """
@@ -166,6 +450,8 @@ def get_respuestas_con_filtros(
     Parameters:
     - question_id: The question identifier (e.g., Q_1, T_Q_12_1)
     - tipo: Type of response - 'cantidad' (count) or 'porcentaje' (percentage)
+    - ponderado: If true, responses are weighted by the expansion factor
+      (FACTOR) and cantidad is the weighted total of each answer
     - filtros: JSON body with filter criteria
     
     Filter options (all optional):
@@ -176,6 +462,13 @@ def get_respuestas_con_filtros(
     - edad: {"min": 18, "max": 35} - Filter by actual age range
     - escolaridad: 1 (Sec<), 2 (Prep), 3 (Univ+)
     - nse: 1 (D+/D/E), 2 (C/C-), 3 (A/B/C+), 4 (SIN DATOS SUFICIENTES)
+    - expresion: Filter expression over any variable, e.g.
+      {"y": [{"variable": "Q_1", "valores": [4, 5]},
+             {"no": {"variable": "Q_75", "min": 60}},
+             {"o": [{"variable": "SEXO", "valores": [1]},
+                    {"variable": "Q_94", "valores": [2, 6]}]}]}
+      Conditions: {"variable", "valores": [...]} or {"variable", "min", "max"};
+      groups: {"y": [...]}, {"o": [...]}, {"no": ...}
     
     Returns:
     - identificador: The question identifier
@@ -183,22 +476,441 @@ def get_respuestas_con_filtros(
     - tipo_respuesta: The type of response (cantidad or porcentaje)
     - respuestas: List of responses with value, label, and count/percentage
     - total_respuestas: Total number of valid responses after filtering
+    - ponderacion: The weight variable, only when ponderado is true
     - filtros_aplicados: Dictionary of filters that were applied
     """
     try:
-        # Convert Pydantic model to dict, excluding None values
-        filtros_dict = filtros.model_dump(exclude_none=True)
-        
-        # Handle nested edad model
-        if "edad" in filtros_dict and isinstance(filtros_dict["edad"], dict):
-            # Remove empty edad dict if both min and max are None
-            if not filtros_dict["edad"]:
-                del filtros_dict["edad"]
-        
         return sav_reader.get_question_responses_with_filters(
-            question_id, tipo.value, filtros_dict
+            question_id, tipo.value, filtros.to_dict(), ponderado
+        )
+    except QuestionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except (InvalidFilterError, InvalidVariableError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UnsupportedInModeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except SAVReaderError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/estadisticas/{question_id}")
+def get_estadisticas(
+    question_id: str,
+    ponderado: bool = Query(
+        default=False,
+        description="Si es true, pondera a los encuestados por el factor de expansión (FACTOR)"
+    )
+):
+    """
+    Endpoint that returns the descriptive statistics of a numeric question.
+    
+    Parameters:
+    - question_id: The question identifier (e.g., Q_75, Q_1)
+    - ponderado: If true, respondents are weighted by the expansion factor (FACTOR)
+    
+    Returns:
+    - identificador: The question identifier
+    - pregunta: The question text
+    - total_respuestas: Number of valid responses (weighted total if ponderado)
+    - media, mediana, moda, min, max, rango, desviacion_std: Statistics of
+      the answer values (null when undefined, e.g. without responses)
+    - ponderacion: The weight variable, only when ponderado is true
+    - filtros_aplicados: Dictionary of filters that were applied (empty)
+    """
+    try:
+        return sav_reader.get_statistics(question_id, ponderado=ponderado)
+    except QuestionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except InvalidVariableError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UnsupportedInModeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except SAVReaderError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/estadisticas/{question_id}")
+def get_estadisticas_con_filtros(
+    question_id: str,
+    filtros: FiltrosRequest,
+    ponderado: bool = Query(
+        default=False,
+        description="Si es true, pondera a los encuestados por el factor de expansión (FACTOR)"
+    )
+):
+    """
+    Endpoint that returns the descriptive statistics of a numeric question
+    with filters applied.
+    
+    Parameters:
+    - question_id: The question identifier (e.g., Q_75, Q_1)
+    - ponderado: If true, respondents are weighted by the expansion factor (FACTOR)
+    - filtros: JSON body with filter criteria (same options as
+      /respuestas/{question_id}/filtros)
+    
+    Returns:
+    - Same fields as GET /estadisticas/{question_id}, over the filtered
+      respondents, with the filters that were applied
+    """
+    try:
+        return sav_reader.get_statistics(question_id, filtros.to_dict(), ponderado)
+    except QuestionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except (InvalidFilterError, InvalidVariableError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UnsupportedInModeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except SAVReaderError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/multirespuesta")
+def get_conjuntos_multirespuesta():
+    """
+    Endpoint that returns the multiple-response questions detected in datos.sav.
+    
+    Returns for each set:
+    - identificador: The set identifier (e.g., Q_34)
+    - pregunta: The question text
+    - columnas: The mention columns of the set (e.g., Q_34_O1 ... Q_34_O14)
+    """
+    try:
+        return {"conjuntos": sav_reader.get_multi_response_sets()}
+    except SAVReaderError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/multirespuesta/{base_id}")
+def get_multirespuesta(
+    base_id: str,
+    ponderado: bool = Query(
+        default=False,
+        description="Si es true, suma el factor de expansión (FACTOR) en lugar de contar"
+    )
+):
+    """
+    Endpoint that returns the option frequencies of a multiple-response question.
+    
+    Parameters:
+    - base_id: The set identifier (e.g., Q_23, Q_34, Q_46, Q_67)
+    - ponderado: If true, respondents are weighted by the expansion factor (FACTOR)
+    
+    Returns:
+    - identificador, pregunta, columnas: The set info
+    - opciones: For every option its value, label, selecciones (respondents
+      who named it), porcentaje_encuestados (over respondents who named any
+      option) and porcentaje_menciones (over all mentions)
+    - total_encuestados: Respondents who named any option
+    - total_menciones: Total number of mentions
+    - ponderacion: The weight variable, only when ponderado is true
+    - filtros_aplicados: Dictionary of filters that were applied (empty)
+    """
+    try:
+        return sav_reader.get_multi_response(base_id, ponderado=ponderado)
+    except QuestionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except InvalidVariableError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UnsupportedInModeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except SAVReaderError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/multirespuesta/{base_id}")
+def get_multirespuesta_con_filtros(
+    base_id: str,
+    filtros: FiltrosRequest,
+    ponderado: bool = Query(
+        default=False,
+        description="Si es true, suma el factor de expansión (FACTOR) en lugar de contar"
+    )
+):
+    """
+    Endpoint that returns the option frequencies of a multiple-response
+    question with filters applied.
+    
+    Parameters:
+    - base_id: The set identifier (e.g., Q_34)
+    - ponderado: If true, respondents are weighted by the expansion factor (FACTOR)
+    - filtros: JSON body with filter criteria (same options as
+      /respuestas/{question_id}/filtros)
+    
+    Returns:
+    - Same fields as GET /multirespuesta/{base_id}, over the filtered
+      respondents, with the filters that were applied
+    """
+    try:
+        return sav_reader.get_multi_response(base_id, filtros.to_dict(), ponderado)
+    except QuestionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except (InvalidFilterError, InvalidVariableError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UnsupportedInModeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except SAVReaderError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/multirespuesta/{base_id}/coocurrencia")
+def get_coocurrencia_multirespuesta(
+    base_id: str,
+    ponderado: bool = Query(
+        default=False,
+        description="Si es true, suma el factor de expansión (FACTOR) en lugar de contar"
+    )
+):
+    """
+    Endpoint that returns which options of a multiple-response question are
+    chosen together.
+    
+    Parameters:
+    - base_id: The question identifier (e.g., Q_34, Q_67)
+    - ponderado: If true, respondents are weighted by the expansion factor (FACTOR)
+    
+    Returns:
+    - identificador, pregunta: The question identifier and text
+    - opciones: Value, label and selections of every option
+    - coocurrencias: Option x option matrix of respondents who named both
+      options (the diagonal holds the selections)
+    - lift: Option x option matrix of P(both) / (P(one) * P(other)); above 1
+      the options are named together more often than by chance, null when
+      an option has no selections
+    - total_encuestados: Respondents who named any option
+    - chartType, chartData: Heatmap of the co-occurrences
+    - ponderacion: The weight variable, only when ponderado is true
+    - filtros_aplicados: Dictionary of filters that were applied (empty)
+    """
+    try:
+        return sav_reader.get_multi_response_cooccurrence(base_id, ponderado=ponderado)
+    except QuestionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except InvalidVariableError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UnsupportedInModeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except SAVReaderError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/multirespuesta/{base_id}/coocurrencia")
+def get_coocurrencia_multirespuesta_con_filtros(
+    base_id: str,
+    filtros: FiltrosRequest,
+    ponderado: bool = Query(
+        default=False,
+        description="Si es true, suma el factor de expansión (FACTOR) en lugar de contar"
+    )
+):
+    """
+    Endpoint that returns the option co-occurrences of a multiple-response
+    question with filters applied.
+    
+    Parameters:
+    - base_id: The question identifier (e.g., Q_34, Q_67)
+    - ponderado: If true, respondents are weighted by the expansion factor (FACTOR)
+    - filtros: JSON body with filter criteria (same options as
+      /respuestas/{question_id}/filtros)
+    
+    Returns:
+    - Same fields as GET /multirespuesta/{base_id}/coocurrencia, over the
+      filtered respondents, with the filters that were applied
+    """
+    try:
+        return sav_reader.get_multi_response_cooccurrence(base_id, filtros.to_dict(), ponderado)
+    except QuestionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except (InvalidFilterError, InvalidVariableError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UnsupportedInModeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except SAVReaderError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/multirespuesta/{base_id}/turf")
+def get_turf_multirespuesta(
+    base_id: str,
+    k: int = Query(default=3, ge=1, description="Número de opciones por combinación"),
+    top: int = Query(default=10, ge=1, le=100, description="Número de combinaciones a devolver"),
+    ponderado: bool = Query(
+        default=False,
+        description="Si es true, suma el factor de expansión (FACTOR) en lugar de contar"
+    ),
+    excluir: Optional[List[float]] = Query(
+        default=None,
+        description="Valores de opciones que no entran en las combinaciones (repetible)"
+    )
+):
+    """
+    Endpoint that returns the TURF (Total Unduplicated Reach and Frequency)
+    analysis of a multiple-response question: the combinations of k options
+    that reach the most respondents.
+    
+    Parameters:
+    - base_id: The question identifier (e.g., Q_34)
+    - k: Options per combination (default 3)
+    - top: Number of combinations returned (default 10)
+    - ponderado: If true, respondents are weighted by the expansion factor (FACTOR)
+    - excluir: Option values left out of the combinations (e.g.
+      ?excluir=1&excluir=3). "Ninguna de las anteriores" and "No sabe/No
+      contestó" are always left out.
+    
+    Returns:
+    - identificador, pregunta: The question identifier and text
+    - k: Options per combination
+    - metodo: "exhaustiva" if every combination was evaluated, "voraz" if
+      the options were added greedily (too many combinations)
+    - excluidas: Options left out of the combinations
+    - combinaciones: Best combinations first, each with its opciones,
+      alcance (respondents who named at least one of them),
+      porcentaje_alcance, frecuencia (selections of its options) and
+      frecuencia_promedio (frecuencia / alcance)
+    - total_encuestados: Respondents who named any option
+    - ponderacion: The weight variable, only when ponderado is true
+    - filtros_aplicados: Dictionary of filters that were applied (empty)
+    """
+    try:
+        return sav_reader.get_multi_response_turf(
+            base_id, k, top, ponderado=ponderado, excluir=excluir
         )
     except QuestionNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except InvalidVariableError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UnsupportedInModeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except SAVReaderError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/multirespuesta/{base_id}/turf")
+def get_turf_multirespuesta_con_filtros(
+    base_id: str,
+    filtros: FiltrosRequest,
+    k: int = Query(default=3, ge=1, description="Número de opciones por combinación"),
+    top: int = Query(default=10, ge=1, le=100, description="Número de combinaciones a devolver"),
+    ponderado: bool = Query(
+        default=False,
+        description="Si es true, suma el factor de expansión (FACTOR) en lugar de contar"
+    ),
+    excluir: Optional[List[float]] = Query(
+        default=None,
+        description="Valores de opciones que no entran en las combinaciones (repetible)"
+    )
+):
+    """
+    Endpoint that returns the TURF analysis of a multiple-response question
+    with filters applied.
+    
+    Parameters:
+    - base_id: The question identifier (e.g., Q_34)
+    - k, top, ponderado, excluir: As in GET /multirespuesta/{base_id}/turf
+    - filtros: JSON body with filter criteria (same options as
+      /respuestas/{question_id}/filtros)
+    
+    Returns:
+    - Same fields as GET /multirespuesta/{base_id}/turf, over the filtered
+      respondents, with the filters that were applied
+    """
+    try:
+        return sav_reader.get_multi_response_turf(
+            base_id, k, top, filtros.to_dict(), ponderado, excluir
+        )
+    except QuestionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except (InvalidFilterError, InvalidVariableError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UnsupportedInModeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except SAVReaderError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/baterias")
+def get_baterias():
+    """
+    Endpoint that returns the rating batteries detected in datos.sav.
+    
+    Returns for each battery:
+    - identificador: The battery identifier (e.g., T_Q_25)
+    - pregunta: The question text shared by its items
+    - columnas: The item columns of the battery (e.g., T_Q_25_1 ... T_Q_25_6)
+    """
+    try:
+        return {"baterias": sav_reader.get_batteries()}
+    except SAVReaderError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/baterias/{base_id}")
+def get_bateria(
+    base_id: str,
+    ponderado: bool = Query(
+        default=False,
+        description="Si es true, suma el factor de expansión (FACTOR) en lugar de contar"
+    )
+):
+    """
+    Endpoint that returns the item x scale-point matrix of a rating battery.
+    
+    Parameters:
+    - base_id: The battery identifier (e.g., T_Q_25, T_Q_63, T_Q_72)
+    - ponderado: If true, respondents are weighted by the expansion factor (FACTOR)
+    
+    Returns:
+    - identificador, pregunta: The battery identifier and shared question text
+    - items: Identifier and label of every item
+    - escala: Values and labels of the shared scale
+    - cantidades: Count (or weighted sum) of every item x scale point
+    - porcentajes: Percentages of every scale point within each item
+    - total_items: Number of answers of every item
+    - graficas: "heatmap" (percentages) and "stackedBar" (counts) charts
+    - ponderacion: The weight variable, only when ponderado is true
+    - filtros_aplicados: Dictionary of filters that were applied (empty)
+    """
+    try:
+        return sav_reader.get_battery(base_id, ponderado=ponderado)
+    except QuestionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except InvalidVariableError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UnsupportedInModeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except SAVReaderError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/baterias/{base_id}")
+def get_bateria_con_filtros(
+    base_id: str,
+    filtros: FiltrosRequest,
+    ponderado: bool = Query(
+        default=False,
+        description="Si es true, suma el factor de expansión (FACTOR) en lugar de contar"
+    )
+):
+    """
+    Endpoint that returns the item x scale-point matrix of a rating battery
+    with filters applied.
+    
+    Parameters:
+    - base_id: The battery identifier (e.g., T_Q_25)
+    - ponderado: If true, respondents are weighted by the expansion factor (FACTOR)
+    - filtros: JSON body with filter criteria (same options as
+      /respuestas/{question_id}/filtros)
+    
+    Returns:
+    - Same fields as GET /baterias/{base_id}, over the filtered respondents,
+      with the filters that were applied
+    """
+    try:
+        return sav_reader.get_battery(base_id, filtros.to_dict(), ponderado)
+    except QuestionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except (InvalidFilterError, InvalidVariableError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UnsupportedInModeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except SAVReaderError as e:
         raise HTTPException(status_code=500, detail=str(e))
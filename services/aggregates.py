@@ -0,0 +1,447 @@
+"""
+Aggregates Module
+
+This module computes survey aggregates in a single streaming pass over a SAV
+file, for waves too large to hold the microdata in memory.
+
+Rows are grouped into segments: the distinct combinations of the filter
+variables (calidad de vida, municipio, sexo, escolaridad, NSE and age). For
+every question the pass keeps the response count and the sum of expansion
+weights per (segment, answer value). A filtered frequency table is then the
+sum over the segments that match the filters, so it never touches row data.
+
+Persisted aggregates are published like column snapshots (see
+services.column_store): each version is a directory named after the
+source file's contents, and a pointer file swapped atomically names the
+current one.
+"""
+
+import json
+import os
+import pickle
+import shutil
+import tempfile
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from services.column_store import (
+    file_fingerprint, publish_version, rename_version, resolve_pointer, source_matches,
+    version_name
+)
+
+
+# Bump when the on-disk layout changes so stale aggregates are ignored
+AGGREGATES_FORMAT_VERSION = 2
+
+MANIFEST_FILE = "manifest.json"
+AGGREGATES_FILE = "aggregates.pkl"
+
+# Value of a segment dimension that is missing or not an integer in int16 range
+SEGMENT_MISSING = np.iinfo(np.int16).min
+
+# Questions with more distinct answers than this (ids, free text, timestamps)
+# are not aggregated: their tables would be as large as the microdata
+MAX_AGGREGATE_VALUES = 1000
+
+# Number of partial tables kept per question before they are merged
+_MERGE_EVERY = 8
+
+# Bits reserved for the value index in the combined (segment, value) key
+_VALUE_BITS = 20
+
+
+class QuestionAggregate:
+    """Response counts and weight sums of one question per (segment, value)."""
+
+    __slots__ = ("values", "segments", "value_index", "counts", "weights")
+
+    def __init__(
+        self, values: np.ndarray, segments: np.ndarray, value_index: np.ndarray,
+        counts: np.ndarray, weights: np.ndarray
+    ):
+        """
+        Initialize the aggregate.
+
+        Args:
+            values: Distinct answer values, sorted
+            segments: Segment id of each entry
+            value_index: Position in ``values`` of each entry
+            counts: Number of respondents of each entry
+            weights: Sum of expansion weights of each entry
+        """
+        self.values = values
+        self.segments = segments
+        self.value_index = value_index
+        self.counts = counts
+        self.weights = weights
+
+    def frequencies(
+        self, segment_mask: Optional[np.ndarray] = None, weighted: bool = False
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Compute the frequency table over the selected segments.
+
+        Args:
+            segment_mask: Boolean mask over segment ids, or None for all
+            weighted: Whether to sum expansion weights instead of counting
+
+        Returns:
+            Tuple of (values, totals) for the values present, sorted by value
+        """
+        entries = self.counts if not weighted else self.weights
+        value_index = self.value_index
+        if segment_mask is not None:
+            selected = segment_mask[self.segments]
+            entries = entries[selected]
+            value_index = value_index[selected]
+
+        totals = np.bincount(value_index, weights=entries, minlength=len(self.values))
+        present = np.flatnonzero(np.bincount(value_index, minlength=len(self.values)))
+        if not weighted:
+            totals = totals.astype(np.int64)
+        return self.values[present], totals[present]
+
+
+class SurveyAggregates:
+    """Per-question aggregates over the filter segments of a survey."""
+
+    def __init__(
+        self, dimensions: Sequence[str], segments: np.ndarray,
+        segment_counts: np.ndarray, segment_weights: np.ndarray,
+        questions: Dict[str, QuestionAggregate], n_rows: int
+    ):
+        """
+        Initialize the aggregates.
+
+        Args:
+            dimensions: Filter column names, one per segment dimension
+            segments: int16 array (n_segments x n_dimensions) with the value of
+                every dimension in every segment, SEGMENT_MISSING if missing
+            segment_counts: Number of rows in every segment
+            segment_weights: Sum of expansion weights in every segment
+            questions: Aggregate of every aggregated question
+            n_rows: Number of rows in the file
+        """
+        self.dimensions = tuple(dimensions)
+        self.segments = segments
+        self.segment_counts = segment_counts
+        self.segment_weights = segment_weights
+        self.questions = questions
+        self.n_rows = n_rows
+
+    def segment_mask(
+        self, equals: Optional[Dict[str, Any]] = None,
+        ranges: Optional[Dict[str, Tuple[Any, Any]]] = None
+    ) -> np.ndarray:
+        """
+        Select the segments matching the given conditions.
+
+        Args:
+            equals: Mapping of dimension column to required value
+            ranges: Mapping of dimension column to an inclusive (min, max)
+                range; either bound may be None
+
+        Returns:
+            Boolean mask over segment ids
+        """
+        mask = np.ones(len(self.segments), dtype=bool)
+        for column, value in (equals or {}).items():
+            values = self.segments[:, self.dimensions.index(column)]
+            mask &= (values == value) & (values != SEGMENT_MISSING)
+        for column, (low, high) in (ranges or {}).items():
+            values = self.segments[:, self.dimensions.index(column)]
+            mask &= values != SEGMENT_MISSING
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+        return mask
+
+
+def _segment_values(values: np.ndarray) -> np.ndarray:
+    """Convert a filter column to int16 segment values, SEGMENT_MISSING if not representable."""
+    values = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=np.float64)
+    info = np.iinfo(np.int16)
+    representable = (
+        ~np.isnan(values) & (values == np.round(values))
+        & (values > info.min) & (values <= info.max)
+    )
+    result = np.full(values.shape, SEGMENT_MISSING, dtype=np.int16)
+    result[representable] = values[representable]
+    return result
+
+
+class _Partial:
+    """Partial tables of one question, merged as chunks are added."""
+
+    def __init__(self):
+        self.value_ids = {}
+        self.tables = []
+
+    def add(self, row_segments: np.ndarray, values: np.ndarray, weights: np.ndarray) -> bool:
+        """
+        Add one chunk of a column.
+
+        Returns:
+            False if the column has too many distinct values to aggregate
+        """
+        codes, uniques = pd.factorize(values, use_na_sentinel=True)
+        mapping = np.array(
+            [self.value_ids.setdefault(value, len(self.value_ids)) for value in uniques.tolist()],
+            dtype=np.int64
+        )
+        if len(self.value_ids) > MAX_AGGREGATE_VALUES:
+            return False
+
+        valid = codes >= 0
+        keys = (row_segments[valid] << _VALUE_BITS) | mapping[codes[valid]]
+        self._append(keys, np.ones(keys.shape, dtype=np.int64), weights[valid])
+        return True
+
+    def _append(self, keys: np.ndarray, counts: np.ndarray, weights: np.ndarray):
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        self.tables.append((
+            unique_keys,
+            np.bincount(inverse, weights=counts, minlength=len(unique_keys)).astype(np.int64),
+            np.bincount(inverse, weights=weights, minlength=len(unique_keys)),
+        ))
+        if len(self.tables) >= _MERGE_EVERY:
+            self._merge()
+
+    def _merge(self):
+        keys, counts, weights = (np.concatenate(parts) for parts in zip(*self.tables))
+        self.tables = []
+        self._append(keys, counts, weights)
+
+    def finish(self) -> QuestionAggregate:
+        """Merge the partial tables into the final aggregate, with values sorted."""
+        if self.tables:
+            keys, counts, weights = (np.concatenate(parts) for parts in zip(*self.tables))
+            unique_keys, inverse = np.unique(keys, return_inverse=True)
+            counts = np.bincount(inverse, weights=counts, minlength=len(unique_keys)).astype(np.int64)
+            weights = np.bincount(inverse, weights=weights, minlength=len(unique_keys))
+        else:
+            unique_keys = np.empty(0, dtype=np.int64)
+            counts = np.empty(0, dtype=np.int64)
+            weights = np.empty(0, dtype=np.float64)
+
+        values = np.empty(len(self.value_ids), dtype=object)
+        values[:] = list(self.value_ids)
+        order = np.argsort(values, kind="stable") if len(values) else np.empty(0, dtype=np.int64)
+        rank = np.empty(len(values), dtype=np.int64)
+        rank[order] = np.arange(len(values))
+        sorted_values = values[order]
+        if len(sorted_values) and all(isinstance(value, float) for value in sorted_values):
+            sorted_values = sorted_values.astype(np.float64)
+
+        return QuestionAggregate(
+            values=sorted_values,
+            segments=unique_keys >> _VALUE_BITS,
+            value_index=rank[unique_keys & ((1 << _VALUE_BITS) - 1)],
+            counts=counts,
+            weights=weights,
+        )
+
+
+def build_aggregates(
+    chunks: Iterable[Tuple[Any, Any]], dimensions: Sequence[str],
+    weight_column: Optional[str] = None, questions: Optional[Iterable[str]] = None
+) -> SurveyAggregates:
+    """
+    Compute the aggregates in one pass over DataFrame chunks.
+
+    Only one chunk is held in memory at a time.
+
+    Args:
+        chunks: Iterable of (DataFrame, metadata) chunks, as yielded by
+            pyreadstat.read_file_in_chunks
+        dimensions: Filter column names defining the segments
+        weight_column: Column with expansion weights, if any
+        questions: Columns to aggregate. Defaults to every column.
+
+    Returns:
+        The computed SurveyAggregates
+    """
+    segment_ids = {}
+    segment_counts = np.zeros(0, dtype=np.int64)
+    segment_weights = np.zeros(0, dtype=np.float64)
+    partials = {}
+    skipped = set()
+    present_dimensions = None
+    n_rows = 0
+
+    for df, _ in chunks:
+        if present_dimensions is None:
+            present_dimensions = [column for column in dimensions if column in df.columns]
+            if questions is None:
+                questions = list(df.columns)
+            partials = {column: _Partial() for column in questions if column in df.columns}
+
+        n_rows += len(df)
+        weights = np.ones(len(df))
+        if weight_column is not None and weight_column in df.columns:
+            weights = np.nan_to_num(
+                pd.to_numeric(df[weight_column], errors="coerce").to_numpy(dtype=np.float64)
+            )
+
+        # Map every row to its global segment id
+        dimension_values = np.column_stack(
+            [_segment_values(df[column].to_numpy()) for column in present_dimensions]
+            or [np.zeros((len(df), 0), dtype=np.int16)]
+        )
+        unique_segments, inverse = np.unique(dimension_values, axis=0, return_inverse=True)
+        mapping = np.array(
+            [segment_ids.setdefault(tuple(row), len(segment_ids)) for row in unique_segments.tolist()],
+            dtype=np.int64
+        )
+        row_segments = mapping[inverse.reshape(-1)]
+
+        n_segments = len(segment_ids)
+        segment_counts = np.pad(segment_counts, (0, n_segments - len(segment_counts)))
+        segment_weights = np.pad(segment_weights, (0, n_segments - len(segment_weights)))
+        segment_counts += np.bincount(row_segments, minlength=n_segments)
+        segment_weights += np.bincount(row_segments, weights=weights, minlength=n_segments)
+
+        for column, partial in partials.items():
+            if column in skipped:
+                continue
+            if not partial.add(row_segments, df[column].to_numpy(), weights):
+                skipped.add(column)
+
+    present_dimensions = present_dimensions or []
+    segments = np.array(list(segment_ids), dtype=np.int16).reshape(
+        len(segment_ids), len(present_dimensions)
+    )
+    return SurveyAggregates(
+        dimensions=present_dimensions,
+        segments=segments,
+        segment_counts=segment_counts,
+        segment_weights=segment_weights,
+        questions={
+            column: partial.finish()
+            for column, partial in partials.items() if column not in skipped
+        },
+        n_rows=n_rows,
+    )
+
+
+def aggregates_path_for(file_path: str, cache_dir: Optional[str] = None) -> str:
+    """
+    Get the pointer to the persisted aggregates of a source file.
+
+    Args:
+        file_path: Path to the source .sav file
+        cache_dir: Cache directory. Defaults to a ``.sav_cache`` directory
+            next to the source file.
+
+    Returns:
+        Path of the pointer file naming the current aggregates directory
+    """
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(file_path)), ".sav_cache")
+    return os.path.join(cache_dir, os.path.basename(file_path) + ".aggregates")
+
+
+def write_aggregates(aggregates: SurveyAggregates, path: str, fingerprint: dict) -> None:
+    """
+    Persist aggregates and publish them in place of any previous ones.
+
+    The aggregates are written to a temporary directory, renamed to the
+    directory named after the source file's contents and published by
+    swapping the pointer, so concurrent readers find either the previous
+    aggregates or the new ones, never a partial or missing directory.
+
+    Args:
+        aggregates: Aggregates to persist
+        path: Aggregates pointer (see aggregates_path_for)
+        fingerprint: Fingerprint of the source file, with its sha256 (see
+            file_fingerprint)
+
+    Raises:
+        OSError: If the aggregates cannot be written
+    """
+    parent = os.path.dirname(path)
+    os.makedirs(parent, exist_ok=True)
+    name = version_name(path, AGGREGATES_FORMAT_VERSION, fingerprint)
+    version_path = os.path.join(parent, name)
+    if not os.path.exists(os.path.join(version_path, MANIFEST_FILE)):
+        tmp_path = tempfile.mkdtemp(prefix=".tmp-", dir=parent)
+        try:
+            with open(os.path.join(tmp_path, AGGREGATES_FILE), "wb") as f:
+                pickle.dump(aggregates, f, protocol=pickle.HIGHEST_PROTOCOL)
+            manifest = {"format": AGGREGATES_FORMAT_VERSION, "source": fingerprint}
+            with open(os.path.join(tmp_path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+
+            rename_version(tmp_path, version_path)
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+    publish_version(path, name)
+
+
+def read_aggregates(path: str, file_path: str) -> Optional[SurveyAggregates]:
+    """
+    Load persisted aggregates if they were built from the current source file.
+
+    Args:
+        path: Aggregates pointer (see aggregates_path_for)
+        file_path: Source .sav file the aggregates must match
+
+    Returns:
+        The SurveyAggregates, or None if there are no valid aggregates
+    """
+    path = resolve_pointer(path)
+    if path is None:
+        return None
+    try:
+        with open(os.path.join(path, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("format") != AGGREGATES_FORMAT_VERSION:
+        return None
+    if not source_matches(manifest.get("source", {}), file_path):
+        return None
+
+    try:
+        with open(os.path.join(path, AGGREGATES_FILE), "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, AttributeError):
+        return None
+
+
+def stream_aggregates(
+    read_chunks, file_path: str, dimensions: Sequence[str], weight_column: Optional[str],
+    cache_dir: Optional[str] = None
+) -> SurveyAggregates:
+    """
+    Get the aggregates of a file, from the persisted copy or a streaming pass.
+
+    Args:
+        read_chunks: Function returning an iterable of (DataFrame, metadata)
+            chunks of the file
+        file_path: Path to the source .sav file
+        dimensions: Filter column names defining the segments
+        weight_column: Column with expansion weights, if any
+        cache_dir: Cache directory for the persisted aggregates
+
+    Returns:
+        The SurveyAggregates
+    """
+    path = aggregates_path_for(file_path, cache_dir)
+    aggregates = read_aggregates(path, file_path)
+    if aggregates is not None:
+        return aggregates
+
+    fingerprint = file_fingerprint(file_path)
+    aggregates = build_aggregates(read_chunks(), dimensions, weight_column)
+    try:
+        write_aggregates(aggregates, path, fingerprint)
+    except OSError:
+        # Not persisted: the next start streams the file again
+        pass
+    return aggregates
+
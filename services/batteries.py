@@ -0,0 +1,211 @@
+"""
+Batteries Module
+
+This module aggregates rating batteries: groups of items answered on one
+shared scale, stored as one column per item (T_Q_25_1 ... T_Q_25_6).
+
+The items of a battery are mapped once to positions on their shared scale,
+as a 2D array (respondents x items, -1 where the item is unanswered).
+Shifting every item's positions into its own range of the scale makes the
+whole item x scale-point frequency matrix a single np.bincount.
+"""
+
+import re
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from services.column_store import Column, ColumnStore
+from services.counting import label_array
+
+
+# Item columns of a battery: <battery>_<item number>
+BATTERY_PATTERN = re.compile(r'^(T_Q_\d+)_(\d+)$')
+
+# Widest shared scale of a battery; items with more distinct answers (open
+# numbers, free text) are not a rating scale
+MAX_SCALE_POINTS = 50
+
+
+def detect_batteries(
+    column_names: Iterable[str], variable_types: Optional[Dict[str, str]] = None
+) -> Dict[str, Tuple[str, ...]]:
+    """
+    Group the item columns of the batteries.
+
+    Args:
+        column_names: Column names of the file
+        variable_types: Optional readstat type of every column ("double",
+            "string", ...); batteries with a text item are left out, since
+            they cannot be a rating scale
+
+    Returns:
+        Mapping of battery identifier (e.g. T_Q_25) to its columns ordered
+        by item number, for the batteries with at least two items
+    """
+    groups = {}
+    for name in column_names:
+        match = BATTERY_PATTERN.match(name)
+        if match:
+            groups.setdefault(match.group(1), []).append((int(match.group(2)), name))
+    variable_types = variable_types or {}
+    return {
+        base: tuple(name for _, name in sorted(columns))
+        for base, columns in groups.items()
+        if len(columns) > 1
+        and all(variable_types.get(name) != "string" for _, name in columns)
+    }
+
+
+def split_labels(labels: Iterable[str]) -> Tuple[str, Tuple[str, ...]]:
+    """
+    Split item labels into their common question text and each item's own text.
+
+    Args:
+        labels: Label of every item
+
+    Returns:
+        Tuple of (common text, item texts). Items whose text is the common
+        text keep their whole label.
+    """
+    labels = list(labels)
+    common = labels[0]
+    for label in labels[1:]:
+        end = 0
+        while end < min(len(common), len(label)) and common[end] == label[end]:
+            end += 1
+        common = common[:end]
+    # Cut at a word boundary so no item starts mid-word
+    common = common[:common.rfind(" ") + 1] if " " in common else ""
+    items = tuple(label[len(common):].strip() or label for label in labels)
+    return common.strip(), items
+
+
+class Battery:
+    """Scale positions of the items of a battery."""
+
+    def __init__(self, values: np.ndarray, labels: np.ndarray, positions: np.ndarray):
+        """
+        Initialize the battery.
+
+        Args:
+            values: Sorted scale values shared by the items
+            labels: Label of each scale value
+            positions: int8 array (n_rows x n_items) with the position in
+                values of every answer, -1 if unanswered
+        """
+        self.values = values
+        self.labels = labels
+        self.positions = positions
+
+    @classmethod
+    def build(cls, columns: Dict[str, Column], value_labels: dict) -> Optional["Battery"]:
+        """
+        Build a battery from its item columns.
+
+        Args:
+            columns: Mapping of item column name to Column
+            value_labels: Value labels of the questions of the file
+
+        Returns:
+            The Battery, or None if an item is not numeric or the items do
+            not share a scale of at most MAX_SCALE_POINTS values
+        """
+        answers = []
+        for column in columns.values():
+            decoded = column.decode()
+            if column.categories is not None or decoded.dtype.kind not in "iuf":
+                return None
+            answers.append(decoded.astype(np.float64))
+        answers = np.column_stack(answers)
+        answered = ~np.isnan(answers)
+        values = np.unique(answers[answered])
+        if len(values) > MAX_SCALE_POINTS:
+            return None
+
+        labels = {}
+        for name in columns:
+            labels.update(value_labels.get(name, {}))
+
+        positions = np.full(answers.shape, -1, dtype=np.int8)
+        positions[answered] = np.searchsorted(values, answers[answered])
+        return cls(values, label_array(values, labels), positions)
+
+    @property
+    def nbytes(self) -> int:
+        """Return the size of the positions in bytes."""
+        return self.positions.nbytes
+
+    def frequencies(
+        self, mask: Optional[np.ndarray] = None, weights: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Count the answers of every item on every scale point.
+
+        Args:
+            mask: Optional boolean row mask
+            weights: Optional weight of every row; weights are summed instead
+                of counting rows
+
+        Returns:
+            Counts (int64, or float64 when weighted) of shape
+            (n_items, len(values))
+        """
+        positions = self.positions if mask is None else self.positions[mask]
+        n_items = positions.shape[1]
+        n_points = len(self.values)
+        answered = positions >= 0
+        cells = positions.astype(np.int64) + np.arange(n_items) * n_points
+
+        cell_weights = None
+        if weights is not None:
+            row_weights = weights if mask is None else weights[mask]
+            cell_weights = np.broadcast_to(row_weights[:, None], positions.shape)[answered]
+
+        counts = np.bincount(
+            cells[answered], weights=cell_weights, minlength=n_items * n_points
+        ).reshape(n_items, n_points)
+        return counts if weights is not None else counts.astype(np.int64)
+
+
+class BatteryEngine:
+    """Batteries of a dataset, built on first use of each battery."""
+
+    def __init__(self, store: ColumnStore, meta, batteries: Dict[str, Tuple[str, ...]]):
+        """
+        Initialize the engine.
+
+        Args:
+            store: Column store of the dataset
+            meta: pyreadstat metadata container of the dataset
+            batteries: Mapping of battery identifier to its item columns (see
+                detect_batteries)
+        """
+        self._store = store
+        self._value_labels = meta.variable_value_labels if meta.variable_value_labels else {}
+        self.batteries = batteries
+        self._built: Dict[str, Optional[Battery]] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, base: str) -> bool:
+        return base in self.batteries
+
+    def get(self, base: str) -> Optional[Battery]:
+        """
+        Get a battery, building its positions once.
+
+        Args:
+            base: Battery identifier (e.g. T_Q_25)
+
+        Returns:
+            The Battery, or None if its items are not a rating scale (see
+            Battery.build)
+        """
+        try:
+            return self._built[base]
+        except KeyError:
+            pass
+        built = Battery.build(self._store.fetch(self.batteries[base]), self._value_labels)
+        with self._lock:
+            return self._built.setdefault(base, built)
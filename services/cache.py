@@ -0,0 +1,121 @@
+"""
+Cache Module
+
+This module provides a thread-safe LRU cache bounded by number of entries
+and/or total size in bytes, with hit, miss and eviction counters.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional, Tuple
+
+
+class LRUCache:
+    """Thread-safe least-recently-used cache with entry and byte bounds."""
+
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of entries, or None for no limit
+            max_bytes: Maximum total size of the entries in bytes, or None for no limit
+        """
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Get a cached value and mark it as most recently used.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The cached value, or None if the key is not cached
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key: Hashable, value: Any, nbytes: int = 0) -> None:
+        """
+        Store a value, evicting least recently used entries to stay in bounds.
+
+        A value larger than the byte budget on its own is not stored.
+
+        Args:
+            key: Cache key
+            value: Value to cache
+            nbytes: Size of the value in bytes
+        """
+        if self._max_bytes is not None and nbytes > self._max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, nbytes)
+            self._bytes += nbytes
+
+            while (
+                (self._max_entries is not None and len(self._entries) > self._max_entries)
+                or (self._max_bytes is not None and self._bytes > self._max_bytes)
+            ):
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self._bytes -= evicted_bytes
+                self._evictions += 1
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """
+        Get the cached entries without touching their recency or the counters.
+
+        Returns:
+            List of (key, value) pairs, least recently used first
+        """
+        with self._lock:
+            return [(key, value) for key, (value, _) in self._entries.items()]
+
+    def clear(self) -> None:
+        """Remove every entry, keeping the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """
+        Get the cache counters.
+
+        Returns:
+            Dictionary with aciertos (hits), fallos (misses), desalojos
+            (evictions), tasa_aciertos (hit ratio), entradas, bytes and the
+            configured limits
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "aciertos": self._hits,
+                "fallos": self._misses,
+                "desalojos": self._evictions,
+                "tasa_aciertos": round(self._hits / lookups, 4) if lookups else 0.0,
+                "entradas": len(self._entries),
+                "bytes": self._bytes,
+                "max_entradas": self._max_entries,
+                "max_bytes": self._max_bytes,
+            }
@@ -0,0 +1,52 @@
+"""
+Charts Module
+
+This module builds the universal chart JSON described in the README, ready
+to be plotted by the mobile apps and dashboards.
+"""
+
+from typing import Any, List
+
+
+def stacked_bar(labels: List[Any], series: List[Any], values: List[List[Any]]) -> dict:
+    """
+    Build a stacked bar chart.
+
+    Args:
+        labels: Label of every bar
+        series: Label of every stacked segment
+        values: One list per bar with the value of each segment
+
+    Returns:
+        Dictionary with chartType and chartData
+    """
+    return {
+        "chartType": "stackedBar",
+        "chartData": {
+            "labels": labels,
+            "series": series,
+            "values": values
+        }
+    }
+
+
+def heatmap(x_labels: List[Any], y_labels: List[Any], values: List[List[Any]]) -> dict:
+    """
+    Build a heatmap chart.
+
+    Args:
+        x_labels: Label of every column
+        y_labels: Label of every row
+        values: One list per row with the value of each column
+
+    Returns:
+        Dictionary with chartType and chartData
+    """
+    return {
+        "chartType": "heatmap",
+        "chartData": {
+            "xLabels": x_labels,
+            "yLabels": y_labels,
+            "values": values
+        }
+    }
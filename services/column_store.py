@@ -0,0 +1,782 @@
+"""
+Column Store Module
+
+This module handles the columnar storage of a parsed SPSS .sav file.
+A snapshot is a directory with one .npy file per variable, a pickled metadata
+sidecar and a JSON manifest that records the fingerprint of the source file, so
+later processes can restore the dataset without parsing the .sav file again.
+Each snapshot directory is named after the contents of its source file and
+never modified once published; a small pointer file names the current one
+and is swapped atomically, so readers always open one complete snapshot.
+
+Snapshots are opened as a read-only ColumnStore whose numeric columns are
+memory-mapped, so every worker process serving the same file shares the same
+page-cache pages instead of holding a private copy of the data.
+
+For files too large to keep resident, a LazyColumnStore loads columns on demand
+and keeps them in an LRU cache bounded by a byte budget.
+
+Columns are stored compactly: coded answers that pyreadstat returns as float64
+become the smallest integer type that holds them, with a sentinel for missing
+values, and string columns become dictionary-encoded categoricals.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from services.cache import LRUCache
+
+
+# Bump when the on-disk layout changes so stale snapshots are ignored
+SNAPSHOT_FORMAT_VERSION = 2
+
+MANIFEST_FILE = "manifest.json"
+METADATA_FILE = "metadata.pkl"
+
+# Read size used when hashing the source file
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+# Integer types tried, smallest first, for integral float columns, each with the
+# value reserved as the missing sentinel
+INTEGER_ENCODINGS = [
+    (np.dtype(np.int8), np.iinfo(np.int8).min),
+    (np.dtype(np.uint8), np.iinfo(np.uint8).max),
+    (np.dtype(np.int16), np.iinfo(np.int16).min),
+    (np.dtype(np.int32), np.iinfo(np.int32).min),
+]
+
+# Code of a missing value in dictionary-encoded columns
+CATEGORY_MISSING = -1
+
+
+def _smallest_code_dtype(n_categories: int) -> np.dtype:
+    """Get the smallest signed integer type holding codes 0..n_categories-1 and -1."""
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def _deep_nbytes(values: np.ndarray) -> int:
+    """Get the size of an array in bytes, including the objects it references."""
+    if values.dtype == object:
+        return int(pd.Series(values).memory_usage(deep=True, index=False))
+    return int(values.nbytes)
+
+
+class Column:
+    """
+    A single stored variable.
+
+    A column is in one of three encodings:
+    - coded: integer codes in ``data`` with ``missing`` as the missing sentinel
+    - category: dictionary codes in ``data`` indexing ``categories``, with -1
+      for missing values
+    - raw: ``data`` as returned by pyreadstat (non-integral floats, dates)
+    """
+
+    __slots__ = ("data", "missing", "categories", "source_dtype", "source_nbytes")
+
+    def __init__(
+        self, data: np.ndarray, missing: Optional[int] = None,
+        categories: Optional[np.ndarray] = None,
+        source_dtype: Optional[str] = None, source_nbytes: Optional[int] = None
+    ):
+        """
+        Initialize the column.
+
+        Args:
+            data: Stored array (codes for coded and category columns)
+            missing: Missing sentinel of a coded column
+            categories: Category values of a dictionary-encoded column
+            source_dtype: dtype the column had when parsed
+            source_nbytes: Size in bytes the column had when parsed
+        """
+        data.flags.writeable = False
+        self.data = data
+        self.missing = missing
+        self.categories = categories
+        self.source_dtype = source_dtype if source_dtype is not None else str(data.dtype)
+        self.source_nbytes = source_nbytes if source_nbytes is not None else _deep_nbytes(data)
+
+    @classmethod
+    def encode(cls, values: np.ndarray) -> "Column":
+        """
+        Encode a parsed column into its most compact representation.
+
+        Args:
+            values: Column values as returned by pyreadstat
+
+        Returns:
+            Encoded Column
+        """
+        source_dtype = str(values.dtype)
+        source_nbytes = _deep_nbytes(values)
+
+        if values.dtype == object:
+            codes, categories = pd.factorize(values, sort=True, use_na_sentinel=True)
+            categories = np.asarray(categories, dtype=object)
+            codes = codes.astype(_smallest_code_dtype(len(categories)))
+            return cls(codes, categories=categories,
+                       source_dtype=source_dtype, source_nbytes=source_nbytes)
+
+        if values.dtype.kind == "f":
+            present = ~np.isnan(values)
+            finite = values[present]
+            if np.all(np.isfinite(finite)) and np.all(finite == np.round(finite)):
+                low = finite.min() if finite.size else 0
+                high = finite.max() if finite.size else 0
+                for dtype, sentinel in INTEGER_ENCODINGS:
+                    info = np.iinfo(dtype)
+                    if info.min <= low and high <= info.max and not (low <= sentinel <= high):
+                        codes = np.full(values.shape, sentinel, dtype=dtype)
+                        codes[present] = finite
+                        return cls(codes, missing=int(sentinel),
+                                   source_dtype=source_dtype, source_nbytes=source_nbytes)
+
+        return cls(np.array(values, copy=True),
+                   source_dtype=source_dtype, source_nbytes=source_nbytes)
+
+    @property
+    def encoding(self) -> str:
+        """Return the encoding name: 'coded', 'category' or 'raw'."""
+        if self.categories is not None:
+            return "category"
+        if self.missing is not None:
+            return "coded"
+        return "raw"
+
+    @property
+    def nbytes(self) -> int:
+        """Return the stored size in bytes, including category values."""
+        nbytes = int(self.data.nbytes)
+        if self.categories is not None:
+            nbytes += _deep_nbytes(self.categories)
+        return nbytes
+
+    def valid(self) -> np.ndarray:
+        """Return a boolean mask of the rows with a non-missing value."""
+        if self.categories is not None:
+            return self.data != CATEGORY_MISSING
+        if self.missing is not None:
+            return self.data != self.missing
+        return ~pd.isna(self.data)
+
+    def decode(self) -> np.ndarray:
+        """
+        Decode the column back to the values pyreadstat returned.
+
+        Returns:
+            float64 array with NaN for coded columns, object array with NaN for
+            category columns, or the raw array
+        """
+        if self.categories is not None:
+            decoded = np.full(self.data.shape, np.nan, dtype=object)
+            valid = self.valid()
+            decoded[valid] = self.categories[self.data[valid]]
+            return decoded
+        if self.missing is not None:
+            decoded = self.data.astype(np.float64)
+            decoded[~self.valid()] = np.nan
+            return decoded
+        return self.data
+
+    def equals(self, value) -> np.ndarray:
+        """
+        Get a boolean mask of the rows equal to a value, comparing codes.
+
+        Args:
+            value: Value to compare against (as it would appear decoded)
+
+        Returns:
+            Boolean row mask
+        """
+        if self.categories is not None:
+            position = np.flatnonzero(self.categories == value)
+            if position.size == 0:
+                return np.zeros(self.data.shape, dtype=bool)
+            return self.data == position[0]
+        if self.missing is not None:
+            info = np.iinfo(self.data.dtype)
+            if (
+                isinstance(value, (int, float, np.integer, np.floating))
+                and float(value).is_integer()
+                and info.min <= value <= info.max
+                and value != self.missing
+            ):
+                return self.data == int(value)
+            return np.zeros(self.data.shape, dtype=bool)
+        return self.data == value
+
+    def between(self, low=None, high=None) -> np.ndarray:
+        """
+        Get a boolean mask of the non-missing rows within an inclusive range.
+
+        Args:
+            low: Minimum value, or None for no lower bound
+            high: Maximum value, or None for no upper bound
+
+        Returns:
+            Boolean row mask
+        """
+        data = self.decode() if self.categories is not None else self.data
+        mask = self.valid() if self.missing is not None else np.ones(data.shape, dtype=bool)
+        if low is not None:
+            mask &= data >= low
+        if high is not None:
+            mask &= data <= high
+        return mask
+
+    def value_counts(
+        self, mask: Optional[np.ndarray] = None, weights: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Count the non-missing values of the column.
+
+        Args:
+            mask: Optional boolean row mask restricting the rows counted
+            weights: Optional weight of every row; weights are summed instead
+                of counting rows
+
+        Returns:
+            Tuple of (values, counts) sorted by value. Values of coded columns
+            are returned as float64, matching the parsed data. Counts are
+            float64 when weighted.
+        """
+        data = self.data if mask is None else self.data[mask]
+        if weights is not None and mask is not None:
+            weights = weights[mask]
+
+        if self.categories is not None or self.missing is not None:
+            missing = CATEGORY_MISSING if self.categories is not None else self.missing
+            present = data != missing
+            if weights is None:
+                codes, counts = np.unique(data[present], return_counts=True)
+            else:
+                codes, inverse = np.unique(data[present], return_inverse=True)
+                counts = np.bincount(inverse, weights=weights[present], minlength=len(codes))
+            if self.categories is not None:
+                return self.categories[codes], counts
+            return codes.astype(np.float64), counts
+
+        series = pd.Series(data)
+        if weights is not None:
+            present = series.notna().to_numpy()
+            totals = pd.Series(weights[present]).groupby(series[present].to_numpy()).sum()
+            return totals.index.to_numpy(), totals.to_numpy()
+        value_counts = series.dropna().value_counts().sort_index()
+        return value_counts.index.to_numpy(), value_counts.to_numpy()
+
+
+class ColumnStore:
+    """Read-only store of one encoded Column per variable."""
+
+    def __init__(self, columns: Dict[str, Column], n_rows: int):
+        """
+        Initialize the store from encoded columns.
+
+        Args:
+            columns: Mapping of column name to Column, in column order
+            n_rows: Number of rows (cases) in every column
+        """
+        self._data = columns
+        self._columns = tuple(columns)
+        self._n_rows = n_rows
+
+    @classmethod
+    def from_frame(cls, df) -> "ColumnStore":
+        """
+        Build an in-memory store from a DataFrame, encoding every column.
+
+        Args:
+            df: DataFrame as returned by pyreadstat
+
+        Returns:
+            ColumnStore holding one encoded Column per DataFrame column
+        """
+        columns = {column: Column.encode(df[column].to_numpy()) for column in df.columns}
+        return cls(columns, len(df))
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        """Return the column names in file order."""
+        return self._columns
+
+    @property
+    def n_rows(self) -> int:
+        """Return the number of rows."""
+        return self._n_rows
+
+    @property
+    def nbytes(self) -> int:
+        """Return the total stored size of the columns in bytes."""
+        return sum(column.nbytes for column in self._data.values())
+
+    def encoding_report(self) -> List[dict]:
+        """
+        Report the size of every column before and after encoding.
+
+        Returns:
+            List of dictionaries with columna, dtype_original, codificacion,
+            dtype, bytes_antes and bytes_despues
+        """
+        return [self._report_row(name, column) for name, column in self._data.items()]
+
+    @staticmethod
+    def _report_row(name: str, column: Column) -> dict:
+        """Build the encoding_report entry of one column."""
+        return {
+            "columna": name,
+            "dtype_original": column.source_dtype,
+            "codificacion": column.encoding,
+            "dtype": str(column.data.dtype),
+            "bytes_antes": column.source_nbytes,
+            "bytes_despues": column.nbytes,
+        }
+
+    def fetch(self, columns: Iterable[str]) -> Dict[str, Column]:
+        """
+        Get several columns at once. Unknown column names are skipped.
+
+        Args:
+            columns: Column names to get
+
+        Returns:
+            Mapping of column name to Column
+        """
+        return {column: self._data[column] for column in columns if column in self._data}
+
+    def __contains__(self, column: str) -> bool:
+        return column in self._data
+
+    def __getitem__(self, column: str) -> Column:
+        return self._data[column]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._columns)
+
+    def __len__(self) -> int:
+        return len(self._columns)
+
+
+class LazyColumnStore(ColumnStore):
+    """
+    Column store that loads columns on demand.
+
+    Loaded columns are kept in an LRU cache bounded by a byte budget, so only
+    the recently used columns stay resident.
+    """
+
+    def __init__(
+        self, columns: Sequence[str], n_rows: int,
+        load_columns: Callable[[List[str]], Dict[str, Column]], budget_bytes: int
+    ):
+        """
+        Initialize the lazy store.
+
+        Args:
+            columns: All column names, in file order
+            n_rows: Number of rows (cases) in every column
+            load_columns: Function that reads and encodes the given columns
+            budget_bytes: Maximum total size of the resident columns in bytes
+        """
+        super().__init__({}, n_rows)
+        self._columns = tuple(columns)
+        self._names = frozenset(columns)
+        self._load_columns = load_columns
+        self._cache = LRUCache(max_bytes=budget_bytes)
+        self._load_lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        """Return the size of the resident columns in bytes."""
+        return self._cache.stats()["bytes"]
+
+    def cache_stats(self) -> dict:
+        """Return the hit, miss and eviction counters of the column cache."""
+        return self._cache.stats()
+
+    def encoding_report(self) -> List[dict]:
+        """
+        Report the size of the resident columns before and after encoding.
+
+        Only columns loaded so far are known; use an eager ColumnStore to
+        report every column. Nothing is loaded and the cache counters are
+        not touched.
+
+        Returns:
+            List of dictionaries as in ColumnStore.encoding_report, in file order
+        """
+        resident = dict(self._cache.items())
+        return [
+            self._report_row(name, resident[name]) for name in self._columns if name in resident
+        ]
+
+    def fetch(self, columns: Iterable[str]) -> Dict[str, Column]:
+        """
+        Get several columns at once, reading all non-resident ones in a
+        single pass over the file. Unknown column names are skipped.
+
+        Args:
+            columns: Column names to get
+
+        Returns:
+            Mapping of column name to Column
+        """
+        fetched = {}
+        missing = []
+        for column in dict.fromkeys(columns):
+            if column not in self._names:
+                continue
+            cached = self._cache.get(column)
+            if cached is None:
+                missing.append(column)
+            else:
+                fetched[column] = cached
+
+        if missing:
+            # Serialize file reads so a burst of misses does not parse the
+            # file several times in parallel
+            with self._load_lock:
+                loaded = self._load_columns(missing)
+            for name, column in loaded.items():
+                self._cache.put(name, column, column.nbytes)
+                fetched[name] = column
+
+        return fetched
+
+    def __contains__(self, column: str) -> bool:
+        return column in self._names
+
+    def __getitem__(self, column: str) -> Column:
+        if column not in self._names:
+            raise KeyError(column)
+        return self.fetch([column])[column]
+
+
+def file_sha256(file_path: str) -> str:
+    """
+    Compute the SHA-256 hex digest of a file.
+
+    Args:
+        file_path: Path to the file
+
+    Returns:
+        Hex digest string
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_fingerprint(file_path: str, with_hash: bool = True) -> dict:
+    """
+    Build the fingerprint used to key snapshots of a source file.
+
+    Args:
+        file_path: Path to the source file
+        with_hash: Whether to include the SHA-256 digest of the contents
+
+    Returns:
+        Dictionary with size, mtime_ns and (optionally) sha256
+    """
+    stat = os.stat(file_path)
+    fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if with_hash:
+        fingerprint["sha256"] = file_sha256(file_path)
+    return fingerprint
+
+
+def snapshot_path_for(file_path: str, cache_dir: Optional[str] = None) -> str:
+    """
+    Get the snapshot pointer for a source file.
+
+    Args:
+        file_path: Path to the source .sav file
+        cache_dir: Directory holding snapshots. Defaults to a ``.sav_cache``
+            directory next to the source file.
+
+    Returns:
+        Path of the pointer file naming the current snapshot directory
+    """
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(file_path)), ".sav_cache")
+    return os.path.join(cache_dir, os.path.basename(file_path) + ".snapshot")
+
+
+def version_name(pointer_path: str, format_version: int, fingerprint: dict) -> str:
+    """
+    Get the name of the directory holding what was built from a given
+    content of the source file.
+
+    Args:
+        pointer_path: Pointer file naming the current directory
+        format_version: On-disk format version of the directory
+        fingerprint: Fingerprint of the source file, with its sha256
+
+    Returns:
+        Directory name, next to the pointer
+    """
+    return (
+        f"{os.path.basename(pointer_path)}.v{format_version}."
+        f"{fingerprint['sha256']}.snap"
+    )
+
+
+def resolve_pointer(pointer_path: str) -> Optional[str]:
+    """
+    Get the directory a pointer file names, reading the pointer once.
+
+    Returns:
+        Path of the directory, or None if there is no pointer
+    """
+    try:
+        with open(pointer_path, "r", encoding="utf-8") as f:
+            name = f.read().strip()
+    except OSError:
+        # Missing, or a directory left by an older, unversioned layout
+        return None
+    if not name or os.path.basename(name) != name:
+        return None
+    return os.path.join(os.path.dirname(pointer_path), name)
+
+
+def rename_version(tmp_path: str, version_path: str) -> None:
+    """
+    Rename a directory built in a temporary directory to its version name.
+
+    Complete directories only appear by rename, with their manifest, and are
+    never modified. When several processes build the same contents at once,
+    the first rename wins and the others discard their copy.
+    """
+    try:
+        os.rename(tmp_path, version_path)
+    except OSError:
+        if os.path.exists(os.path.join(version_path, MANIFEST_FILE)):
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return
+        # Leftover of an interrupted removal
+        shutil.rmtree(version_path, ignore_errors=True)
+        os.rename(tmp_path, version_path)
+
+
+def publish_version(pointer_path: str, name: str) -> None:
+    """
+    Point a pointer file at a version directory and remove the older ones.
+
+    The pointer is replaced with one atomic rename. Older directories were
+    built from other contents of the source file, so readers would reject
+    them anyway; processes that still map their files keep them until they
+    unmap them.
+    """
+    parent = os.path.dirname(pointer_path)
+    if os.path.isdir(pointer_path) and not os.path.islink(pointer_path):
+        # Written by the older, unversioned layout
+        shutil.rmtree(pointer_path, ignore_errors=True)
+
+    fd, tmp_pointer = tempfile.mkstemp(prefix=".tmp-", dir=parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(name)
+        os.replace(tmp_pointer, pointer_path)
+    except BaseException:
+        if os.path.exists(tmp_pointer):
+            os.remove(tmp_pointer)
+        raise
+
+    prefix = os.path.basename(pointer_path) + ".v"
+    for entry in os.listdir(parent):
+        if entry.startswith(prefix) and entry.endswith(".snap") and entry != name:
+            shutil.rmtree(os.path.join(parent, entry), ignore_errors=True)
+
+
+def _read_manifest(snapshot_path: str) -> Optional[dict]:
+    """Read a snapshot manifest, returning None if missing or unreadable."""
+    try:
+        with open(os.path.join(snapshot_path, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("format") != SNAPSHOT_FORMAT_VERSION:
+        return None
+    return manifest
+
+
+def source_matches(source: dict, file_path: str) -> bool:
+    """
+    Check whether a recorded fingerprint still describes the source file.
+
+    The size must match. A matching mtime is accepted as-is; otherwise the
+    contents are hashed, so a copied or touched file with identical bytes
+    still reuses what was built from it.
+
+    Args:
+        source: Fingerprint recorded at build time (see file_fingerprint)
+        file_path: Path to the current source file
+
+    Returns:
+        True if the file is unchanged
+    """
+    current = file_fingerprint(file_path, with_hash=False)
+    if source.get("size") != current["size"]:
+        return False
+    if source.get("mtime_ns") == current["mtime_ns"]:
+        return True
+    return source.get("sha256") == file_sha256(file_path)
+
+
+def write_snapshot(store: ColumnStore, meta, snapshot_path: str, fingerprint: dict) -> None:
+    """
+    Write a columnar snapshot of an encoded dataset.
+
+    The snapshot is built in a temporary directory, renamed to the directory
+    named after the source file's contents and then published by swapping
+    the pointer. Concurrent readers never see a partially written snapshot
+    and always find either the previous snapshot or the new one. When
+    several processes write the same contents at once, the first rename
+    wins and the others discard their copy.
+
+    Args:
+        store: Encoded column store
+        meta: pyreadstat metadata container
+        snapshot_path: Snapshot pointer (see snapshot_path_for)
+        fingerprint: Fingerprint of the source file, with its sha256 (see
+            file_fingerprint)
+
+    Raises:
+        OSError: If the snapshot cannot be written
+    """
+    parent = os.path.dirname(snapshot_path)
+    os.makedirs(parent, exist_ok=True)
+    name = version_name(snapshot_path, SNAPSHOT_FORMAT_VERSION, fingerprint)
+    version_path = os.path.join(parent, name)
+    if _read_manifest(version_path) is None:
+        _write_version(store, meta, parent, version_path, fingerprint)
+    publish_version(snapshot_path, name)
+
+
+def _write_version(store: ColumnStore, meta, parent: str, version_path: str, fingerprint: dict):
+    """Build a snapshot directory in a temporary directory and rename it into place."""
+    tmp_path = tempfile.mkdtemp(prefix=".tmp-", dir=parent)
+
+    try:
+        columns = []
+        for position, name in enumerate(store.columns):
+            column = store[name]
+            file_name = f"c{position:04d}.npy"
+            np.save(os.path.join(tmp_path, file_name), column.data, allow_pickle=True)
+            entry = {
+                "name": name,
+                "file": file_name,
+                "dtype": str(column.data.dtype),
+                "missing": column.missing,
+                "categories": None,
+                "source_dtype": column.source_dtype,
+                "source_nbytes": column.source_nbytes,
+            }
+            if column.categories is not None:
+                entry["categories"] = f"c{position:04d}.categories.npy"
+                np.save(os.path.join(tmp_path, entry["categories"]), column.categories,
+                        allow_pickle=True)
+            columns.append(entry)
+
+        with open(os.path.join(tmp_path, METADATA_FILE), "wb") as f:
+            pickle.dump(meta, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        manifest = {
+            "format": SNAPSHOT_FORMAT_VERSION,
+            "source": fingerprint,
+            "n_rows": store.n_rows,
+            "columns": columns,
+        }
+        with open(os.path.join(tmp_path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+
+        rename_version(tmp_path, version_path)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+
+def read_snapshot_metadata(snapshot_path: str, file_path: str) -> Optional[Any]:
+    """
+    Read only the metadata sidecar of a snapshot.
+
+    Args:
+        snapshot_path: Snapshot pointer (see snapshot_path_for)
+        file_path: Source .sav file the snapshot must match
+
+    Returns:
+        pyreadstat metadata container, or None if there is no valid snapshot
+        for the current version of the source file
+    """
+    snapshot_path = resolve_pointer(snapshot_path)
+    if snapshot_path is None:
+        return None
+    manifest = _read_manifest(snapshot_path)
+    if manifest is None or not source_matches(manifest.get("source", {}), file_path):
+        return None
+
+    try:
+        with open(os.path.join(snapshot_path, METADATA_FILE), "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError):
+        return None
+
+
+def read_snapshot(snapshot_path: str, file_path: str) -> Optional[Tuple[ColumnStore, Any]]:
+    """
+    Open the columnar snapshot of a dataset.
+
+    Column arrays are memory-mapped read-only. Object arrays (raw string
+    columns and category values) cannot be mapped and are loaded into memory.
+
+    Args:
+        snapshot_path: Snapshot pointer (see snapshot_path_for)
+        file_path: Source .sav file the snapshot must match
+
+    Returns:
+        Tuple of (ColumnStore, metadata), or None if there is no valid
+        snapshot for the current version of the source file
+    """
+    snapshot_path = resolve_pointer(snapshot_path)
+    if snapshot_path is None:
+        return None
+    manifest = _read_manifest(snapshot_path)
+    if manifest is None or not source_matches(manifest.get("source", {}), file_path):
+        return None
+
+    try:
+        with open(os.path.join(snapshot_path, METADATA_FILE), "rb") as f:
+            meta = pickle.load(f)
+
+        columns = {}
+        for entry in manifest["columns"]:
+            column_path = os.path.join(snapshot_path, entry["file"])
+            if entry["dtype"] == "object":
+                data = np.load(column_path, allow_pickle=True)
+            else:
+                data = np.load(column_path, mmap_mode="r")
+            categories = None
+            if entry["categories"] is not None:
+                categories = np.load(os.path.join(snapshot_path, entry["categories"]),
+                                     allow_pickle=True)
+            columns[entry["name"]] = Column(
+                data, missing=entry["missing"], categories=categories,
+                source_dtype=entry["source_dtype"], source_nbytes=entry["source_nbytes"]
+            )
+    except (OSError, ValueError, pickle.UnpicklingError, KeyError):
+        return None
+
+    return ColumnStore(columns, manifest["n_rows"]), meta
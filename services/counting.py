@@ -0,0 +1,240 @@
+"""
+Counting Module
+
+This module counts answers with np.bincount over the integer codes of the
+column store.
+
+Every question gets a QuestionCounter, built once per loaded dataset: its
+ordered domain of answer values, the label of each value, and a lookup
+table from stored codes to positions in the domain. Counts come out aligned
+with the domain, already in value order, so a response needs no sort and no
+label lookups per request.
+"""
+
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from services.column_store import Column, ColumnStore
+
+
+# Widest code range mapped through a dense lookup table; wider ranges use a
+# binary search into the domain instead
+MAX_LOOKUP_RANGE = 1 << 16
+
+
+def label_array(values: np.ndarray, value_labels: dict) -> np.ndarray:
+    """
+    Get the label of each value: its value label, or the value as text.
+
+    Args:
+        values: Answer values, as they appear decoded
+        value_labels: Value labels of the question
+
+    Returns:
+        Object array of labels aligned with values
+    """
+    labels = np.empty(len(values), dtype=object)
+    labels[:] = [value_labels.get(value, str(value)) for value in values.tolist()]
+    return labels
+
+
+def row_weights(column: Column) -> np.ndarray:
+    """
+    Get the weight of every row from a numeric weight column.
+
+    Args:
+        column: Weight column (e.g. FACTOR)
+
+    Returns:
+        float64 array; rows without a weight weigh 0
+    """
+    return np.nan_to_num(column.decode().astype(np.float64), nan=0.0)
+
+
+class QuestionCounter:
+    """Ordered answer domain of a question and the mapping of codes into it."""
+
+    def __init__(
+        self, values: np.ndarray, labels: np.ndarray, offset: int = 0,
+        lookup: Optional[np.ndarray] = None, codes: Optional[np.ndarray] = None
+    ):
+        """
+        Initialize the counter.
+
+        Args:
+            values: Distinct answer values, sorted, as they appear decoded
+            labels: Label of each value
+            offset: Smallest code, subtracted before the lookup
+            lookup: Position in values of each code - offset, or None if codes
+                are positions already (category columns) or are searched
+            codes: Sorted code of each value, searched when there is no lookup
+        """
+        self.values = values
+        self.labels = labels
+        self._offset = offset
+        self._lookup = lookup
+        self._codes = codes
+
+    @classmethod
+    def build(cls, column: Column, value_labels: dict) -> Optional["QuestionCounter"]:
+        """
+        Build the counter of a column.
+
+        Args:
+            column: Column of the question
+            value_labels: Value labels of the question
+
+        Returns:
+            The QuestionCounter, or None if the column is not integer coded
+            or categorical
+        """
+        if column.categories is not None:
+            return cls(column.categories, label_array(column.categories, value_labels))
+        if column.missing is None:
+            return None
+
+        codes = np.unique(column.data[column.valid()])
+        values = codes.astype(np.float64)
+        labels = label_array(values, value_labels)
+        if codes.size == 0:
+            return cls(values, labels, codes=codes)
+
+        offset = int(codes[0])
+        span = int(codes[-1]) - offset + 1
+        if span > MAX_LOOKUP_RANGE:
+            return cls(values, labels, offset=offset, codes=codes)
+        lookup = np.full(span, -1, dtype=np.int32)
+        lookup[codes - offset] = np.arange(len(codes), dtype=np.int32)
+        return cls(values, labels, offset=offset, lookup=lookup)
+
+    def positions(
+        self, column: Column, rows: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Map the non-missing rows of a column to positions in the domain.
+
+        Args:
+            column: Column of the question
+            rows: Optional boolean row mask restricting the rows mapped
+
+        Returns:
+            Tuple of (row mask of the mapped rows, their positions)
+        """
+        valid = column.valid()
+        if rows is not None:
+            valid &= rows
+        data = column.data[valid]
+        if self._lookup is not None:
+            return valid, self._lookup[data.astype(np.int64) - self._offset]
+        if self._codes is not None:
+            return valid, np.searchsorted(self._codes, data)
+        return valid, data.astype(np.int64)
+
+    def count(
+        self, column: Column, mask: Optional[np.ndarray] = None,
+        weights: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Count the answers of the rows selected by a mask.
+
+        Args:
+            column: Column of the question
+            mask: Optional boolean row mask
+            weights: Optional weight of every row; weights are summed instead
+                of counting rows
+
+        Returns:
+            Counts (int64, or float64 when weighted) aligned with values
+        """
+        valid, positions = self.positions(column, mask)
+        row_weights = None if weights is None else weights[valid]
+        counts = np.bincount(positions, weights=row_weights, minlength=len(self.values))
+        return counts if weights is not None else counts.astype(np.int64)
+
+
+class CountingEngine:
+    """Question counters of a dataset, built on first use of each question."""
+
+    def __init__(self, store: ColumnStore, meta):
+        """
+        Initialize the engine.
+
+        Args:
+            store: Column store of the dataset
+            meta: pyreadstat metadata container of the dataset
+        """
+        self._store = store
+        self._value_labels = meta.variable_value_labels if meta.variable_value_labels else {}
+        self._counters: Dict[str, Optional[QuestionCounter]] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, question: str, column: Optional[Column] = None) -> Optional[QuestionCounter]:
+        """
+        Get the counter of a question, building it once.
+
+        Args:
+            question: Question identifier in the store
+            column: The question's column, if already fetched
+
+        Returns:
+            The QuestionCounter, or None if the question cannot be counted
+            by code (see QuestionCounter.build)
+        """
+        try:
+            return self._counters[question]
+        except KeyError:
+            pass
+        if column is None:
+            column = self._store.fetch([question])[question]
+        counter = QuestionCounter.build(column, self._value_labels.get(question, {}))
+        with self._lock:
+            return self._counters.setdefault(question, counter)
+
+    def count_many(
+        self, columns: Dict[str, Column], mask: Optional[np.ndarray] = None,
+        weights: Optional[np.ndarray] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Count the answers of several questions over the rows selected by a mask.
+
+        The domain positions of every question are shifted into one shared
+        range, so all the questions are counted by a single np.bincount.
+
+        Args:
+            columns: Mapping of question to its column
+            mask: Optional boolean row mask
+            weights: Optional weight of every row; weights are summed instead
+                of counting rows
+
+        Returns:
+            Mapping of question to int64 counts (float64 when weighted)
+            aligned with its counter's values, for the questions that can be
+            counted by code
+        """
+        spans = []
+        positions = []
+        position_weights = []
+        offset = 0
+        for question, column in columns.items():
+            counter = self.counter(question, column)
+            if counter is None:
+                continue
+            valid, question_positions = counter.positions(column, mask)
+            positions.append(question_positions + offset)
+            if weights is not None:
+                position_weights.append(weights[valid])
+            spans.append((question, offset, offset + len(counter.values)))
+            offset += len(counter.values)
+
+        if not spans:
+            return {}
+        if weights is not None:
+            totals = np.bincount(
+                np.concatenate(positions), weights=np.concatenate(position_weights),
+                minlength=offset
+            )
+        else:
+            totals = np.bincount(np.concatenate(positions), minlength=offset).astype(np.int64)
+        return {question: totals[start:stop] for question, start, stop in spans}
@@ -0,0 +1,62 @@
+"""
+Crosstab Module
+
+This module computes contingency tables between two coded questions.
+
+Both questions are mapped to positions in their answer domains (see
+services.counting), and every row is given the single cell index
+row position * number of column values + column position. One np.bincount
+over those indexes, optionally weighted, yields the whole table, which is
+then reshaped to (row values x column values).
+"""
+
+from typing import Optional
+
+import numpy as np
+
+from services.column_store import Column
+from services.counting import QuestionCounter
+
+
+# Largest table computed; wider crosses (open numbers, identifiers) are rejected
+MAX_CROSSTAB_CELLS = 10_000
+
+
+def contingency_table(
+    rows: QuestionCounter, row_column: Column,
+    columns: QuestionCounter, column_column: Column,
+    mask: Optional[np.ndarray] = None, weights: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Count the rows in every combination of answers of two questions.
+
+    Rows missing either answer are left out.
+
+    Args:
+        rows: Counter of the question along the table rows
+        row_column: Column of that question
+        columns: Counter of the question along the table columns
+        column_column: Column of that question
+        mask: Optional boolean row mask
+        weights: Optional weight of every row; weights are summed instead
+            of counting rows
+
+    Returns:
+        Counts (int64, or float64 when weighted) of shape
+        (len(rows.values), len(columns.values))
+    """
+    both = row_column.valid() & column_column.valid()
+    if mask is not None:
+        both &= mask
+
+    # Both columns are mapped over the same rows, so positions line up
+    _, row_positions = rows.positions(row_column, both)
+    _, column_positions = columns.positions(column_column, both)
+    n_columns = len(columns.values)
+    cells = row_positions * n_columns + column_positions
+
+    table = np.bincount(
+        cells, weights=None if weights is None else weights[both],
+        minlength=len(rows.values) * n_columns
+    ).reshape(len(rows.values), n_columns)
+    return table if weights is not None else table.astype(np.int64)
@@ -0,0 +1,314 @@
+"""
+Cube Module
+
+This module provides a response cube built once per loaded dataset: the
+answer counts of every categorical question in every demographic cell,
+cumulative by age.
+
+Rows are grouped by demographic cell (one combination of the equality
+filter columns) and age. Groups are ordered by (cell, age), and every
+question keeps the prefix sums of its answer counts over that order. The
+rows of a cell within an age range are then a contiguous run of groups,
+whose counts are the difference of two prefix sums. A filtered count costs
+O(selected cells x answer values), however many rows the file has.
+
+When the rows carry expansion weights, the prefix sums of the weight of
+every answer are kept the same way, so weighted counts cost the same as
+unweighted ones. Those float64 sums are several times the size of the
+counts, so they are only built by the first weighted count.
+"""
+
+import threading
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from services.column_store import ColumnStore
+from services.counting import CountingEngine
+
+
+# Questions with more distinct answers than this (open numbers, weights,
+# identifiers) are left out of the cube and counted over the rows
+MAX_CUBE_VALUES = 50
+
+
+def _count_dtype(n_rows: int) -> np.dtype:
+    """Return the smallest unsigned dtype that can hold counts up to n_rows."""
+    for dtype in (np.uint16, np.uint32):
+        if n_rows <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.uint64)
+
+
+class ResponseCube:
+    """Cumulative answer counts per (demographic cell, age) group."""
+
+    def __init__(
+        self, dimensions: Tuple[str, ...], dimension_values: Dict[str, np.ndarray],
+        cells: np.ndarray, ages: np.ndarray, group_keys: np.ndarray,
+        cumulative: np.ndarray, questions: Dict[str, Tuple[int, int]],
+        row_groups: Optional[np.ndarray] = None, weights: Optional[np.ndarray] = None,
+        store: Optional[ColumnStore] = None, engine: Optional[CountingEngine] = None
+    ):
+        """
+        Initialize the cube.
+
+        Args:
+            dimensions: Equality filter columns defining the cells
+            dimension_values: Sorted distinct values of every dimension
+            cells: int array (n_cells x n_dimensions) with the position of
+                each cell's value in dimension_values, -1 if missing
+            ages: Sorted distinct non-missing ages. Missing ages use the slot
+                len(ages).
+            group_keys: Sorted keys cell * (len(ages) + 1) + age slot of the
+                non-empty groups
+            cumulative: Cumulative counts of all questions side by side, of
+                shape (n_groups + 1, total number of values)
+            questions: Mapping of question to its (start, stop) columns in
+                cumulative, with values in the order of the question's
+                QuestionCounter
+            row_groups: Position in group_keys of the group of every row
+            weights: Optional expansion weight of every row
+            store: Column store the cube was built from, read again to build
+                the weight sums
+            engine: Counting engine the cube counts are aligned with
+        """
+        self.dimensions = dimensions
+        self.dimension_values = dimension_values
+        self.cells = cells
+        self.ages = ages
+        self.group_keys = group_keys
+        self.cumulative = cumulative
+        self.questions = questions
+        self.row_groups = row_groups
+        self.weights = weights
+        self._store = store
+        self._engine = engine
+        self._weighted_cumulative: Optional[np.ndarray] = None
+        self._weighted_lock = threading.Lock()
+
+    @classmethod
+    def build(
+        cls, store: ColumnStore, engine: CountingEngine, dimensions: Iterable[str],
+        age_column: Optional[str], questions: Optional[Iterable[str]] = None,
+        weights: Optional[np.ndarray] = None
+    ) -> "ResponseCube":
+        """
+        Build the cube of a column store.
+
+        Args:
+            store: Column store of the dataset
+            engine: Counting engine of the dataset, whose answer domains the
+                cube counts are aligned with
+            dimensions: Equality filter columns. Columns not in the store are skipped.
+            age_column: Numeric column of the cumulative age dimension, or None
+            questions: Columns to include. Defaults to every column with at
+                most MAX_CUBE_VALUES distinct answers.
+            weights: Optional expansion weight of every row, whose sums per
+                answer are built alongside the counts on first use
+
+        Returns:
+            The ResponseCube
+        """
+        n_rows = store.n_rows
+        dimension_columns = store.fetch(dimensions)
+        dimensions = tuple(dimension_columns)
+
+        # Cell of every row
+        dimension_values = {}
+        dimension_codes = []
+        for name, column in dimension_columns.items():
+            codes, uniques = pd.factorize(column.decode(), sort=True, use_na_sentinel=True)
+            dimension_values[name] = np.asarray(uniques)
+            dimension_codes.append(codes)
+        if dimension_codes:
+            cells, row_cells = np.unique(
+                np.column_stack(dimension_codes), axis=0, return_inverse=True
+            )
+            row_cells = row_cells.reshape(-1)
+        else:
+            cells = np.zeros((1, 0), dtype=np.int64)
+            row_cells = np.zeros(n_rows, dtype=np.int64)
+
+        # Age slot of every row
+        age = store.fetch([age_column]).get(age_column) if age_column else None
+        if age is not None:
+            valid = age.valid()
+            ages, age_slots = np.unique(age.decode()[valid], return_inverse=True)
+            row_ages = np.full(n_rows, len(ages), dtype=np.int64)
+            row_ages[valid] = age_slots
+        else:
+            ages = np.empty(0, dtype=np.float64)
+            row_ages = np.zeros(n_rows, dtype=np.int64)
+
+        group_keys, row_groups = np.unique(
+            row_cells * (len(ages) + 1) + row_ages, return_inverse=True
+        )
+        n_groups = len(group_keys)
+
+        names = store.columns if questions is None else questions
+        blocks = []
+        cube_questions = {}
+        n_columns = 0
+        for name, column in store.fetch(names).items():
+            counter = engine.counter(name, column)
+            if counter is None or len(counter.values) > MAX_CUBE_VALUES:
+                continue
+            n_values = len(counter.values)
+            valid, positions = counter.positions(column)
+            entries = row_groups[valid] * n_values + positions
+            counts = np.bincount(entries, minlength=n_groups * n_values).reshape(n_groups, n_values)
+            blocks.append(counts.astype(_count_dtype(n_rows)))
+            cube_questions[name] = (n_columns, n_columns + n_values)
+            n_columns += n_values
+
+        cumulative = np.zeros((n_groups + 1, n_columns), dtype=_count_dtype(n_rows))
+        if blocks:
+            np.cumsum(np.hstack(blocks), axis=0, out=cumulative[1:])
+        return cls(
+            dimensions, dimension_values, cells, ages, group_keys, cumulative, cube_questions,
+            row_groups.astype(np.int32), weights, store, engine
+        )
+
+    @property
+    def weighted_cumulative(self) -> Optional[np.ndarray]:
+        """
+        Get the float64 cumulative weight sums, with the same layout as
+        cumulative, building them on first use.
+
+        Returns:
+            The weight sums, or None if the rows are not weighted
+        """
+        if self.weights is None:
+            return None
+        if self._weighted_cumulative is None:
+            with self._weighted_lock:
+                if self._weighted_cumulative is None:
+                    self._weighted_cumulative = self._build_weighted_cumulative()
+        return self._weighted_cumulative
+
+    def _build_weighted_cumulative(self) -> np.ndarray:
+        """Sum the weights of every answer per group, in the layout of cumulative."""
+        n_groups = len(self.group_keys)
+        n_columns = self.cumulative.shape[1]
+        weighted_cumulative = np.zeros((n_groups + 1, n_columns), dtype=np.float64)
+        for name, column in self._store.fetch(self.questions).items():
+            start, stop = self.questions[name]
+            n_values = stop - start
+            valid, positions = self._engine.counter(name, column).positions(column)
+            entries = self.row_groups[valid].astype(np.int64) * n_values + positions
+            weighted_cumulative[1:, start:stop] = np.bincount(
+                entries, weights=self.weights[valid], minlength=n_groups * n_values
+            ).reshape(n_groups, n_values)
+        np.cumsum(weighted_cumulative[1:], axis=0, out=weighted_cumulative[1:])
+        return weighted_cumulative
+
+    @property
+    def nbytes(self) -> int:
+        """Return the size of the cumulative counts, and of the weight sums once built, in bytes."""
+        weighted = self._weighted_cumulative
+        return self.cumulative.nbytes + (weighted.nbytes if weighted is not None else 0)
+
+    def __contains__(self, question: str) -> bool:
+        return question in self.questions
+
+    def group_runs(
+        self, equals: Optional[Dict[str, Any]] = None,
+        age_range: Optional[Tuple[Any, Any]] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the runs of groups matching the filters.
+
+        Args:
+            equals: Mapping of dimension column to required value
+            age_range: Inclusive (min, max) age range; either bound may be
+                None. Rows with a missing age only match without a range.
+
+        Returns:
+            Tuple of (starts, ends) group positions, one run per selected cell
+        """
+        selected = np.ones(len(self.cells), dtype=bool)
+        for column, value in (equals or {}).items():
+            position = np.flatnonzero(self.dimension_values[column] == value)
+            if position.size == 0:
+                selected[:] = False
+                break
+            selected &= self.cells[:, self.dimensions.index(column)] == position[0]
+
+        slots = len(self.ages) + 1
+        first, last = 0, slots
+        if age_range is not None:
+            low, high = age_range
+            first = 0 if low is None else np.searchsorted(self.ages, low, side="left")
+            last = len(self.ages) if high is None else np.searchsorted(self.ages, high, side="right")
+            last = max(first, last)
+
+        base = np.flatnonzero(selected) * slots
+        starts = np.searchsorted(self.group_keys, base + first, side="left")
+        ends = np.searchsorted(self.group_keys, base + last, side="left")
+        return starts, ends
+
+    def counts(
+        self, question: str, equals: Optional[Dict[str, Any]] = None,
+        age_range: Optional[Tuple[Any, Any]] = None, weighted: bool = False
+    ) -> np.ndarray:
+        """
+        Count the answers of a question over the rows matching the filters.
+
+        Args:
+            question: Question in the cube
+            equals: Mapping of dimension column to required value
+            age_range: Inclusive (min, max) age range, or None
+            weighted: Whether to sum the expansion weights instead of counting
+
+        Returns:
+            int64 counts (float64 weight sums when weighted) aligned with the
+            values of the question's QuestionCounter
+        """
+        return self.counts_many([question], equals, age_range, weighted)[question]
+
+    def counts_many(
+        self, questions: Iterable[str], equals: Optional[Dict[str, Any]] = None,
+        age_range: Optional[Tuple[Any, Any]] = None, weighted: bool = False
+    ) -> Dict[str, np.ndarray]:
+        """
+        Count the answers of several questions over the rows matching the filters.
+
+        The groups are selected once and the counts of all the questions are
+        gathered in a single pass over their columns.
+
+        Args:
+            questions: Questions in the cube
+            equals: Mapping of dimension column to required value
+            age_range: Inclusive (min, max) age range, or None
+            weighted: Whether to sum the expansion weights instead of counting.
+                Requires a cube built with weights.
+
+        Returns:
+            Mapping of question to int64 counts (float64 weight sums when
+            weighted) aligned with the values of its QuestionCounter
+        """
+        questions = list(questions)
+        spans = [self.questions[question] for question in questions]
+        columns = np.concatenate(
+            [np.arange(start, stop) for start, stop in spans] or [np.empty(0, dtype=np.int64)]
+        )
+
+        cumulative = self.weighted_cumulative if weighted else self.cumulative
+        dtype = np.float64 if weighted else np.int64
+        if not equals and age_range is None:
+            totals = cumulative[-1, columns].astype(dtype)
+        else:
+            starts, ends = self.group_runs(equals, age_range)
+            # Differences per run first, so weight sums of empty runs are exactly 0
+            totals = (
+                cumulative[np.ix_(ends, columns)] - cumulative[np.ix_(starts, columns)]
+            ).sum(axis=0, dtype=dtype)
+
+        counts = {}
+        position = 0
+        for question, (start, stop) in zip(questions, spans):
+            counts[question] = totals[position:position + stop - start]
+            position += stop - start
+        return counts
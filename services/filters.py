@@ -0,0 +1,373 @@
+"""
+Filters Module
+
+This module compiles filter expressions over any variable of the survey
+into execution plans.
+
+An expression is a JSON tree:
+
+    {"variable": "Q_1", "valores": [1, 2]}       answer is one of the values
+    {"variable": "Q_75", "min": 18, "max": 30}   answer within the range
+    {"no": <expresion>}                          negation
+    {"y": [<expresion>, ...]}                    all of the expressions
+    {"o": [<expresion>, ...]}                    any of the expressions
+
+Missing answers never match a "valores" or range condition, so they do
+match its negation.
+
+Expressions are normalized to a canonical text (flattened groups, sorted
+and deduplicated operands), which keys the compiled plan cache. A plan
+evaluates the operands of every group in order of estimated selectivity,
+from per-column answer frequencies, and stops as soon as the result cannot
+change: an AND group once no row is left, an OR group once every row
+matches.
+"""
+
+import json
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.cache import LRUCache
+from services.column_store import ColumnStore
+from services.counting import CountingEngine
+from services.indexes import FilterIndex, unpack_rows
+
+
+class FilterExpressionError(ValueError):
+    """Raised when a filter expression is malformed or names an unknown variable."""
+    pass
+
+
+def _normalize_value(value):
+    """Return a JSON scalar with integral floats as ints, so 1 and 1.0 are equal."""
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise FilterExpressionError(f"Valor de filtro inválido: {value!r}")
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _sort_key(value) -> Tuple[bool, Any]:
+    """Order numbers before strings."""
+    return (isinstance(value, str), value)
+
+
+def normalize(expression: Any, columns) -> dict:
+    """
+    Validate an expression and return its canonical form.
+
+    Args:
+        expression: Filter expression (see the module docstring)
+        columns: Container of the variable names of the data
+
+    Returns:
+        Canonical expression: nested groups of the same kind flattened,
+        operands sorted by canonical text and deduplicated, values sorted
+
+    Raises:
+        FilterExpressionError: If the expression is invalid
+    """
+    if not isinstance(expression, dict):
+        raise FilterExpressionError("La expresión de filtro debe ser un objeto")
+
+    if "variable" in expression:
+        unknown = set(expression) - {"variable", "valores", "min", "max"}
+        if unknown:
+            raise FilterExpressionError(f"Claves de filtro desconocidas: {sorted(unknown)}")
+        variable = expression["variable"]
+        if not isinstance(variable, str) or variable not in columns:
+            raise FilterExpressionError(f"Variable '{variable}' no encontrada")
+
+        if "valores" in expression:
+            if "min" in expression or "max" in expression:
+                raise FilterExpressionError("Use 'valores' o 'min'/'max', no ambos")
+            values = expression["valores"]
+            if not isinstance(values, list) or not values:
+                raise FilterExpressionError("'valores' debe ser una lista no vacía")
+            values = sorted({_normalize_value(value) for value in values}, key=_sort_key)
+            return {"variable": variable, "valores": values}
+
+        low = expression.get("min")
+        high = expression.get("max")
+        if low is None and high is None:
+            raise FilterExpressionError("La condición necesita 'valores', 'min' o 'max'")
+        for bound in (low, high):
+            if bound is not None and (isinstance(bound, bool) or not isinstance(bound, (int, float))):
+                raise FilterExpressionError(f"Límite de rango inválido: {bound!r}")
+        normalized = {"variable": variable}
+        if low is not None:
+            normalized["min"] = _normalize_value(low)
+        if high is not None:
+            normalized["max"] = _normalize_value(high)
+        return normalized
+
+    if len(expression) != 1:
+        raise FilterExpressionError(
+            "Cada expresión debe tener una sola clave: 'variable', 'no', 'y' u 'o'"
+        )
+    (operator, operand), = expression.items()
+
+    if operator == "no":
+        child = normalize(operand, columns)
+        # Double negation cancels out
+        if set(child) == {"no"}:
+            return child["no"]
+        return {"no": child}
+
+    if operator in ("y", "o"):
+        if not isinstance(operand, list) or not operand:
+            raise FilterExpressionError(f"'{operator}' debe ser una lista no vacía")
+        children = {}
+        for item in operand:
+            child = normalize(item, columns)
+            # (a AND (b AND c)) is (a AND b AND c)
+            for flat in child[operator] if set(child) == {operator} else [child]:
+                children[canonical_text(flat)] = flat
+        if len(children) == 1:
+            return next(iter(children.values()))
+        return {operator: [children[text] for text in sorted(children)]}
+
+    raise FilterExpressionError(f"Operador de filtro desconocido: '{operator}'")
+
+
+def canonical_text(expression: dict) -> str:
+    """Return the canonical text of a normalized expression."""
+    return json.dumps(expression, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+class PlanNode(ABC):
+    """Node of a compiled filter plan."""
+
+    selectivity = 1.0
+
+    @abstractmethod
+    def evaluate(self, planner: "FilterPlanner", mask: np.ndarray) -> np.ndarray:
+        """
+        Narrow a row mask to the rows matching this node.
+
+        Args:
+            planner: Planner of the dataset, giving access to its columns
+            mask: Boolean row mask of the candidate rows
+
+        Returns:
+            New boolean row mask
+        """
+
+
+class ValuesNode(PlanNode):
+    """Answer of a variable is one of a set of values."""
+
+    def __init__(self, variable: str, values: List[Any], selectivity: float):
+        self.variable = variable
+        self.values = values
+        self.selectivity = selectivity
+
+    def evaluate(self, planner: "FilterPlanner", mask: np.ndarray) -> np.ndarray:
+        if planner.filter_index is not None and planner.filter_index.has_bitmap(self.variable):
+            bits = np.zeros_like(planner.filter_index.rows_equal(self.variable, self.values[0]))
+            for value in self.values:
+                bits |= planner.filter_index.rows_equal(self.variable, value)
+            return mask & unpack_rows(bits, len(mask))
+
+        column = planner.store.fetch([self.variable])[self.variable]
+        matches = np.zeros(len(mask), dtype=bool)
+        for value in self.values:
+            matches |= column.equals(value)
+        return mask & matches
+
+
+class RangeNode(PlanNode):
+    """Answer of a variable within an inclusive range."""
+
+    def __init__(self, variable: str, low, high, selectivity: float):
+        self.variable = variable
+        self.low = low
+        self.high = high
+        self.selectivity = selectivity
+
+    def evaluate(self, planner: "FilterPlanner", mask: np.ndarray) -> np.ndarray:
+        if planner.filter_index is not None and planner.filter_index.has_sorted(self.variable):
+            bits = planner.filter_index.rows_between(self.variable, self.low, self.high)
+            return mask & unpack_rows(bits, len(mask))
+
+        column = planner.store.fetch([self.variable])[self.variable]
+        return mask & column.between(self.low, self.high)
+
+
+class NotNode(PlanNode):
+    """Negation of a node."""
+
+    def __init__(self, child: PlanNode):
+        self.child = child
+        self.selectivity = 1.0 - child.selectivity
+
+    def evaluate(self, planner: "FilterPlanner", mask: np.ndarray) -> np.ndarray:
+        return mask & ~self.child.evaluate(planner, mask)
+
+
+class AndNode(PlanNode):
+    """All children match; the most selective child is evaluated first."""
+
+    def __init__(self, children: List[PlanNode]):
+        self.children = sorted(children, key=lambda child: child.selectivity)
+        self.selectivity = float(np.prod([child.selectivity for child in children]))
+
+    def evaluate(self, planner: "FilterPlanner", mask: np.ndarray) -> np.ndarray:
+        for child in self.children:
+            if not mask.any():
+                break
+            mask = child.evaluate(planner, mask)
+        return mask
+
+
+class OrNode(PlanNode):
+    """Any child matches; the least selective child is evaluated first."""
+
+    def __init__(self, children: List[PlanNode]):
+        self.children = sorted(children, key=lambda child: -child.selectivity)
+        self.selectivity = 1.0 - float(np.prod([1.0 - child.selectivity for child in children]))
+
+    def evaluate(self, planner: "FilterPlanner", mask: np.ndarray) -> np.ndarray:
+        matched = np.zeros_like(mask)
+        remaining = mask
+        for child in self.children:
+            if not remaining.any():
+                break
+            found = child.evaluate(planner, remaining)
+            matched |= found
+            remaining = remaining & ~found
+        return matched
+
+
+class FilterPlan:
+    """Compiled filter expression."""
+
+    def __init__(self, expression: dict, root: PlanNode):
+        """
+        Initialize the plan.
+
+        Args:
+            expression: Canonical expression the plan was compiled from
+            root: Root node of the plan
+        """
+        self.expression = expression
+        self.text = canonical_text(expression)
+        self.root = root
+
+    @property
+    def selectivity(self) -> float:
+        """Return the estimated fraction of rows matching the expression."""
+        return self.root.selectivity
+
+
+class FilterPlanner:
+    """Compiles filter expressions over a dataset and evaluates their plans."""
+
+    def __init__(
+        self, store: ColumnStore, counting: CountingEngine,
+        filter_index: Optional[FilterIndex] = None, max_plans: int = 256
+    ):
+        """
+        Initialize the planner.
+
+        Args:
+            store: Column store of the dataset
+            counting: Counting engine of the dataset, used for column statistics
+            filter_index: Filter index of the dataset, used for indexed columns
+            max_plans: Maximum number of compiled plans kept
+        """
+        self.store = store
+        self.counting = counting
+        self.filter_index = filter_index
+        self.plans = LRUCache(max_entries=max_plans)
+        self._stats: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._stats_lock = threading.Lock()
+
+    def compile(self, expression: Any) -> FilterPlan:
+        """
+        Compile an expression, reusing the cached plan of its canonical text.
+
+        Args:
+            expression: Filter expression (see the module docstring)
+
+        Returns:
+            The FilterPlan
+
+        Raises:
+            FilterExpressionError: If the expression is invalid
+        """
+        normalized = normalize(expression, self.store)
+        text = canonical_text(normalized)
+        plan = self.plans.get(text)
+        if plan is None:
+            plan = FilterPlan(normalized, self._compile_node(normalized))
+            self.plans.put(text, plan)
+        return plan
+
+    def evaluate(self, plan: FilterPlan, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Get the rows matching a plan.
+
+        Args:
+            plan: Compiled plan
+            mask: Optional boolean row mask of the candidate rows
+
+        Returns:
+            Boolean row mask
+        """
+        if mask is None:
+            mask = np.ones(self.store.n_rows, dtype=bool)
+        return plan.root.evaluate(self, mask)
+
+    def _compile_node(self, expression: dict) -> PlanNode:
+        if "no" in expression:
+            return NotNode(self._compile_node(expression["no"]))
+        if "y" in expression:
+            return AndNode([self._compile_node(child) for child in expression["y"]])
+        if "o" in expression:
+            return OrNode([self._compile_node(child) for child in expression["o"]])
+
+        variable = expression["variable"]
+        values, fractions = self._column_stats(variable)
+        if "valores" in expression:
+            wanted = expression["valores"]
+            wanted_set = set(wanted)
+            selected = np.array([value in wanted_set for value in values.tolist()], dtype=bool)
+            return ValuesNode(variable, wanted, float(fractions[selected].sum()))
+
+        column = self.store.fetch([variable])[variable]
+        if column.categories is not None or column.data.dtype.kind not in "iuf":
+            raise FilterExpressionError(
+                f"La variable '{variable}' no es numérica; use 'valores'"
+            )
+        low = expression.get("min")
+        high = expression.get("max")
+        selected = np.ones(len(values), dtype=bool)
+        if low is not None:
+            selected &= values >= low
+        if high is not None:
+            selected &= values <= high
+        return RangeNode(variable, low, high, float(fractions[selected].sum()))
+
+    def _column_stats(self, variable: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the answer values of a column and the fraction of rows holding each.
+
+        Computed once per column.
+        """
+        stats = self._stats.get(variable)
+        if stats is not None:
+            return stats
+
+        column = self.store.fetch([variable])[variable]
+        counter = self.counting.counter(variable, column)
+        if counter is not None:
+            values, counts = counter.values, counter.count(column)
+        else:
+            values, counts = column.value_counts()
+        fractions = counts / max(self.store.n_rows, 1)
+        with self._stats_lock:
+            return self._stats.setdefault(variable, (values, fractions))
@@ -0,0 +1,353 @@
+"""
+Indexes Module
+
+This module provides row indexes built once per loaded dataset, so filters
+resolve without scanning the filter columns on every request.
+
+Row sets are packed bitsets: one bit per row, eight rows per byte (see
+np.packbits). Combining filters is a bytewise AND over n_rows / 8 bytes.
+Equality filters use one bitset per value; range filters binary-search a
+column sorted once, and take the rows below each distinct value from
+cumulative bitsets.
+"""
+
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from services.column_store import Column, ColumnStore
+
+
+def pack_rows(mask: np.ndarray) -> np.ndarray:
+    """Pack a boolean row mask into a bitset."""
+    return np.packbits(mask)
+
+
+def unpack_rows(bits: np.ndarray, n_rows: int) -> np.ndarray:
+    """Unpack a bitset into a boolean row mask of n_rows rows."""
+    return np.unpackbits(bits, count=n_rows).view(bool)
+
+
+def all_rows(n_rows: int) -> np.ndarray:
+    """Return the bitset selecting every row."""
+    return pack_rows(np.ones(n_rows, dtype=bool))
+
+
+# Number of set bits of every byte value, for numpy versions without
+# np.bitwise_count
+_BYTE_POPCOUNT = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint8)
+
+
+def as_words(bits: np.ndarray) -> np.ndarray:
+    """
+    View bitsets as 64-bit words, so they combine eight bytes per operation.
+
+    Args:
+        bits: Packed bitsets along the last axis (uint8)
+
+    Returns:
+        uint64 array; the last axis is zero-padded to a whole number of words
+    """
+    padding = -bits.shape[-1] % 8
+    if padding:
+        bits = np.concatenate(
+            [bits, np.zeros(bits.shape[:-1] + (padding,), dtype=np.uint8)], axis=-1
+        )
+    return np.ascontiguousarray(bits).view(np.uint64)
+
+
+def count_rows(words: np.ndarray) -> np.ndarray:
+    """
+    Count the rows selected by bitsets (popcount along the last axis).
+
+    Args:
+        words: Bitsets as bytes or words (see as_words)
+
+    Returns:
+        int64 count of every bitset
+    """
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+    return _BYTE_POPCOUNT[words.view(np.uint8)].sum(axis=-1, dtype=np.int64)
+
+
+class BitmapIndex:
+    """One packed bitset per distinct value of a column."""
+
+    def __init__(self, bitsets: Dict[Any, np.ndarray], n_rows: int):
+        """
+        Initialize the index.
+
+        Args:
+            bitsets: Mapping of value (as it appears decoded) to the bitset of
+                the rows holding it
+            n_rows: Number of rows of the column
+        """
+        self._bitsets = bitsets
+        self._empty = np.zeros((n_rows + 7) // 8, dtype=np.uint8)
+
+    @classmethod
+    def build(cls, column: Column) -> "BitmapIndex":
+        """
+        Build the index of a column.
+
+        Args:
+            column: Column to index
+
+        Returns:
+            The BitmapIndex
+        """
+        values, _ = column.value_counts()
+        bitsets = {value: pack_rows(column.equals(value)) for value in values.tolist()}
+        return cls(bitsets, len(column.data))
+
+    @property
+    def nbytes(self) -> int:
+        """Return the size of the bitsets in bytes."""
+        return sum(bits.nbytes for bits in self._bitsets.values())
+
+    def rows_equal(self, value) -> np.ndarray:
+        """
+        Get the bitset of the rows equal to a value.
+
+        Args:
+            value: Value to look up. Values not in the column match no rows.
+
+        Returns:
+            Packed bitset (read-only)
+        """
+        try:
+            return self._bitsets.get(value, self._empty)
+        except TypeError:
+            # Unhashable values never match
+            return self._empty
+
+
+# Widest range column given cumulative bitsets; columns with more distinct
+# values (incomes, durations) build the bitset of each range from its row ids
+MAX_CUMULATIVE_BITSETS = 256
+
+
+class SortedIndex:
+    """Row ids of the non-missing values of a column, sorted by value once."""
+
+    def __init__(
+        self, distinct: np.ndarray, boundaries: np.ndarray, row_ids: np.ndarray, n_rows: int,
+        below: Optional[np.ndarray] = None
+    ):
+        """
+        Initialize the index.
+
+        Args:
+            distinct: Distinct non-missing values of the column, sorted ascending
+            boundaries: Position in row_ids where each distinct value starts,
+                followed by len(row_ids)
+            row_ids: Row ids of the non-missing values, ordered by value
+            n_rows: Number of rows of the column
+            below: Packed bitsets (len(boundaries) x n_rows / 8) of the rows
+                before each boundary, or None to scatter row ids instead
+        """
+        self.distinct = distinct
+        self.boundaries = boundaries
+        self.row_ids = row_ids
+        self.n_rows = n_rows
+        self._below = below
+
+    @classmethod
+    def build(cls, column: Column) -> "SortedIndex":
+        """
+        Build the index of a numeric column.
+
+        Args:
+            column: Column to index
+
+        Returns:
+            The SortedIndex
+        """
+        row_ids = np.flatnonzero(column.valid())
+        data = column.data if column.missing is not None else column.decode()
+        values = data[row_ids]
+        order = np.argsort(values, kind="stable")
+        row_ids = row_ids[order].astype(np.int32)
+        distinct, starts = np.unique(values[order], return_index=True)
+        boundaries = np.append(starts, len(row_ids))
+        n_rows = len(column.data)
+        if len(distinct) > MAX_CUMULATIVE_BITSETS:
+            return cls(distinct, boundaries, row_ids, n_rows)
+
+        below = np.zeros((len(boundaries), (n_rows + 7) // 8), dtype=np.uint8)
+        mask = np.zeros(n_rows, dtype=bool)
+        for position in range(1, len(boundaries)):
+            mask[row_ids[boundaries[position - 1]:boundaries[position]]] = True
+            below[position] = pack_rows(mask)
+        return cls(distinct, boundaries, row_ids, n_rows, below)
+
+    @property
+    def nbytes(self) -> int:
+        """Return the size of the row ids and cumulative bitsets in bytes."""
+        below = self._below.nbytes if self._below is not None else 0
+        return int(self.distinct.nbytes + self.boundaries.nbytes + self.row_ids.nbytes + below)
+
+    def _span(self, low, high) -> Tuple[int, int]:
+        """
+        Binary-search the distinct values within an inclusive range.
+
+        Only the distinct values are searched: a Python bound would make
+        np.searchsorted cast a whole narrow-integer column.
+
+        Returns:
+            Positions in distinct of the first and past the last value
+        """
+        start = 0 if low is None else int(np.searchsorted(self.distinct, low, side="left"))
+        stop = len(self.distinct) if high is None else int(
+            np.searchsorted(self.distinct, high, side="right")
+        )
+        return start, max(start, stop)
+
+    def row_ids_between(self, low=None, high=None) -> np.ndarray:
+        """
+        Get the ids of the rows within an inclusive range, by binary search.
+
+        Args:
+            low: Minimum value, or None for no lower bound
+            high: Maximum value, or None for no upper bound
+
+        Returns:
+            Slice of the row ids, ordered by value
+        """
+        start, stop = self._span(low, high)
+        return self.row_ids[self.boundaries[start]:self.boundaries[stop]]
+
+    def rows_between(self, low=None, high=None) -> np.ndarray:
+        """
+        Get the bitset of the rows within an inclusive range.
+
+        A range spans whole distinct values, so its rows are the rows below
+        its end without the rows below its start: one XOR of two cumulative
+        bitsets.
+
+        Args:
+            low: Minimum value, or None for no lower bound
+            high: Maximum value, or None for no upper bound
+
+        Returns:
+            Packed bitset
+        """
+        start, stop = self._span(low, high)
+        if self._below is not None:
+            return self._below[stop] ^ self._below[start]
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[self.row_ids[self.boundaries[start]:self.boundaries[stop]]] = True
+        return pack_rows(mask)
+
+
+class FilterIndex:
+    """Bitmap indexes of the equality filter columns and sorted indexes of the range ones."""
+
+    def __init__(
+        self, indexes: Dict[str, BitmapIndex], n_rows: int,
+        sorted_indexes: Optional[Dict[str, SortedIndex]] = None
+    ):
+        """
+        Initialize the filter index.
+
+        Args:
+            indexes: Mapping of column name to its BitmapIndex
+            n_rows: Number of rows of the dataset
+            sorted_indexes: Mapping of column name to its SortedIndex
+        """
+        self._indexes = indexes
+        self._sorted_indexes = sorted_indexes or {}
+        self.n_rows = n_rows
+
+    @classmethod
+    def build(
+        cls, store: ColumnStore, columns: Iterable[str], range_columns: Iterable[str] = ()
+    ) -> "FilterIndex":
+        """
+        Index the given columns of a store. Columns not in the store are skipped.
+
+        Args:
+            store: Column store of the dataset
+            columns: Names of the equality filter columns
+            range_columns: Names of the range filter columns
+
+        Returns:
+            The FilterIndex
+        """
+        fetched = store.fetch(columns)
+        fetched_ranges = store.fetch(range_columns)
+        return cls(
+            {name: BitmapIndex.build(column) for name, column in fetched.items()},
+            store.n_rows,
+            {name: SortedIndex.build(column) for name, column in fetched_ranges.items()},
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """Return the size of all indexes in bytes."""
+        return (
+            sum(index.nbytes for index in self._indexes.values())
+            + sum(index.nbytes for index in self._sorted_indexes.values())
+        )
+
+    def __contains__(self, column: str) -> bool:
+        return column in self._indexes or column in self._sorted_indexes
+
+    def has_bitmap(self, column: str) -> bool:
+        """Return whether a column has a bitmap index."""
+        return column in self._indexes
+
+    def has_sorted(self, column: str) -> bool:
+        """Return whether a column has a sorted index."""
+        return column in self._sorted_indexes
+
+    def rows_equal(self, column: str, value) -> np.ndarray:
+        """
+        Get the bitset of the rows where a filter column equals a value.
+
+        Args:
+            column: Indexed column name
+            value: Value to look up
+
+        Returns:
+            Packed bitset (read-only)
+        """
+        return self._indexes[column].rows_equal(value)
+
+    def rows_between(self, column: str, low=None, high=None) -> np.ndarray:
+        """
+        Get the bitset of the non-missing rows of a range column within [low, high].
+
+        Args:
+            column: Range-indexed column name
+            low: Minimum value, or None for no lower bound
+            high: Maximum value, or None for no upper bound
+
+        Returns:
+            Packed bitset
+        """
+        return self._sorted_indexes[column].rows_between(low, high)
+
+    def match(
+        self, equals: Dict[str, Any], ranges: Optional[Dict[str, Tuple[Any, Any]]] = None,
+        bits: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Intersect equality and range conditions on indexed columns.
+
+        Args:
+            equals: Mapping of column name to required value
+            ranges: Mapping of column name to an inclusive (min, max) range;
+                either bound may be None
+            bits: Bitset to narrow. Defaults to every row.
+
+        Returns:
+            New packed bitset of the matching rows
+        """
+        bits = all_rows(self.n_rows) if bits is None else bits.copy()
+        for column, value in equals.items():
+            bits &= self.rows_equal(column, value)
+        for column, (low, high) in (ranges or {}).items():
+            bits &= self.rows_between(column, low, high)
+        return bits
@@ -0,0 +1,253 @@
+"""
+Multi-Response Module
+
+This module aggregates multiple-response questions, which the survey
+stores as one column per mention: Q_34_O1 holds the code of the first
+activity a respondent named, Q_34_O2 the second one, and so on.
+
+The mention columns of a set are turned once into one packed bitset per
+option (one bit per respondent, set where the respondent named the option),
+plus a last bitset marking the respondents who named any option. A set
+takes n_rows / 8 bytes per option instead of 8 bytes per mention cell.
+Filtered selections are word-wide ANDs of the option bitsets with the
+filter bitset followed by a popcount; weighted selections unpack the
+intersected bitsets into an indicator matrix and take a single
+matrix-vector product with the weights. The option co-occurrence matrix
+is likewise one (weighted) product of that indicator matrix with its
+transpose.
+"""
+
+import re
+import threading
+import unicodedata
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from services.column_store import Column, ColumnStore
+from services.counting import label_array
+from services.indexes import as_words, count_rows
+
+
+# Mention columns of a multiple-response set: <question>_O<mention number>
+MULTI_RESPONSE_PATTERN = re.compile(r'^(Q_\d+)_O(\d+)$')
+
+# Labels of the answers that name no actual option: "Ninguna de las
+# anteriores", "Ningún", "No sabe/No contestó", "No aplica". Matched
+# against the label without accents (see _strip_accents).
+NON_SUBSTANTIVE_LABEL = re.compile(
+    r'^\s*(ningun[oa]?\b|no sabe|no contest|no aplica)', re.IGNORECASE
+)
+
+
+def _strip_accents(text: str) -> str:
+    """Remove the accents of a text ("Ningún" -> "Ningun")."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def detect_sets(column_names: Iterable[str]) -> Dict[str, Tuple[str, ...]]:
+    """
+    Group the mention columns of the multiple-response sets.
+
+    Args:
+        column_names: Column names of the file
+
+    Returns:
+        Mapping of set identifier (e.g. Q_34) to its columns ordered by
+        mention number, for the sets with at least two columns
+    """
+    groups = {}
+    for name in column_names:
+        match = MULTI_RESPONSE_PATTERN.match(name)
+        if match:
+            groups.setdefault(match.group(1), []).append((int(match.group(2)), name))
+    return {
+        base: tuple(name for _, name in sorted(columns))
+        for base, columns in groups.items() if len(columns) > 1
+    }
+
+
+class MultiResponseSet:
+    """Option bitsets of a multiple-response set."""
+
+    def __init__(self, values: np.ndarray, labels: np.ndarray, bitsets: np.ndarray, n_rows: int):
+        """
+        Initialize the set.
+
+        Args:
+            values: Sorted option codes
+            labels: Label of each option
+            bitsets: uint64 words (see services.indexes.as_words) of shape
+                (len(values) + 1, n_words), the bitset of the respondents who
+                named each option; the last one selects the respondents who
+                named any option
+            n_rows: Number of respondents
+        """
+        self.values = values
+        self.labels = labels
+        self.bitsets = bitsets
+        self.n_rows = n_rows
+
+    @classmethod
+    def build(cls, columns: Dict[str, Column], value_labels: dict) -> "MultiResponseSet":
+        """
+        Build the set from its mention columns.
+
+        Negative codes ("No aplica") and missing mentions are not options.
+
+        Args:
+            columns: Mapping of mention column name to Column
+            value_labels: Value labels of the questions of the file
+
+        Returns:
+            The MultiResponseSet
+        """
+        codes = np.column_stack([column.decode().astype(np.float64) for column in columns.values()])
+        named = ~np.isnan(codes)
+        named[named] = codes[named] >= 0
+        values = np.unique(codes[named])
+
+        labels = {}
+        for name in columns:
+            labels.update(value_labels.get(name, {}))
+
+        rows = np.nonzero(named)[0]
+        indicators = np.zeros((len(values) + 1, len(codes)), dtype=bool)
+        indicators[np.searchsorted(values, codes[named]), rows] = True
+        indicators[-1] = named.any(axis=1)
+        bitsets = as_words(np.packbits(indicators, axis=1))
+        return cls(values, label_array(values, labels), bitsets, len(codes))
+
+    def non_substantive(self) -> np.ndarray:
+        """
+        Get which options name no actual option (none of the above, don't
+        know), by their value labels.
+
+        Returns:
+            Boolean array aligned with values
+        """
+        return np.array(
+            [
+                NON_SUBSTANTIVE_LABEL.match(_strip_accents(str(label))) is not None
+                for label in self.labels.tolist()
+            ],
+            dtype=bool
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """Return the size of the bitsets in bytes."""
+        return self.bitsets.nbytes
+
+    def selected(self, bits: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Intersect the option bitsets with a filter bitset.
+
+        Args:
+            bits: Optional packed bitset of the filtered rows (see
+                services.indexes)
+
+        Returns:
+            uint64 words shaped like bitsets
+        """
+        return self.bitsets if bits is None else self.bitsets & as_words(bits)
+
+    def indicators(self, words: np.ndarray) -> np.ndarray:
+        """
+        Unpack option bitsets into an indicator matrix.
+
+        Args:
+            words: Option bitsets (see selected)
+
+        Returns:
+            uint8 matrix (n_bitsets x n_rows), 1 where the row is in the bitset
+        """
+        return np.unpackbits(words.view(np.uint8), axis=1, count=self.n_rows)
+
+    def tally(
+        self, bits: Optional[np.ndarray] = None, weights: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, float]:
+        """
+        Count the selections of every option.
+
+        Args:
+            bits: Optional packed bitset of the filtered rows
+            weights: Optional weight of every row; weights are summed instead
+                of counting rows
+
+        Returns:
+            Tuple of (selections aligned with values, respondents who named
+            any option), int64 and int, or float64 and float when weighted
+        """
+        words = self.selected(bits)
+        if weights is None:
+            totals = count_rows(words)
+        else:
+            totals = self.indicators(words) @ weights
+        return totals[:-1], totals[-1]
+
+    def cooccurrence(
+        self, bits: Optional[np.ndarray] = None, weights: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Count the respondents who named every pair of options.
+
+        Args:
+            bits: Optional packed bitset of the filtered rows
+            weights: Optional weight of every row; weights are summed instead
+                of counting rows
+
+        Returns:
+            Matrix (int64, or float64 when weighted) of shape
+            (len(values) + 1, len(values) + 1). Entry (i, j) counts the
+            respondents who named options i and j, so the diagonal holds the
+            selections; the last row and column hold the selections too and
+            their last entry the respondents who named any option.
+        """
+        indicators = self.indicators(self.selected(bits)).astype(np.float64)
+        weighted = indicators if weights is None else indicators * weights
+        matrix = weighted @ indicators.T
+        if weights is None:
+            matrix = np.rint(matrix).astype(np.int64)
+        return matrix
+
+
+class MultiResponseEngine:
+    """Multiple-response sets of a dataset, built on first use of each set."""
+
+    def __init__(self, store: ColumnStore, meta, sets: Dict[str, Tuple[str, ...]]):
+        """
+        Initialize the engine.
+
+        Args:
+            store: Column store of the dataset
+            meta: pyreadstat metadata container of the dataset
+            sets: Mapping of set identifier to its mention columns (see detect_sets)
+        """
+        self._store = store
+        self._value_labels = meta.variable_value_labels if meta.variable_value_labels else {}
+        self.sets = sets
+        self._built: Dict[str, MultiResponseSet] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, base: str) -> bool:
+        return base in self.sets
+
+    def get(self, base: str) -> MultiResponseSet:
+        """
+        Get a set, building its bitsets once.
+
+        Args:
+            base: Set identifier (e.g. Q_34)
+
+        Returns:
+            The MultiResponseSet
+        """
+        try:
+            return self._built[base]
+        except KeyError:
+            pass
+        built = MultiResponseSet.build(self._store.fetch(self.sets[base]), self._value_labels)
+        with self._lock:
+            return self._built.setdefault(base, built)
@@ -5,11 +5,35 @@ This module handles all the logic for reading and extracting data from SPSS .sav
 It provides functions for loading data, caching, and parsing questions and responses.
 """
 
+import multiprocessing
 import os
 import re
-from typing import Any, Tuple, Optional, List
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, Tuple, Optional, List
+import numpy as np
 import pyreadstat
 
+from services.aggregates import SurveyAggregates, stream_aggregates
+from services.batteries import BatteryEngine, detect_batteries, split_labels
+from services.cache import LRUCache
+from services.column_store import (
+    Column, ColumnStore, LazyColumnStore, file_fingerprint, file_sha256, read_snapshot,
+    read_snapshot_metadata, snapshot_path_for, write_snapshot
+)
+from services.charts import heatmap, stacked_bar
+from services.counting import CountingEngine, label_array, row_weights
+from services.crosstab import MAX_CROSSTAB_CELLS, contingency_table
+from services.cube import ResponseCube
+from services.filters import FilterExpressionError, FilterPlan, FilterPlanner
+from services.indexes import FilterIndex, pack_rows, unpack_rows
+from services.multiresponse import MultiResponseEngine, detect_sets
+from services.statistics import StatisticsCube, describe, is_numeric
+from services.turf import search as turf_search
+
 
 # Category definitions with id, name, and description
 CATEGORIAS = [
@@ -86,6 +110,21 @@ CATEGORIAS_BY_ID = {cat["id"]: cat for cat in CATEGORIAS}
 # Precompiled regex pattern for extracting question numbers
 QUESTION_ID_PATTERN = re.compile(r'^(?:T_)?Q_(\d+)(?:_.*)?$')
 
+# Simple equality filter mappings: filter_key -> column_name
+SIMPLE_FILTERS = {
+    "calidad_vida": "CALIDAD_VIDA",
+    "municipio": "Q_94",
+    "sexo": "SEXO",
+    "escolaridad": "ESC",
+    "nse": "NSE2024_C"
+}
+
+# Column with the actual age in years, used by the edad range filter
+AGE_COLUMN = "Q_75"
+
+# Expansion factor of each respondent
+WEIGHT_COLUMN = "FACTOR"
+
 
 def get_categoria_for_question(identificador: str) -> Optional[dict]:
     """
@@ -175,6 +214,33 @@ def get_categoria_for_question(identificador: str) -> Optional[dict]:
     return None
 
 
+def _result_nbytes(result: Tuple[np.ndarray, np.ndarray, np.ndarray]) -> int:
+    """Estimate the size in bytes of cached (valores, etiquetas, cantidades)."""
+    valores, etiquetas, cantidades = result
+    nbytes = valores.nbytes + etiquetas.nbytes + cantidades.nbytes
+    for array in (valores, etiquetas):
+        if array.dtype == object:
+            nbytes += sum(sys.getsizeof(value) for value in array.tolist())
+    return nbytes
+
+
+def _summary_nbytes(summary: dict) -> int:
+    """Estimate the size in bytes of a cached flat dictionary, keys and values included."""
+    return sys.getsizeof(summary) + sum(
+        sys.getsizeof(key) + sys.getsizeof(value) for key, value in summary.items()
+    )
+
+
+def _amount(value, weighted: bool):
+    """Format a count for a response: weighted sums are rounded, counts stay integers."""
+    return round(float(value), 2) if weighted else int(value)
+
+
+def _share(value, total) -> float:
+    """Return value as a percentage of total, rounded; 0 when the total is 0."""
+    return round(float(value) / float(total) * 100, 2) if total > 0 else 0
+
+
 class SAVReaderError(Exception):
     """Custom exception for SAV reader errors."""
     pass
@@ -190,19 +256,149 @@ class CategoryNotFoundError(SAVReaderError):
     pass
 
 
+class InvalidFilterError(SAVReaderError):
+    """Exception raised when a filter expression is invalid."""
+    pass
+
+
+class InvalidVariableError(SAVReaderError):
+    """Exception raised when a variable cannot be used in the requested analysis."""
+    pass
+
+
+class UnsupportedInModeError(SAVReaderError):
+    """Exception raised when a question or analysis is not available in streaming mode."""
+    pass
+
+
+@dataclass(frozen=True)
+class Catalog:
+    """
+    Immutable question catalog: the SAV metadata and the parsed questions.
+    
+    Attributes:
+        meta: pyreadstat metadata container
+        preguntas: List of question dictionaries (see load_preguntas)
+        source: Fingerprint (size, mtime_ns and, once known, sha256) of the
+            SAV file the catalog was read from
+        conjuntos: Multiple-response sets, mapping each set identifier
+            (e.g. Q_34) to its mention columns
+        baterias: Rating batteries, mapping each battery identifier
+            (e.g. T_Q_25) to its item columns
+    """
+    meta: Any
+    preguntas: list
+    source: dict
+    conjuntos: dict
+    baterias: dict
+
+
+@dataclass(frozen=True)
+class Dataset:
+    """
+    Immutable snapshot of the loaded data.
+    
+    A Dataset is built once and then published by a single reference
+    assignment, so readers can use it without taking any lock.
+    
+    ``results`` caches computed response counts for this data only, so a
+    reload starts with an empty cache. ``filter_index`` holds bitmaps of the
+    demographic filter columns, ``counting`` the ordered answer domains and
+    labels of the questions, ``cube`` the answer counts of the
+    categorical questions per demographic cell and age (columns loaded on
+    demand have no cube), ``statistics`` the moments and histograms of the
+    wider numeric questions per cube group, ``multi_response`` the option
+    indicators of the multiple-response sets, ``batteries`` the scale
+    positions of the rating batteries, ``filter_planner`` the
+    compiled filter expressions and ``weights`` the expansion weight of every row, if the
+    file has one. In streaming mode the rows are not kept: ``store``
+    is None and responses are answered from ``aggregates``.
+    """
+    store: Optional[ColumnStore]
+    meta: Any
+    results: LRUCache
+    aggregates: Optional[SurveyAggregates] = None
+    filter_index: Optional[FilterIndex] = None
+    counting: Optional[CountingEngine] = None
+    cube: Optional[ResponseCube] = None
+    filter_planner: Optional[FilterPlanner] = None
+    weights: Optional[np.ndarray] = None
+    statistics: Optional[StatisticsCube] = None
+    multi_response: Optional[MultiResponseEngine] = None
+    batteries: Optional[BatteryEngine] = None
+
+
 class SAVReader:
-    """Class to handle reading and caching of SAV file data."""
+    """
+    Class to handle reading and caching of SAV file data.
+    
+    Loading is single-flight: when several threads need the data or the
+    question catalog before it is cached, exactly one of them loads it while
+    the others wait for the result.
+    
+    The catalog and the data are immutable snapshots. When the SAV file
+    changes, reload builds new ones in the calling thread and swaps them in,
+    so requests in flight finish on the old snapshots and no request waits
+    for the reload.
+    """
     
-    def __init__(self, file_path: str):
+    def __init__(
+        self, file_path: str, cache_dir: Optional[str] = None, use_snapshot: bool = True,
+        column_budget_bytes: Optional[int] = None, streaming: bool = False,
+        chunksize: int = 100_000, parse_workers: int = 1, turf_workers: int = 1,
+        result_cache_entries: Optional[int] = 4096,
+        result_cache_bytes: Optional[int] = 16 * 1024 * 1024
+    ):
         """
         Initialize the SAV reader with a file path.
         
         Args:
             file_path: Path to the SAV file
+            cache_dir: Directory for the columnar snapshot cache. Defaults to a
+                ``.sav_cache`` directory next to the SAV file.
+            use_snapshot: Whether to open a memory-mapped columnar snapshot
+                instead of parsing the SAV file into private memory
+            column_budget_bytes: If set, columns are loaded on demand and at
+                most this many bytes of them are kept resident (LRU), instead
+                of loading the whole file. Snapshots are not used in this mode.
+            streaming: If True, the file is read in chunks and only per-question
+                aggregates over the filter variables are kept (see
+                services.aggregates), so memory does not grow with the number
+                of rows. Row data and snapshots are not used in this mode.
+            chunksize: Rows per chunk in streaming mode
+            parse_workers: Number of processes that parse the SAV file, each
+                reading a range of rows. 1 parses in the calling process.
+            turf_workers: Number of processes that share large exhaustive
+                TURF searches. 1 searches in the calling thread. The pool is
+                started with the "spawn" method, so the server's threads are
+                never forked, and stopped by shutdown_workers.
+            result_cache_entries: Maximum number of cached response counts
+            result_cache_bytes: Maximum total size of the cached response
+                counts in bytes
         """
         self._file_path = file_path
-        self._cached_data = None
-        self._cached_preguntas = None
+        self._cache_dir = cache_dir
+        self._snapshot_path = snapshot_path_for(file_path, cache_dir)
+        self._streaming = streaming
+        self._chunksize = chunksize
+        self._parse_workers = max(1, parse_workers)
+        self._turf_workers = max(1, turf_workers)
+        self._turf_pool = None
+        self._turf_pool_lock = threading.Lock()
+        self._result_cache_entries = result_cache_entries
+        self._result_cache_bytes = result_cache_bytes
+        self._use_snapshot = use_snapshot and column_budget_bytes is None and not streaming
+        self._column_budget_bytes = column_budget_bytes
+        self._catalog = None
+        self._dataset = None
+        self._catalog_lock = threading.Lock()
+        self._data_lock = threading.Lock()
+        # Change detection and reloads
+        self._reload_lock = threading.Lock()
+        self._pending_source = None
+        self._failed_source = None
+        self._watcher = None
+        self._watcher_stop = None
     
     @property
     def file_path(self) -> str:
@@ -211,50 +407,334 @@ class SAVReader:
     
     def load_data(self) -> Tuple[Any, Any]:
         """
-        Load and cache the dataframe and metadata from the SAV file.
+        Load and cache the column store and metadata from the SAV file.
+        
+        When snapshots are enabled, the columnar snapshot matching the current
+        SAV file is memory-mapped, so all worker processes share the same
+        pages. If there is no snapshot yet, the file is parsed, its columns
+        are encoded compactly, and the snapshot is written and then mapped.
+        Without snapshots the encoded columns are kept in private memory.
+        
+        With a column budget, only the metadata is read here and columns are
+        loaded on demand by a LazyColumnStore.
         
         Returns:
-            Tuple of (DataFrame, metadata)
+            Tuple of (ColumnStore, metadata)
+            
+        Raises:
+            SAVReaderError: If file not found, error reading the file, or the
+                reader is in streaming mode
+        """
+        dataset = self._load_dataset()
+        if dataset.store is None:
+            raise SAVReaderError("Row data is not loaded in streaming mode")
+        return dataset.store, dataset.meta
+    
+    def _load_dataset(self) -> Dataset:
+        """
+        Get the published Dataset, loading it exactly once.
+        
+        Returns:
+            The loaded Dataset
             
         Raises:
             SAVReaderError: If file not found or error reading the file
         """
-        if self._cached_data is not None:
-            return self._cached_data
+        dataset = self._dataset
+        if dataset is not None:
+            return dataset
+        
+        # Load the catalog first so its fingerprint tracks the loaded file
+        catalog = self._load_catalog()
+        
+        with self._data_lock:
+            # Another thread may have published it while we waited
+            if self._dataset is None:
+                self._dataset = self._build_dataset(catalog)
+            return self._dataset
+    
+    def _build_dataset(self, catalog: Catalog) -> Dataset:
+        """
+        Load the data from the snapshot or the SAV file (see load_data).
         
+        Args:
+            catalog: Catalog of the same file, whose metadata lazy stores use
+            
+        Returns:
+            A new Dataset
+            
+        Raises:
+            SAVReaderError: If file not found or error reading the file
+        """
         if not os.path.exists(self._file_path):
             raise SAVReaderError(f"Data file not found: {self._file_path}")
         
+        if self._streaming:
+            return Dataset(
+                None, catalog.meta, self._new_result_cache(),
+                aggregates=self._stream_aggregates()
+            )
+        
+        store, meta = self._load_store(catalog)
+        filter_index = FilterIndex.build(store, SIMPLE_FILTERS.values(), [AGE_COLUMN])
+        counting = CountingEngine(store, meta)
+        weights = None
+        if WEIGHT_COLUMN in store:
+            weights = row_weights(store.fetch([WEIGHT_COLUMN])[WEIGHT_COLUMN])
+        cube = None
+        statistics = None
+        if not isinstance(store, LazyColumnStore):
+            # The cubes read every column, which would defeat the column budget
+            cube = ResponseCube.build(
+                store, counting, SIMPLE_FILTERS.values(), AGE_COLUMN, weights=weights
+            )
+            statistics = StatisticsCube.build(store, counting, cube, weights)
+        return Dataset(
+            store, meta, self._new_result_cache(), filter_index=filter_index,
+            counting=counting, cube=cube,
+            filter_planner=FilterPlanner(store, counting, filter_index), weights=weights,
+            statistics=statistics,
+            multi_response=MultiResponseEngine(store, meta, catalog.conjuntos),
+            batteries=BatteryEngine(store, meta, catalog.baterias)
+        )
+    
+    def _new_result_cache(self) -> LRUCache:
+        """Create an empty result cache with the configured bounds."""
+        return LRUCache(self._result_cache_entries, self._result_cache_bytes)
+    
+    def _load_store(self, catalog: Catalog) -> Tuple[ColumnStore, Any]:
+        """
+        Load the column store from the snapshot or the SAV file.
+        
+        Args:
+            catalog: Catalog of the same file, whose metadata lazy stores use
+            
+        Returns:
+            Tuple of (ColumnStore, metadata)
+            
+        Raises:
+            SAVReaderError: If there's an error reading the file
+        """
+        if self._column_budget_bytes is not None:
+            meta = catalog.meta
+            store = LazyColumnStore(
+                meta.column_names, meta.number_rows, self._read_columns,
+                self._column_budget_bytes
+            )
+            return store, meta
+        
+        if self._use_snapshot:
+            restored = read_snapshot(self._snapshot_path, self._file_path)
+            if restored is not None:
+                return restored
+            # Fingerprint before parsing so a concurrent replacement of the
+            # file cannot be recorded under the new file's fingerprint
+            fingerprint = file_fingerprint(self._file_path)
+        
+        df, meta = self._parse_file()
+        store = ColumnStore.from_frame(df)
+        del df
+        
+        if self._use_snapshot:
+            mapped = self._write_snapshot(store, meta, fingerprint)
+            if mapped is not None:
+                return mapped
+        
+        return store, meta
+    
+    def _parse_file(self):
+        """
+        Parse the whole SAV file, splitting it by row ranges across
+        parse_workers processes when more than one is configured.
+        
+        Returns:
+            Tuple of (DataFrame, metadata)
+            
+        Raises:
+            SAVReaderError: If there's an error reading the file
+        """
+        try:
+            if self._parse_workers > 1:
+                return pyreadstat.read_file_multiprocessing(
+                    pyreadstat.read_sav, self._file_path, num_processes=self._parse_workers
+                )
+            return pyreadstat.read_sav(self._file_path)
+        except Exception as e:
+            raise SAVReaderError(f"Error reading data file: {str(e)}")
+    
+    def _write_snapshot(
+        self, store: ColumnStore, meta, fingerprint: dict
+    ) -> Optional[Tuple[ColumnStore, Any]]:
+        """
+        Write the columnar snapshot for the parsed data and map it.
+        
+        A snapshot that cannot be written (e.g. read-only filesystem) only
+        means this process keeps a private copy, so errors are ignored.
+        
+        Returns:
+            Tuple of (ColumnStore, metadata) backed by the snapshot, or None
+            if it could not be written
+        """
+        try:
+            write_snapshot(store, meta, self._snapshot_path, fingerprint)
+        except OSError:
+            return None
+        return read_snapshot(self._snapshot_path, self._file_path)
+    
+    def _stream_aggregates(self) -> SurveyAggregates:
+        """
+        Get the aggregates of the SAV file, streaming it if they are not persisted.
+        
+        Returns:
+            The SurveyAggregates
+            
+        Raises:
+            SAVReaderError: If there's an error reading the file
+        """
+        def read_chunks():
+            return pyreadstat.read_file_in_chunks(
+                pyreadstat.read_sav, self._file_path, chunksize=self._chunksize,
+                multiprocess=self._parse_workers > 1, num_processes=self._parse_workers
+            )
+        
+        try:
+            return stream_aggregates(
+                read_chunks, self._file_path, [*SIMPLE_FILTERS.values(), AGE_COLUMN],
+                WEIGHT_COLUMN, self._cache_dir
+            )
+        except Exception as e:
+            raise SAVReaderError(f"Error reading data file: {str(e)}")
+    
+    def _read_columns(self, columns: List[str]) -> Dict[str, Column]:
+        """
+        Read and encode only the given columns of the SAV file.
+        
+        Args:
+            columns: Column names to read
+            
+        Returns:
+            Mapping of column name to encoded Column
+            
+        Raises:
+            SAVReaderError: If there's an error reading the file
+        """
         try:
-            df, meta = pyreadstat.read_sav(self._file_path)
+            df, _ = pyreadstat.read_sav(self._file_path, usecols=columns)
         except Exception as e:
             raise SAVReaderError(f"Error reading data file: {str(e)}")
+        return {column: Column.encode(df[column].to_numpy()) for column in df.columns}
+    
+    def get_column_cache_stats(self) -> Optional[dict]:
+        """
+        Get the counters of the on-demand column cache.
+        
+        Returns:
+            Dictionary with hit, miss and eviction counters, or None if columns
+            are not loaded on demand or no data has been loaded yet
+        """
+        dataset = self._dataset
+        if dataset is None or not isinstance(dataset.store, LazyColumnStore):
+            return None
+        return dataset.store.cache_stats()
+    
+    def _load_catalog(self) -> Catalog:
+        """
+        Get the published Catalog, loading it exactly once.
+        
+        Returns:
+            The loaded Catalog
+            
+        Raises:
+            SAVReaderError: If file not found or error reading the file
+        """
+        catalog = self._catalog
+        if catalog is not None:
+            return catalog
+        
+        with self._catalog_lock:
+            if self._catalog is None:
+                self._catalog = self._build_catalog()
+            return self._catalog
+    
+    def _build_catalog(self) -> Catalog:
+        """
+        Read the metadata and build the question catalog, without row data.
+        
+        The metadata comes from the snapshot sidecar when it matches the
+        file, or from a metadata-only parse of the file.
         
-        self._cached_data = (df, meta)
-        return self._cached_data
+        Returns:
+            A new Catalog
+            
+        Raises:
+            SAVReaderError: If file not found or error reading the file
+        """
+        if not os.path.exists(self._file_path):
+            raise SAVReaderError(f"Data file not found: {self._file_path}")
+        
+        source = file_fingerprint(self._file_path, with_hash=False)
+        
+        meta = None
+        if self._use_snapshot:
+            meta = read_snapshot_metadata(self._snapshot_path, self._file_path)
+        
+        if meta is None:
+            try:
+                _, meta = pyreadstat.read_sav(self._file_path, metadataonly=True)
+            except Exception as e:
+                raise SAVReaderError(f"Error reading data file: {str(e)}")
+        
+        return Catalog(
+            meta, self._build_preguntas(meta), source, detect_sets(meta.column_names),
+            detect_batteries(meta.column_names, meta.readstat_variable_types)
+        )
+    
+    def load_metadata(self):
+        """
+        Load and cache only the metadata (column and value labels) of the SAV file.
+        
+        No row data is read.
+        
+        Returns:
+            pyreadstat metadata container
+            
+        Raises:
+            SAVReaderError: If file not found or error reading the file
+        """
+        return self._load_catalog().meta
     
     def load_preguntas(self) -> list:
         """
-        Load and parse questions from the SAV file.
+        Load and parse questions from the SAV file metadata.
+        
+        Only the metadata is read, so the question catalog is available
+        without loading any row data.
         
         Returns:
             List of question dictionaries with identificador, pregunta, categoria, and opciones
             
         Raises:
-            SAVReaderError: If there's an error loading the data
+            SAVReaderError: If there's an error loading the metadata
         """
-        if self._cached_preguntas is not None:
-            return self._cached_preguntas
-        
-        df, meta = self.load_data()
+        return self._load_catalog().preguntas
+    
+    def _build_preguntas(self, meta) -> list:
+        """
+        Build the question list from the metadata (see load_preguntas).
         
+        Args:
+            meta: pyreadstat metadata container
+            
+        Returns:
+            List of question dictionaries
+        """
         # Get column labels (questions) and value labels (answer options)
         column_labels = meta.column_names_to_labels if meta.column_names_to_labels else {}
         value_labels = meta.variable_value_labels if meta.variable_value_labels else {}
         
         preguntas = []
         
-        for column in df.columns:
+        for column in meta.column_names:
             # Only include columns that have a label (question text)
             if column in column_labels and column_labels[column]:
                 # Get category for this question
@@ -277,9 +757,204 @@ class SAVReader:
                 
                 preguntas.append(pregunta_info)
         
-        self._cached_preguntas = preguntas
         return preguntas
     
+    def warmup(self, timings: Optional[dict] = None) -> dict:
+        """
+        Load everything requests need ahead of time, timing each phase.
+        
+        Phases, in order: catalogo (metadata and question catalog) and datos
+        (row data).
+        
+        Args:
+            timings: Optional dictionary to fill with each phase's duration
+                as it completes, so progress can be observed while warming up
+                
+        Returns:
+            Dictionary of phase name to duration in milliseconds
+            
+        Raises:
+            SAVReaderError: If there's an error loading the data
+        """
+        if timings is None:
+            timings = {}
+        
+        phases = [
+            ("catalogo", self._load_catalog),
+            ("datos", self._load_dataset),
+        ]
+        for name, load in phases:
+            start = time.perf_counter()
+            load()
+            timings[name] = round((time.perf_counter() - start) * 1000, 1)
+        
+        return timings
+    
+    def reload(self, if_changed: bool = False) -> bool:
+        """
+        Rebuild the catalog and the data from the current SAV file and swap
+        them in atomically.
+        
+        The new snapshots are built in the calling thread while requests keep
+        using the current ones. The data is only rebuilt if it was loaded.
+        
+        Args:
+            if_changed: Skip the rebuild if the file has the same SHA-256 as
+                the loaded one (or, before it is known, the same size and
+                mtime)
+        
+        Returns:
+            True if new snapshots were swapped in
+        
+        Raises:
+            SAVReaderError: If the file cannot be read; the current snapshots
+                are kept in that case
+        """
+        with self._reload_lock:
+            catalog = self._catalog
+            if if_changed and catalog is not None and self._source_unchanged(catalog):
+                return False
+            self._reload()
+            return True
+    
+    def _source_unchanged(self, catalog: Catalog) -> bool:
+        """
+        Whether the SAV file still has the loaded contents. Callers hold
+        _reload_lock.
+        """
+        try:
+            current = file_fingerprint(self._file_path, with_hash=False)
+        except OSError:
+            # Let the rebuild report the missing file
+            return False
+        
+        loaded = {"size": catalog.source["size"], "mtime_ns": catalog.source["mtime_ns"]}
+        if "sha256" not in catalog.source:
+            return current == loaded
+        
+        digest = file_sha256(self._file_path)
+        if digest != catalog.source["sha256"]:
+            return False
+        if current != loaded:
+            # Same contents under a new mtime: just remember the new stat
+            self._catalog = replace(catalog, source=dict(current, sha256=digest))
+        return True
+    
+    def _reload(self):
+        """Rebuild and publish new snapshots. Callers hold _reload_lock."""
+        catalog = self._build_catalog()
+        dataset = self._build_dataset(catalog) if self._dataset is not None else None
+        
+        # Each request reads one of the two references once, so publishing
+        # them one after the other is safe
+        if dataset is not None:
+            self._dataset = dataset
+        self._catalog = catalog
+        self._pending_source = None
+        self._failed_source = None
+    
+    def check_for_changes(self) -> bool:
+        """
+        Reload if the SAV file changed since it was loaded.
+        
+        A change in size or mtime only triggers a reload once the file has
+        kept the same size and mtime for two consecutive checks (so a file
+        still being copied is not read), and only if its SHA-256 differs from
+        the loaded file's, so touching or copying an identical file does not
+        reload.
+        
+        Returns:
+            True if new snapshots were swapped in
+            
+        Raises:
+            SAVReaderError: If the changed file cannot be read; it is not
+                retried until it changes again
+        """
+        with self._reload_lock:
+            catalog = self._catalog
+            if catalog is None:
+                # Nothing loaded yet: the first load reads the current file
+                return False
+            
+            try:
+                current = file_fingerprint(self._file_path, with_hash=False)
+            except OSError:
+                # File missing while being replaced: keep serving the current data
+                return False
+            
+            loaded = {"size": catalog.source["size"], "mtime_ns": catalog.source["mtime_ns"]}
+            if current == loaded:
+                if "sha256" not in catalog.source:
+                    self._record_source_hash(catalog, current)
+                return False
+            
+            if current != self._pending_source:
+                self._pending_source = current
+                return False
+            
+            if current == self._failed_source:
+                return False
+            
+            digest = file_sha256(self._file_path)
+            if digest == catalog.source.get("sha256"):
+                # Same contents under a new mtime: just remember the new stat
+                self._catalog = replace(catalog, source=dict(current, sha256=digest))
+                return False
+            
+            try:
+                self._reload()
+            except SAVReaderError:
+                self._failed_source = current
+                raise
+            return True
+    
+    def _record_source_hash(self, catalog: Catalog, current: dict):
+        """
+        Hash the loaded file off the request path, so later checks can tell
+        real content changes from touched files.
+        """
+        digest = file_sha256(self._file_path)
+        try:
+            after = file_fingerprint(self._file_path, with_hash=False)
+        except OSError:
+            return
+        # Only trust the digest if the file did not change while hashing
+        if after == current:
+            self._catalog = replace(catalog, source=dict(current, sha256=digest))
+    
+    def start_watching(self, interval: float = 5.0) -> None:
+        """
+        Start a background thread that calls check_for_changes periodically.
+        
+        Args:
+            interval: Seconds between checks
+        """
+        if self._watcher is not None:
+            return
+        
+        stop = threading.Event()
+        
+        def watch():
+            while not stop.wait(interval):
+                try:
+                    self.check_for_changes()
+                except SAVReaderError:
+                    # Keep serving the current snapshots
+                    pass
+        
+        self._watcher_stop = stop
+        self._watcher = threading.Thread(target=watch, name="sav-watcher", daemon=True)
+        self._watcher.start()
+    
+    def stop_watching(self) -> None:
+        """Stop the background change detection thread, if running."""
+        if self._watcher is None:
+            return
+        self._watcher_stop.set()
+        self._watcher.join()
+        self._watcher = None
+        self._watcher_stop = None
+    
     def get_categorias(self) -> List[dict]:
         """
         Get all available categories.
@@ -331,13 +1006,17 @@ class SAVReader:
             if p["categoria"] is not None and p["categoria"]["id"] == categoria_id
         ]
     
-    def get_question_responses(self, question_id: str, tipo: str = "cantidad") -> dict:
+    def get_question_responses(
+        self, question_id: str, tipo: str = "cantidad", ponderado: bool = False
+    ) -> dict:
         """
         Get the responses for a specific question.
         
         Args:
             question_id: The question identifier (e.g., Q_1, T_Q_12_1)
             tipo: Type of response - 'cantidad' (count) or 'porcentaje' (percentage)
+            ponderado: Whether to sum the expansion weights (FACTOR) of the
+                respondents instead of counting them
             
         Returns:
             Dictionary with question info and responses
@@ -345,75 +1024,92 @@ class SAVReader:
         Raises:
             SAVReaderError: If question not found or error loading data
         """
-        df, meta = self.load_data()
+        dataset = self._load_dataset()
+        valores, etiquetas, cantidades, _ = self._count(dataset, question_id, {}, ponderado)
+        return self._build_response(
+            dataset.meta, question_id, tipo, valores, etiquetas, cantidades, ponderado
+        )
+    
+    def _get_aggregate(self, dataset: Dataset, question_id: str):
+        """
+        Get the streaming aggregate of a question.
         
-        # Check if the question exists
-        if question_id not in df.columns:
-            raise QuestionNotFoundError(f"Pregunta '{question_id}' no encontrada")
+        Raises:
+            QuestionNotFoundError: If the question is not in the file
+            UnsupportedInModeError: If the question has too many distinct
+                values to be aggregated (e.g. identifiers or free text)
+        """
+        aggregate = dataset.aggregates.questions.get(question_id)
+        if aggregate is None:
+            if question_id not in dataset.meta.column_names:
+                raise QuestionNotFoundError(f"Pregunta '{question_id}' no encontrada")
+            raise UnsupportedInModeError(
+                f"Pregunta '{question_id}' no disponible en modo streaming"
+            )
+        return aggregate
+    
+    def _build_response(
+        self, meta, question_id: str, tipo: str, valores, etiquetas, cantidades,
+        ponderado: bool = False
+    ) -> dict:
+        """
+        Build the response dictionary of a question from its frequency table.
         
+        Args:
+            meta: pyreadstat metadata container
+            question_id: The question identifier
+            tipo: Type of response - 'cantidad' (count) or 'porcentaje' (percentage)
+            valores: Distinct answer values, in value order
+            etiquetas: Label of each value
+            cantidades: Number of responses of each value, or their weight
+                sums when weighted
+            ponderado: Whether cantidades are weight sums; they are rounded to
+                two decimals and the weight column is reported
+            
+        Returns:
+            Dictionary with question info and responses
+        """
         # Get question label
         column_labels = meta.column_names_to_labels if meta.column_names_to_labels else {}
         pregunta_texto = column_labels.get(question_id, question_id)
         
-        # Get value labels for the question
-        value_labels = meta.variable_value_labels if meta.variable_value_labels else {}
-        question_value_labels = value_labels.get(question_id, {})
-        
-        # Count responses (excluding NaN values)
-        value_counts = df[question_id].dropna().value_counts()
-        total_respuestas = int(value_counts.sum())
+        if ponderado:
+            total_respuestas = round(float(cantidades.sum()), 2)
+        else:
+            total_respuestas = int(cantidades.sum())
         
-        # Build response list
-        respuestas = []
-        for valor, cantidad in value_counts.items():
-            etiqueta = question_value_labels.get(valor, str(valor))
-            
-            if tipo == "porcentaje":
-                valor_respuesta = round((cantidad / total_respuestas) * 100, 2) if total_respuestas > 0 else 0
-            else:
-                valor_respuesta = int(cantidad)
-            
-            respuestas.append({
-                "valor": valor,
-                "etiqueta": etiqueta,
-                tipo: valor_respuesta
-            })
+        if tipo == "porcentaje":
+            valores_respuesta = [
+                round((cantidad / total_respuestas) * 100, 2) if total_respuestas > 0 else 0
+                for cantidad in cantidades.tolist()
+            ]
+        elif ponderado:
+            valores_respuesta = np.round(cantidades, 2).tolist()
+        else:
+            valores_respuesta = cantidades.tolist()
         
-        # Sort by value for consistent ordering
-        # Use a key function that handles mixed types safely
-        respuestas.sort(key=lambda x: (isinstance(x["valor"], str), x["valor"]))
+        # Values come ordered from the counting engine, so no sort is needed
+        respuestas = [
+            {"valor": valor, "etiqueta": etiqueta, tipo: valor_respuesta}
+            for valor, etiqueta, valor_respuesta in zip(
+                valores.tolist(), etiquetas.tolist(), valores_respuesta
+            )
+        ]
         
-        return {
+        respuesta = {
             "identificador": question_id,
             "pregunta": pregunta_texto,
             "tipo_respuesta": tipo,
             "respuestas": respuestas,
             "total_respuestas": total_respuestas
         }
-    
-    def _apply_simple_filter(
-        self, df, column: str, value, filtros_aplicados: dict, filter_key: str
-    ):
-        """
-        Apply a simple equality filter to the dataframe.
-        
-        Args:
-            df: DataFrame to filter
-            column: Column name to filter on
-            value: Value to filter for
-            filtros_aplicados: Dictionary to record applied filters
-            filter_key: Key name for the filter in filtros_aplicados
-            
-        Returns:
-            Filtered DataFrame
-        """
-        if column in df.columns:
-            df = df[df[column] == value]
-            filtros_aplicados[filter_key] = value
-        return df
+        if ponderado:
+            respuesta["ponderacion"] = WEIGHT_COLUMN
+        return respuesta
     
     def get_question_responses_with_filters(
-        self, question_id: str, tipo: str = "cantidad", filtros: dict = None
+        self, question_id: str, tipo: str = "cantidad", filtros: dict = None,
+        ponderado: bool = False
     ) -> dict:
         """
         Get the responses for a specific question with filters applied.
@@ -428,6 +1124,10 @@ class SAVReader:
                 - edad: dict with 'min' and/or 'max' keys for age range
                 - escolaridad: int (1-3)
                 - nse: int (1-4)
+                - expresion: filter expression over any variable (see
+                  services.filters), combined with the other filters
+            ponderado: Whether to sum the expansion weights (FACTOR) of the
+                respondents instead of counting them
             
         Returns:
             Dictionary with question info, filtered responses, and applied filters
@@ -435,96 +1135,1105 @@ class SAVReader:
         Raises:
             SAVReaderError: If question not found or error loading data
         """
-        df, meta = self.load_data()
+        dataset = self._load_dataset()
+        valores, etiquetas, cantidades, filtros_aplicados = self._count(
+            dataset, question_id, filtros or {}, ponderado
+        )
         
-        # Check if the question exists
-        if question_id not in df.columns:
-            raise QuestionNotFoundError(f"Pregunta '{question_id}' no encontrada")
+        respuesta = self._build_response(
+            dataset.meta, question_id, tipo, valores, etiquetas, cantidades, ponderado
+        )
+        respuesta["filtros_aplicados"] = filtros_aplicados
+        return respuesta
+    
+    def get_batch_responses(
+        self, question_ids: List[str], tipo: str = "cantidad", filtros: dict = None,
+        ponderado: bool = False
+    ) -> dict:
+        """
+        Get the responses for several questions under one set of filters.
         
-        # Apply filters
-        filtered_df = df.copy()
-        filtros_aplicados = {}
+        The filters are resolved once and the frequency tables of all the
+        questions are computed together.
         
-        if filtros:
-            # Define simple filter mappings: filter_key -> column_name
-            simple_filters = {
-                "calidad_vida": "CALIDAD_VIDA",
-                "municipio": "Q_94",
-                "sexo": "SEXO",
-                "escolaridad": "ESC",
-                "nse": "NSE2024_C"
-            }
+        Args:
+            question_ids: The question identifiers, in the order to return them
+            tipo: Type of response - 'cantidad' (count) or 'porcentaje' (percentage)
+            filtros: Dictionary with filter criteria (see
+                get_question_responses_with_filters)
+            ponderado: Whether to sum the expansion weights (FACTOR) of the
+                respondents instead of counting them
             
-            # Apply simple equality filters
-            for filter_key, column_name in simple_filters.items():
-                if filter_key in filtros and filtros[filter_key] is not None:
-                    filtered_df = self._apply_simple_filter(
-                        filtered_df, column_name, filtros[filter_key],
-                        filtros_aplicados, filter_key
-                    )
-            
-            # Filter by edad (Q_75 column - actual age in years)
-            if "edad" in filtros and filtros["edad"] is not None:
-                edad_filter = filtros["edad"]
-                if "Q_75" in filtered_df.columns:
-                    min_age = edad_filter.get("min")
-                    max_age = edad_filter.get("max")
-                    
-                    # Build condition for age range filter
-                    if min_age is not None and max_age is not None:
-                        filtered_df = filtered_df[
-                            (filtered_df["Q_75"] >= min_age) & 
-                            (filtered_df["Q_75"] <= max_age)
-                        ]
-                    elif min_age is not None:
-                        filtered_df = filtered_df[filtered_df["Q_75"] >= min_age]
-                    elif max_age is not None:
-                        filtered_df = filtered_df[filtered_df["Q_75"] <= max_age]
-                    
-                    filtros_aplicados["edad"] = edad_filter
+        Returns:
+            Dictionary with the response of every question (as returned by
+            get_question_responses) and the applied filters
+            
+        Raises:
+            SAVReaderError: If a question is not found or error loading data
+        """
+        dataset = self._load_dataset()
+        question_ids = list(dict.fromkeys(question_ids))
+        results, filtros_aplicados = self._count_many(
+            dataset, question_ids, filtros or {}, ponderado
+        )
         
-        # Get question label
+        return {
+            "tipo_respuesta": tipo,
+            "preguntas": [
+                self._build_response(
+                    dataset.meta, question_id, tipo, *results[question_id], ponderado
+                )
+                for question_id in question_ids
+            ],
+            "filtros_aplicados": filtros_aplicados
+        }
+    
+    def get_crosstab(
+        self, var1: str, var2: str, weight: Optional[str] = None, filtros: dict = None
+    ) -> dict:
+        """
+        Get the contingency table between two questions.
+        
+        The whole table comes from a single np.bincount over the combined
+        answer positions of both questions (see services.crosstab). Tables
+        are cached per dataset like response counts.
+        
+        Args:
+            var1: Question along the rows (e.g., SEXO)
+            var2: Question along the columns (e.g., Q_1)
+            weight: Optional numeric column whose values are summed instead of
+                counting rows (e.g., FACTOR)
+            filtros: Dictionary with filter criteria (see
+                get_question_responses_with_filters)
+        
+        Returns:
+            Dictionary with the row and column answers, counts, row and
+            column percentages, totals, the stackedBar chart and the applied
+            filters
+        
+        Raises:
+            QuestionNotFoundError: If a question or the weight is not in the file
+            InvalidVariableError: If a question is not coded or the table is
+                too large, or the weight is not numeric
+            InvalidFilterError: If the filter expression is invalid
+            UnsupportedInModeError: If the reader is in streaming mode
+            SAVReaderError: If error loading data
+        """
+        dataset = self._load_dataset()
+        if dataset.store is None:
+            raise UnsupportedInModeError("Los cruces no están disponibles en modo streaming")
+        
+        variables = [var1, var2] + ([weight] if weight is not None else [])
+        for variable in variables:
+            if variable not in dataset.store:
+                raise QuestionNotFoundError(f"Pregunta '{variable}' no encontrada")
+        columns = dataset.store.fetch(variables)
+        rows = self._coded_counter(dataset, var1, columns[var1])
+        cols = self._coded_counter(dataset, var2, columns[var2])
+        if len(rows.values) * len(cols.values) > MAX_CROSSTAB_CELLS:
+            raise InvalidVariableError(
+                f"El cruce '{var1}' x '{var2}' tiene demasiadas combinaciones de respuestas"
+            )
+        weights = None
+        if weight is not None:
+            weight_column = columns[weight]
+            if weight_column.categories is not None or weight_column.data.dtype.kind not in "iuf":
+                raise InvalidVariableError(f"La ponderación '{weight}' no es numérica")
+            weights = row_weights(weight_column)
+        
+        equals, ranges, plan, filtros_aplicados = self._resolve_filters(
+            dataset, filtros or {}, dataset.filter_index
+        )
+        key = ("crosstab", var1, var2, weight) + self._conditions_key(equals, ranges, plan)
+        table = self._cached_result(
+            dataset, key,
+            lambda: contingency_table(
+                rows, columns[var1], cols, columns[var2],
+                self._row_mask(dataset, equals, ranges, plan), weights
+            ),
+            lambda table: table.nbytes
+        )
+        
+        respuesta = self._build_crosstab(dataset.meta, var1, rows, var2, cols, table, weight)
+        respuesta["filtros_aplicados"] = filtros_aplicados
+        return respuesta
+    
+    def _coded_counter(self, dataset: Dataset, question_id: str, column: Column):
+        """
+        Get the counter of a coded question.
+        
+        Raises:
+            InvalidVariableError: If the question is not integer coded or categorical
+        """
+        counter = dataset.counting.counter(question_id, column)
+        if counter is None:
+            raise InvalidVariableError(
+                f"La pregunta '{question_id}' no tiene respuestas codificadas"
+            )
+        return counter
+    
+    def _build_crosstab(
+        self, meta, var1: str, rows, var2: str, cols, table: np.ndarray,
+        weight: Optional[str]
+    ) -> dict:
+        """
+        Build the crosstab response from a contingency table.
+        
+        Answers that no row holds are dropped from both axes.
+        
+        Args:
+            meta: pyreadstat metadata container
+            var1: Question along the rows
+            rows: QuestionCounter of var1
+            var2: Question along the columns
+            cols: QuestionCounter of var2
+            table: Counts of shape (len(rows.values), len(cols.values))
+            weight: Weight column, or None
+        
+        Returns:
+            Crosstab response dictionary (see get_crosstab)
+        """
         column_labels = meta.column_names_to_labels if meta.column_names_to_labels else {}
-        pregunta_texto = column_labels.get(question_id, question_id)
+        row_totals = table.sum(axis=1)
+        column_totals = table.sum(axis=0)
+        row_present = row_totals > 0
+        column_present = column_totals > 0
+        table = table[np.ix_(row_present, column_present)]
+        row_totals = row_totals[row_present]
+        column_totals = column_totals[column_present]
+        total = table.sum()
         
-        # Get value labels for the question
-        value_labels = meta.variable_value_labels if meta.variable_value_labels else {}
-        question_value_labels = value_labels.get(question_id, {})
+        def amounts(values: np.ndarray) -> list:
+            # Weighted sums are rounded like percentages; counts stay integers
+            return np.round(values, 2).tolist() if weight is not None else values.tolist()
+        
+        def percentages(values: np.ndarray, totals: np.ndarray) -> list:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                shares = np.where(totals > 0, values / totals * 100, 0)
+            return np.round(shares, 2).tolist()
+        
+        filas = [
+            {"valor": valor, "etiqueta": etiqueta}
+            for valor, etiqueta in zip(
+                rows.values[row_present].tolist(), rows.labels[row_present].tolist()
+            )
+        ]
+        columnas = [
+            {"valor": valor, "etiqueta": etiqueta}
+            for valor, etiqueta in zip(
+                cols.values[column_present].tolist(), cols.labels[column_present].tolist()
+            )
+        ]
+        cantidades = amounts(table)
+        
+        return {
+            "var1": {"identificador": var1, "pregunta": column_labels.get(var1, var1)},
+            "var2": {"identificador": var2, "pregunta": column_labels.get(var2, var2)},
+            "ponderacion": weight,
+            "filas": filas,
+            "columnas": columnas,
+            "cantidades": cantidades,
+            "porcentaje_fila": percentages(table, row_totals[:, None]),
+            "porcentaje_columna": percentages(table, column_totals[None, :]),
+            "total_filas": amounts(row_totals),
+            "total_columnas": amounts(column_totals),
+            "total": amounts(np.asarray(total)),
+            **stacked_bar(
+                [fila["etiqueta"] for fila in filas],
+                [columna["etiqueta"] for columna in columnas],
+                cantidades
+            )
+        }
+    
+    def get_statistics(
+        self, question_id: str, filtros: dict = None, ponderado: bool = False
+    ) -> dict:
+        """
+        Get the descriptive statistics of a numeric question.
         
-        # Count responses (excluding NaN values) from filtered data
-        value_counts = filtered_df[question_id].dropna().value_counts()
-        total_respuestas = int(value_counts.sum())
+        Statistics come from frequency tables merged over the demographic
+        cells selected by the filters: the response cube for categorical
+        questions and the statistics cube for the wider numeric ones (see
+        services.statistics). A filter expression, or columns loaded on
+        demand, count the selected rows instead. Results are cached per
+        dataset like response counts.
         
-        # Build response list
-        respuestas = []
-        for valor, cantidad in value_counts.items():
-            etiqueta = question_value_labels.get(valor, str(valor))
+        Args:
+            question_id: The question identifier (e.g., Q_75)
+            filtros: Dictionary with filter criteria (see
+                get_question_responses_with_filters)
+            ponderado: Whether to weight the respondents by the expansion
+                factor (FACTOR)
             
-            if tipo == "porcentaje":
-                valor_respuesta = round((cantidad / total_respuestas) * 100, 2) if total_respuestas > 0 else 0
-            else:
-                valor_respuesta = int(cantidad)
+        Returns:
+            Dictionary with question info, total_respuestas, media, mediana,
+            moda, min, max, rango, desviacion_std and the applied filters
             
-            respuestas.append({
-                "valor": valor,
-                "etiqueta": etiqueta,
-                tipo: valor_respuesta
-            })
+        Raises:
+            QuestionNotFoundError: If the question is not in the file
+            InvalidVariableError: If the question is not numeric, or weighted
+                and the file has no weight column
+            InvalidFilterError: If the filter expression is invalid
+            UnsupportedInModeError: If the question is not aggregated in
+                streaming mode
+            SAVReaderError: If error loading data
+        """
+        dataset = self._load_dataset()
+        filtros = filtros or {}
+        self._check_weighted(dataset, ponderado)
         
-        # Sort by value for consistent ordering
-        # Use a key function that handles mixed types safely
-        respuestas.sort(key=lambda x: (isinstance(x["valor"], str), x["valor"]))
+        if dataset.store is None:
+            aggregate = self._get_aggregate(dataset, question_id)
+            equals, ranges, filtros_aplicados = self._conditions(
+                filtros, dataset.aggregates.dimensions
+            )
+            plan = self._compile_expression(dataset, filtros.get("expresion"))
+            if not is_numeric(aggregate.values):
+                raise InvalidVariableError(f"La pregunta '{question_id}' no es numérica")
+        else:
+            if question_id not in dataset.store:
+                raise QuestionNotFoundError(f"Pregunta '{question_id}' no encontrada")
+            equals, ranges, plan, filtros_aplicados = self._resolve_filters(
+                dataset, filtros, dataset.filter_index
+            )
         
-        return {
+        def compute() -> dict:
+            if dataset.store is not None:
+                return self._describe_rows(dataset, question_id, equals, ranges, plan, ponderado)
+            segment_mask = None
+            if equals or ranges:
+                segment_mask = dataset.aggregates.segment_mask(equals, ranges)
+            return describe(*aggregate.frequencies(segment_mask, ponderado), ponderado)
+        
+        key = ("estadisticas", question_id, ponderado) + self._conditions_key(equals, ranges, plan)
+        estadisticas = self._cached_result(dataset, key, compute, _summary_nbytes)
+        
+        column_labels = dataset.meta.column_names_to_labels or {}
+        respuesta = {
             "identificador": question_id,
-            "pregunta": pregunta_texto,
-            "tipo_respuesta": tipo,
-            "respuestas": respuestas,
-            "total_respuestas": total_respuestas,
-            "filtros_aplicados": filtros_aplicados
+            "pregunta": column_labels.get(question_id, question_id),
+            **estadisticas
+        }
+        if ponderado:
+            respuesta["ponderacion"] = WEIGHT_COLUMN
+        respuesta["filtros_aplicados"] = filtros_aplicados
+        return respuesta
+    
+    def _describe_rows(
+        self, dataset: Dataset, question_id: str, equals: dict, ranges: dict,
+        plan: Optional[FilterPlan], weighted: bool
+    ) -> dict:
+        """
+        Compute the statistics of a question over the row data (see get_statistics).
+        
+        Raises:
+            InvalidVariableError: If the question is not numeric
+        """
+        column = dataset.store.fetch([question_id])[question_id]
+        counter = dataset.counting.counter(question_id, column)
+        if counter is not None:
+            values = counter.values
+        else:
+            values, _ = column.value_counts()
+        if not is_numeric(values):
+            raise InvalidVariableError(f"La pregunta '{question_id}' no es numérica")
+        
+        cube = dataset.cube if plan is None else None
+        age_range = ranges.get(AGE_COLUMN)
+        if cube is not None and question_id in cube:
+            totals = cube.counts(question_id, equals, age_range, weighted)
+            return describe(values, totals, weighted)
+        if cube is not None and question_id in dataset.statistics:
+            runs = cube.group_runs(equals, age_range) if equals or ranges else None
+            return dataset.statistics.describe(question_id, values, runs, weighted)
+        
+        mask = self._row_mask(dataset, equals, ranges, plan)
+        weights = dataset.weights if weighted else None
+        if counter is not None:
+            return describe(values, counter.count(column, mask, weights), weighted)
+        return describe(*column.value_counts(mask, weights), weighted)
+    
+    def get_multi_response_sets(self) -> List[dict]:
+        """
+        Get the multiple-response sets detected in the file.
+        
+        Only the metadata is read.
+        
+        Returns:
+            List of dictionaries with identificador, pregunta and columnas
+        """
+        catalog = self._load_catalog()
+        column_labels = catalog.meta.column_names_to_labels or {}
+        return [
+            {
+                "identificador": base,
+                "pregunta": column_labels.get(columns[0], base),
+                "columnas": list(columns)
+            }
+            for base, columns in catalog.conjuntos.items()
+        ]
+    
+    def get_multi_response(
+        self, base_id: str, filtros: dict = None, ponderado: bool = False
+    ) -> dict:
+        """
+        Get the option frequencies of a multiple-response set.
+        
+        The selections of every option and the number of respondents come
+        from popcounts of the set's option bitsets intersected with the
+        filter bitset, or one product with the weights when weighted (see
+        services.multiresponse). Results are cached per dataset like
+        response counts.
+        
+        Args:
+            base_id: The set identifier (e.g., Q_34)
+            filtros: Dictionary with filter criteria (see
+                get_question_responses_with_filters)
+            ponderado: Whether to sum the expansion weights (FACTOR) of the
+                respondents instead of counting them
+            
+        Returns:
+            Dictionary with set info, the selections, percentage of
+            respondents and percentage of mentions of every option, the
+            totals and the applied filters
+            
+        Raises:
+            QuestionNotFoundError: If the set is not in the file
+            InvalidVariableError: If weighted and the file has no weight column
+            InvalidFilterError: If the filter expression is invalid
+            UnsupportedInModeError: If the reader is in streaming mode
+            SAVReaderError: If error loading data
+        """
+        dataset = self._load_multi_response(base_id, ponderado)
+        equals, ranges, plan, filtros_aplicados = self._resolve_filters(
+            dataset, filtros or {}, dataset.filter_index
+        )
+        options = dataset.multi_response.get(base_id)
+        key = ("multirespuesta", base_id, ponderado) + self._conditions_key(equals, ranges, plan)
+        selecciones, encuestados = self._cached_result(
+            dataset, key,
+            lambda: options.tally(
+                self._row_bits(dataset, equals, ranges, plan),
+                dataset.weights if ponderado else None
+            ),
+            lambda result: result[0].nbytes
+        )
+        
+        menciones = selecciones.sum()
+        
+        column_labels = dataset.meta.column_names_to_labels or {}
+        columns = dataset.multi_response.sets[base_id]
+        respuesta = {
+            "identificador": base_id,
+            "pregunta": column_labels.get(columns[0], base_id),
+            "columnas": list(columns),
+            "opciones": [
+                {
+                    "valor": valor,
+                    "etiqueta": etiqueta,
+                    "selecciones": _amount(seleccion, ponderado),
+                    "porcentaje_encuestados": _share(seleccion, encuestados),
+                    "porcentaje_menciones": _share(seleccion, menciones)
+                }
+                for valor, etiqueta, seleccion in zip(
+                    options.values.tolist(), options.labels.tolist(), selecciones.tolist()
+                )
+            ],
+            "total_encuestados": _amount(encuestados, ponderado),
+            "total_menciones": _amount(menciones, ponderado)
         }
+        if ponderado:
+            respuesta["ponderacion"] = WEIGHT_COLUMN
+        respuesta["filtros_aplicados"] = filtros_aplicados
+        return respuesta
+    
+    def get_multi_response_cooccurrence(
+        self, base_id: str, filtros: dict = None, ponderado: bool = False
+    ) -> dict:
+        """
+        Get the option x option co-occurrence matrix of a multiple-response set.
+        
+        The matrix is one (weighted) product of the set's option indicator
+        matrix with its transpose (see MultiResponseSet.cooccurrence) and
+        is cached per filter set. The lift of a pair of options is how much
+        more often they are named together than if they were independent:
+        P(i and j) / (P(i) * P(j)) among the respondents who named any
+        option.
+        
+        Args:
+            base_id: The set identifier (e.g., Q_34)
+            filtros: Dictionary with filter criteria (see
+                get_question_responses_with_filters)
+            ponderado: Whether to sum the expansion weights (FACTOR) of the
+                respondents instead of counting them
+            
+        Returns:
+            Dictionary with set info, the options, the co-occurrence and lift
+            matrices, the heatmap chart and the applied filters
+            
+        Raises:
+            QuestionNotFoundError: If the set is not in the file
+            InvalidVariableError: If weighted and the file has no weight column
+            InvalidFilterError: If the filter expression is invalid
+            UnsupportedInModeError: If the reader is in streaming mode
+            SAVReaderError: If error loading data
+        """
+        dataset = self._load_multi_response(base_id, ponderado)
+        equals, ranges, plan, filtros_aplicados = self._resolve_filters(
+            dataset, filtros or {}, dataset.filter_index
+        )
+        options = dataset.multi_response.get(base_id)
+        key = ("coocurrencia", base_id, ponderado) + self._conditions_key(equals, ranges, plan)
+        matrix = self._cached_result(
+            dataset, key,
+            lambda: options.cooccurrence(
+                self._row_bits(dataset, equals, ranges, plan),
+                dataset.weights if ponderado else None
+            ),
+            lambda matrix: matrix.nbytes
+        )
+        
+        pairs = matrix[:-1, :-1]
+        selecciones = matrix[-1, :-1]
+        encuestados = matrix[-1, -1]
+        expected = np.outer(selecciones, selecciones).astype(np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            lift = np.where(expected > 0, pairs * float(encuestados) / expected, np.nan)
+        
+        coocurrencias = np.round(pairs, 2).tolist() if ponderado else pairs.tolist()
+        etiquetas = options.labels.tolist()
+        
+        column_labels = dataset.meta.column_names_to_labels or {}
+        columns = dataset.multi_response.sets[base_id]
+        respuesta = {
+            "identificador": base_id,
+            "pregunta": column_labels.get(columns[0], base_id),
+            "opciones": [
+                {
+                    "valor": valor,
+                    "etiqueta": etiqueta,
+                    "selecciones": _amount(seleccion, ponderado)
+                }
+                for valor, etiqueta, seleccion in zip(
+                    options.values.tolist(), etiquetas, selecciones.tolist()
+                )
+            ],
+            "coocurrencias": coocurrencias,
+            "lift": [
+                [None if np.isnan(value) else round(value, 4) for value in row]
+                for row in lift.tolist()
+            ],
+            "total_encuestados": _amount(encuestados, ponderado),
+            **heatmap(etiquetas, etiquetas, coocurrencias)
+        }
+        if ponderado:
+            respuesta["ponderacion"] = WEIGHT_COLUMN
+        respuesta["filtros_aplicados"] = filtros_aplicados
+        return respuesta
+    
+    def get_multi_response_turf(
+        self, base_id: str, k: int, top: int = 10, filtros: dict = None,
+        ponderado: bool = False, excluir: Optional[List[float]] = None
+    ) -> dict:
+        """
+        Get the TURF (Total Unduplicated Reach and Frequency) analysis of a
+        multiple-response set: the combinations of k options that reach the
+        most respondents.
+        
+        Reaches are popcounts of unions of the set's option bitsets,
+        intersected with the filter bitset; combinations are searched
+        exhaustively when there are few enough of them and greedily
+        otherwise (see services.turf). Results are cached per filter set.
+        
+        Answers that name no actual option ("Ninguna de las anteriores",
+        "No sabe/No contestó", see MultiResponseSet.non_substantive) are never
+        candidates, since reaching them reaches no one.
+        
+        Args:
+            base_id: The set identifier (e.g., Q_34)
+            k: Options per combination
+            top: Number of combinations to return
+            filtros: Dictionary with filter criteria (see
+                get_question_responses_with_filters)
+            ponderado: Whether to sum the expansion weights (FACTOR) of the
+                respondents instead of counting them
+            excluir: Option values to leave out of the combinations
+            
+        Returns:
+            Dictionary with set info, the search method, the excluded
+            options, the reach and frequency of the top combinations and the
+            applied filters
+            
+        Raises:
+            QuestionNotFoundError: If the set is not in the file
+            InvalidVariableError: If an excluded value is not an option, k or
+                top are out of range, or weighted and the file has no weight
+                column
+            InvalidFilterError: If the filter expression is invalid
+            UnsupportedInModeError: If the reader is in streaming mode
+            SAVReaderError: If error loading data
+        """
+        dataset = self._load_multi_response(base_id, ponderado)
+        options = dataset.multi_response.get(base_id)
+        valores = options.values.tolist()
+        excluded = options.non_substantive()
+        for valor in excluir or []:
+            if valor not in valores:
+                raise InvalidVariableError(f"La opción {valor} no existe en '{base_id}'")
+            excluded[valores.index(valor)] = True
+        candidates = np.flatnonzero(~excluded)
+        if not 1 <= k <= len(candidates):
+            raise InvalidVariableError(
+                f"k debe estar entre 1 y {len(candidates)} para '{base_id}'"
+            )
+        if top < 1:
+            raise InvalidVariableError("top debe ser al menos 1")
+        
+        equals, ranges, plan, filtros_aplicados = self._resolve_filters(
+            dataset, filtros or {}, dataset.filter_index
+        )
+        key = (
+            ("turf", base_id, k, top, ponderado, tuple(candidates.tolist()))
+            + self._conditions_key(equals, ranges, plan)
+        )
+        
+        def compute():
+            bits = self._row_bits(dataset, equals, ranges, plan)
+            weights = dataset.weights if ponderado else None
+            selecciones, encuestados = options.tally(bits, weights)
+            turf = turf_search(
+                options.selected(bits)[candidates], selecciones[candidates], options.n_rows,
+                k, top, weights, self._turf_executor()
+            )
+            return turf, encuestados
+        
+        turf, encuestados = self._cached_result(
+            dataset, key, compute, lambda result: result[0].nbytes
+        )
+        
+        etiquetas = options.labels.tolist()
+        column_labels = dataset.meta.column_names_to_labels or {}
+        columns = dataset.multi_response.sets[base_id]
+        respuesta = {
+            "identificador": base_id,
+            "pregunta": column_labels.get(columns[0], base_id),
+            "k": k,
+            "metodo": turf.method,
+            "excluidas": [
+                {"valor": valores[position], "etiqueta": etiquetas[position]}
+                for position in np.flatnonzero(excluded).tolist()
+            ],
+            "combinaciones": [
+                {
+                    "opciones": [
+                        {"valor": valores[position], "etiqueta": etiquetas[position]}
+                        for position in candidates[combination].tolist()
+                    ],
+                    "alcance": _amount(alcance, ponderado),
+                    "porcentaje_alcance": _share(alcance, encuestados),
+                    "frecuencia": _amount(frecuencia, ponderado),
+                    "frecuencia_promedio": round(frecuencia / alcance, 4) if alcance > 0 else 0
+                }
+                for combination, alcance, frecuencia in zip(
+                    turf.combinations.tolist(), turf.reach.tolist(), turf.frequency.tolist()
+                )
+            ],
+            "total_encuestados": _amount(encuestados, ponderado)
+        }
+        if ponderado:
+            respuesta["ponderacion"] = WEIGHT_COLUMN
+        respuesta["filtros_aplicados"] = filtros_aplicados
+        return respuesta
+    
+    def _turf_executor(self) -> Optional[ProcessPoolExecutor]:
+        """
+        Get the process pool shared by TURF searches, started on first use.
+        
+        Returns:
+            The pool, or None if turf_workers is 1
+        """
+        if self._turf_workers == 1:
+            return None
+        with self._turf_pool_lock:
+            if self._turf_pool is None:
+                self._turf_pool = ProcessPoolExecutor(
+                    max_workers=self._turf_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._turf_pool
+    
+    def shutdown_workers(self) -> None:
+        """Stop the TURF process pool, if started; it restarts on next use."""
+        with self._turf_pool_lock:
+            pool, self._turf_pool = self._turf_pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+    
+    def _load_multi_response(self, base_id: str, ponderado: bool) -> Dataset:
+        """
+        Load the dataset for a multiple-response request, checking the set
+        exists and, when weighted, that the file has the weight column.
+        
+        Returns:
+            The Dataset
+        """
+        dataset = self._load_dataset()
+        if dataset.store is None:
+            raise UnsupportedInModeError(
+                "Las preguntas de opción múltiple no están disponibles en modo streaming"
+            )
+        if base_id not in dataset.multi_response:
+            raise QuestionNotFoundError(f"Pregunta de opción múltiple '{base_id}' no encontrada")
+        self._check_weighted(dataset, ponderado)
+        return dataset
+    
+    def get_batteries(self) -> List[dict]:
+        """
+        Get the rating batteries of the file.
+        
+        Only the metadata is read. Batteries with text items are left out
+        (see detect_batteries); numeric items with more distinct answers
+        than a rating scale can only be told apart from the rows, so
+        get_battery rejects those.
+        
+        Returns:
+            List of dictionaries with identificador, pregunta and columnas
+        """
+        catalog = self._load_catalog()
+        column_labels = catalog.meta.column_names_to_labels or {}
+        return [
+            {
+                "identificador": base,
+                "pregunta": split_labels(column_labels.get(column, column) for column in columns)[0],
+                "columnas": list(columns)
+            }
+            for base, columns in catalog.baterias.items()
+        ]
+    
+    def get_battery(self, base_id: str, filtros: dict = None, ponderado: bool = False) -> dict:
+        """
+        Get the item x scale-point frequency matrix of a rating battery.
+        
+        The whole matrix comes from one np.bincount over the battery's 2D
+        array of scale positions (see services.batteries). Results are
+        cached per dataset like response counts.
+        
+        Args:
+            base_id: The battery identifier (e.g., T_Q_25)
+            filtros: Dictionary with filter criteria (see
+                get_question_responses_with_filters)
+            ponderado: Whether to sum the expansion weights (FACTOR) of the
+                respondents instead of counting them
+            
+        Returns:
+            Dictionary with battery info, the items and scale, counts and
+            percentages per item, the heatmap and stackedBar charts and the
+            applied filters
+            
+        Raises:
+            QuestionNotFoundError: If the battery is not in the file
+            InvalidVariableError: If the items are not a rating scale, or
+                weighted and the file has no weight column
+            InvalidFilterError: If the filter expression is invalid
+            UnsupportedInModeError: If the reader is in streaming mode
+            SAVReaderError: If error loading data
+        """
+        dataset = self._load_dataset()
+        if dataset.store is None:
+            raise UnsupportedInModeError("Las baterías no están disponibles en modo streaming")
+        if base_id not in dataset.batteries:
+            raise QuestionNotFoundError(f"Batería '{base_id}' no encontrada")
+        battery = dataset.batteries.get(base_id)
+        if battery is None:
+            raise InvalidVariableError(f"La batería '{base_id}' no tiene una escala común")
+        self._check_weighted(dataset, ponderado)
+        
+        equals, ranges, plan, filtros_aplicados = self._resolve_filters(
+            dataset, filtros or {}, dataset.filter_index
+        )
+        key = ("bateria", base_id, ponderado) + self._conditions_key(equals, ranges, plan)
+        matrix = self._cached_result(
+            dataset, key,
+            lambda: battery.frequencies(
+                self._row_mask(dataset, equals, ranges, plan),
+                dataset.weights if ponderado else None
+            ),
+            lambda matrix: matrix.nbytes
+        )
+        
+        column_labels = dataset.meta.column_names_to_labels or {}
+        columns = dataset.batteries.batteries[base_id]
+        pregunta, item_labels = split_labels(
+            column_labels.get(column, column) for column in columns
+        )
+        
+        totals = matrix.sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            shares = np.where(totals[:, None] > 0, matrix / totals[:, None] * 100, 0)
+        porcentajes = np.round(shares, 2).tolist()
+        cantidades = np.round(matrix, 2).tolist() if ponderado else matrix.tolist()
+        escala = battery.labels.tolist()
+        
+        respuesta = {
+            "identificador": base_id,
+            "pregunta": pregunta,
+            "items": [
+                {"identificador": column, "etiqueta": label}
+                for column, label in zip(columns, item_labels)
+            ],
+            "escala": [
+                {"valor": valor, "etiqueta": etiqueta}
+                for valor, etiqueta in zip(battery.values.tolist(), escala)
+            ],
+            "cantidades": cantidades,
+            "porcentajes": porcentajes,
+            "total_items": np.round(totals, 2).tolist() if ponderado else totals.tolist(),
+            "graficas": {
+                "heatmap": heatmap(escala, list(item_labels), porcentajes),
+                "stackedBar": stacked_bar(list(item_labels), escala, cantidades)
+            }
+        }
+        if ponderado:
+            respuesta["ponderacion"] = WEIGHT_COLUMN
+        respuesta["filtros_aplicados"] = filtros_aplicados
+        return respuesta
+    
+    def _count(self, dataset: Dataset, question_id: str, filtros: dict, weighted: bool = False):
+        """
+        Count the filtered responses of a question (see _count_many).
+        
+        Returns:
+            Tuple of (valores, etiquetas, cantidades, filtros_aplicados) with
+            the values present in value order
+            
+        Raises:
+            QuestionNotFoundError: If the question is not in the file
+        """
+        results, filtros_aplicados = self._count_many(dataset, [question_id], filtros, weighted)
+        valores, etiquetas, cantidades = results[question_id]
+        return valores, etiquetas, cantidades, filtros_aplicados
+    
+    def _count_many(
+        self, dataset: Dataset, question_ids: List[str], filtros: dict, weighted: bool = False
+    ):
+        """
+        Count the filtered responses of several questions, through the result cache.
+        
+        Results are cached per dataset as raw counts, keyed by the question,
+        whether they are weighted and the canonical form of the applied
+        filters, so 'cantidad' and 'porcentaje' share an entry and a reload
+        starts with an empty cache. The questions that miss the cache are
+        counted together.
+        
+        When weighted, the counts are the sums of the expansion weights
+        (WEIGHT_COLUMN) of the respondents.
+        
+        Returns:
+            Tuple of (results, filtros_aplicados), where results maps every
+            question to (valores, etiquetas, cantidades) with the values
+            present in value order
+            
+        Raises:
+            QuestionNotFoundError: If a question is not in the file
+            InvalidVariableError: If weighted and the file has no weight column
+        """
+        self._check_weighted(dataset, weighted)
+        if dataset.store is None:
+            for question_id in question_ids:
+                self._get_aggregate(dataset, question_id)
+            available = dataset.aggregates.dimensions
+        else:
+            # Check if the questions exist
+            for question_id in question_ids:
+                if question_id not in dataset.store:
+                    raise QuestionNotFoundError(f"Pregunta '{question_id}' no encontrada")
+            available = dataset.filter_index
+        
+        equals, ranges, plan, filtros_aplicados = self._resolve_filters(
+            dataset, filtros, available
+        )
+        conditions_key = self._conditions_key(equals, ranges, plan)
+        results = {}
+        keys = {}
+        for question_id in question_ids:
+            key = (question_id, weighted) + conditions_key
+            try:
+                result = dataset.results.get(key)
+            except TypeError:
+                # Unhashable filter values are counted without caching
+                key = None
+                result = None
+            if result is not None:
+                results[question_id] = result
+            else:
+                keys[question_id] = key
+        
+        if keys:
+            if dataset.store is None:
+                computed = self._count_from_aggregates(
+                    dataset, list(keys), equals, ranges, weighted
+                )
+            else:
+                computed = self._count_from_rows(
+                    dataset, list(keys), equals, ranges, plan, weighted
+                )
+            for question_id, result in computed.items():
+                if keys[question_id] is not None:
+                    dataset.results.put(keys[question_id], result, _result_nbytes(result))
+            results.update(computed)
+        
+        return results, filtros_aplicados
+    
+    def _resolve_filters(self, dataset: Dataset, filtros: dict, available):
+        """
+        Translate request filters into conditions and a compiled expression.
+        
+        Args:
+            dataset: Dataset the filters apply to
+            filtros: Request filters (see get_question_responses_with_filters)
+            available: Container of the filter columns present in the data
+            
+        Returns:
+            Tuple of (equals, ranges, plan, filtros_aplicados), see _conditions;
+            plan is None without an expression
+            
+        Raises:
+            InvalidFilterError: If the expression is invalid
+        """
+        equals, ranges, filtros_aplicados = self._conditions(filtros, available)
+        plan = self._compile_expression(dataset, filtros.get("expresion"))
+        if plan is not None:
+            filtros_aplicados["expresion"] = plan.expression
+        return equals, ranges, plan, filtros_aplicados
+    
+    @staticmethod
+    def _conditions_key(equals: dict, ranges: dict, plan: Optional[FilterPlan]) -> tuple:
+        """Return the result cache key of a set of resolved filters."""
+        # Conditions are built in SIMPLE_FILTERS order and expressions are
+        # canonical, so equal filter sets give equal keys whatever the order
+        # or the None entries of filtros
+        return tuple(equals.items()), tuple(ranges.items()), plan.text if plan else None
+    
+    def _conditions(self, filtros: dict, available):
+        """
+        Translate request filters into conditions on the filter columns.
+        
+        Args:
+            filtros: Request filters (see get_question_responses_with_filters)
+            available: Container of the filter columns present in the data;
+                filters on other columns are not applied
+            
+        Returns:
+            Tuple of (equals, ranges, filtros_aplicados): the required value of
+            each equality filter column, the (min, max) range of each range
+            filter column, and the filters that were applied
+        """
+        equals = {}
+        ranges = {}
+        filtros_aplicados = {}
+        
+        # Apply simple equality filters
+        for filter_key, column_name in SIMPLE_FILTERS.items():
+            if filtros.get(filter_key) is not None and column_name in available:
+                equals[column_name] = filtros[filter_key]
+                filtros_aplicados[filter_key] = filtros[filter_key]
+        
+        # Filter by edad (Q_75 column - actual age in years)
+        edad_filter = filtros.get("edad")
+        if edad_filter is not None and AGE_COLUMN in available:
+            ranges[AGE_COLUMN] = (edad_filter.get("min"), edad_filter.get("max"))
+            filtros_aplicados["edad"] = edad_filter
+        
+        return equals, ranges, filtros_aplicados
+    
+    def _compile_expression(self, dataset: Dataset, expresion) -> Optional[FilterPlan]:
+        """
+        Compile a filter expression through the dataset's plan cache.
+        
+        Returns:
+            The FilterPlan, or None if there is no expression
+            
+        Raises:
+            InvalidFilterError: If the expression is invalid or the reader is
+                in streaming mode
+        """
+        if expresion is None:
+            return None
+        if dataset.filter_planner is None:
+            raise InvalidFilterError(
+                "Las expresiones de filtro no están disponibles en modo streaming"
+            )
+        try:
+            return dataset.filter_planner.compile(expresion)
+        except FilterExpressionError as e:
+            raise InvalidFilterError(f"Expresión de filtro inválida: {str(e)}")
+    
+    def _count_from_rows(
+        self, dataset: Dataset, question_ids: List[str], equals: dict, ranges: dict,
+        plan: Optional[FilterPlan] = None, weighted: bool = False
+    ) -> dict:
+        """
+        Count the responses of questions over the row data.
+        
+        Categorical questions are summed from the response cube in one pass.
+        The other questions are counted together with one np.bincount over
+        the rows selected through the filter index: bitmaps for the equality
+        filters and a sorted age index for edad, so no filter column is
+        scanned and the row mask is built once. A filter expression narrows
+        that mask through its compiled plan; the cube is not used then.
+        Weighted counts take the same paths, summing the cube's weight sums
+        or bincounting with the row weights.
+        
+        Returns:
+            Mapping of question to (valores, etiquetas, cantidades)
+        """
+        store = dataset.store
+        weights = dataset.weights if weighted else None
+        cube = dataset.cube if plan is None else None
+        in_cube = [q for q in question_ids if cube is not None and q in cube]
+        counts = {}
+        if in_cube:
+            counts.update(cube.counts_many(in_cube, equals, ranges.get(AGE_COLUMN), weighted))
+        
+        results = {}
+        remaining = [q for q in question_ids if q not in counts]
+        if remaining:
+            mask = self._row_mask(dataset, equals, ranges, plan)
+            columns = store.fetch(remaining)
+            counts.update(dataset.counting.count_many(columns, mask, weights))
+            
+            # Values that are not integer codes (dates, decimals)
+            value_labels = dataset.meta.variable_value_labels or {}
+            for question_id in remaining:
+                if question_id not in counts:
+                    valores, cantidades = columns[question_id].value_counts(mask, weights)
+                    etiquetas = label_array(valores, value_labels.get(question_id, {}))
+                    results[question_id] = (valores, etiquetas, cantidades)
+        
+        for question_id, cantidades in counts.items():
+            counter = dataset.counting.counter(question_id)
+            present = cantidades > 0
+            results[question_id] = (
+                counter.values[present], counter.labels[present], cantidades[present]
+            )
+        return results
+    
+    def _row_mask(
+        self, dataset: Dataset, equals: dict, ranges: dict, plan: Optional[FilterPlan] = None
+    ) -> Optional[np.ndarray]:
+        """
+        Get the rows matching resolved filters, through the filter index and
+        the compiled expression.
+        
+        Returns:
+            Boolean row mask, or None if there are no filters
+        """
+        mask = None
+        if equals or ranges:
+            mask = unpack_rows(dataset.filter_index.match(equals, ranges), dataset.store.n_rows)
+        if plan is not None:
+            mask = dataset.filter_planner.evaluate(plan, mask)
+        return mask
+    
+    def _row_bits(
+        self, dataset: Dataset, equals: dict, ranges: dict, plan: Optional[FilterPlan] = None
+    ) -> Optional[np.ndarray]:
+        """
+        Get the rows matching resolved filters as a packed bitset.
+        
+        Indexed filters stay packed; only a compiled expression goes through
+        a row mask.
+        
+        Returns:
+            Packed bitset, or None if there are no filters
+        """
+        if plan is not None:
+            return pack_rows(self._row_mask(dataset, equals, ranges, plan))
+        if equals or ranges:
+            return dataset.filter_index.match(equals, ranges)
+        return None
+    
+    def _cached_result(
+        self, dataset: Dataset, key: tuple, compute: Callable[[], Any],
+        nbytes: Callable[[Any], int]
+    ):
+        """
+        Get a result from the dataset's result cache, computing and storing
+        it on a miss.
+        
+        Args:
+            dataset: Dataset whose result cache is used
+            key: Cache key; keys with unhashable filter values are computed
+                without caching
+            compute: Function computing the result
+            nbytes: Function estimating the size of a result in bytes
+            
+        Returns:
+            The cached or computed result
+        """
+        try:
+            result = dataset.results.get(key)
+        except TypeError:
+            return compute()
+        if result is None:
+            result = compute()
+            dataset.results.put(key, result, nbytes(result))
+        return result
+    
+    @staticmethod
+    def _check_weighted(dataset: Dataset, weighted: bool) -> None:
+        """
+        Check that weighted results can be computed.
+        
+        Raises:
+            InvalidVariableError: If weighted and the file has no weight column
+        """
+        if weighted and WEIGHT_COLUMN not in dataset.meta.column_names:
+            raise InvalidVariableError(
+                f"El archivo no tiene la variable de ponderación '{WEIGHT_COLUMN}'"
+            )
+    
+    def _count_from_aggregates(
+        self, dataset: Dataset, question_ids: List[str], equals: dict, ranges: dict,
+        weighted: bool = False
+    ) -> dict:
+        """
+        Count the responses of questions from the streaming aggregates.
+        
+        The filters select segments instead of rows, once for all the
+        questions; the counts are the same.
+        
+        Returns:
+            Mapping of question to (valores, etiquetas, cantidades)
+        """
+        segment_mask = None
+        if equals or ranges:
+            segment_mask = dataset.aggregates.segment_mask(equals, ranges)
+        
+        value_labels = dataset.meta.variable_value_labels or {}
+        results = {}
+        for question_id in question_ids:
+            aggregate = self._get_aggregate(dataset, question_id)
+            valores, cantidades = aggregate.frequencies(segment_mask, weighted)
+            etiquetas = label_array(valores, value_labels.get(question_id, {}))
+            results[question_id] = (valores, etiquetas, cantidades)
+        return results
+    
+    def get_result_cache_stats(self) -> Optional[dict]:
+        """
+        Get the counters of the result cache of the loaded dataset.
+        
+        Returns:
+            Dictionary with hit, miss and eviction counters, or None if no
+            data has been loaded yet. Counters restart when the data reloads.
+        """
+        dataset = self._dataset
+        if dataset is None:
+            return None
+        return dataset.results.stats()
     
     def clear_cache(self):
-        """Clear the cached data."""
-        self._cached_data = None
-        self._cached_preguntas = None
+        """Clear the cached data, so the next request loads the current file."""
+        self._dataset = None
+        self._catalog = None
+        self.shutdown_workers()
@@ -0,0 +1,275 @@
+"""
+Statistics Module
+
+This module computes descriptive statistics of numeric questions (mean,
+median, mode, range and standard deviation) without rescanning rows.
+
+Every statistic follows from the frequency table of a question: medians
+and modes from the cumulative counts of its ordered values, means and
+deviations from its moments. Categorical questions already have their
+frequency tables per demographic cell in the response cube (see
+services.cube). The wider numeric questions (ages, incomes, durations)
+get a StatisticsCube: per cube group, the prefix sums of their moments
+(n, sum x, sum x^2 and their weighted versions) and a sparse histogram of
+their codes. Filtered statistics then merge the selected cells.
+
+Weighted statistics treat the weights as frequency weights, so the
+weighted standard deviation divides by the total weight minus one.
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from services.column_store import ColumnStore
+from services.counting import CountingEngine
+from services.cube import ResponseCube
+
+
+# Moment columns of the StatisticsCube: unweighted (n, sum x, sum x^2)
+# followed by the weighted ones (sum w, sum wx, sum wx^2)
+_MOMENTS = 3
+
+
+def is_numeric(values: np.ndarray) -> bool:
+    """Return whether answer values are numbers that statistics can describe."""
+    return values.dtype.kind in "iuf"
+
+
+def _round(value) -> Optional[float]:
+    """Round a statistic for the response; None stays None."""
+    return None if value is None else round(float(value), 4)
+
+
+def _summary(
+    weighted: bool, total, mean, variance, median, mode, low, high
+) -> Dict[str, Optional[float]]:
+    """Build the statistics dictionary, with None for undefined statistics."""
+    return {
+        "total_respuestas": round(float(total), 2) if weighted else int(round(total)),
+        "media": _round(mean),
+        "mediana": _round(median),
+        "moda": _round(mode),
+        "min": _round(low),
+        "max": _round(high),
+        "rango": _round(None if low is None else high - low),
+        "desviacion_std": _round(None if variance is None else np.sqrt(max(variance, 0.0))),
+    }
+
+
+def _median(values: np.ndarray, totals: np.ndarray) -> float:
+    """
+    Get the median of a frequency table with every total > 0.
+
+    The middle of an even number of answers is the mean of the two middle
+    values, as in pandas.
+    """
+    cumulative = np.cumsum(totals)
+    half = cumulative[-1] / 2
+    position = int(np.searchsorted(cumulative, half, side="left"))
+    if cumulative[position] == half and position + 1 < len(values):
+        return (values[position] + values[position + 1]) / 2
+    return values[position]
+
+
+def describe(
+    values: np.ndarray, totals: np.ndarray, weighted: bool = False
+) -> Dict[str, Optional[float]]:
+    """
+    Describe a question from its frequency table.
+
+    Args:
+        values: Distinct numeric answer values, sorted
+        totals: Count (or weight sum) of every value
+        weighted: Whether totals are weight sums
+
+    Returns:
+        Dictionary with total_respuestas, media, mediana, moda, min, max,
+        rango and desviacion_std; statistics of an empty table are None
+    """
+    present = totals > 0
+    values = values[present].astype(np.float64)
+    totals = totals[present].astype(np.float64)
+    if len(values) == 0:
+        return _summary(weighted, 0, None, None, None, None, None, None)
+
+    total = totals.sum()
+    mean = (values * totals).sum() / total
+    variance = ((values - mean) ** 2 * totals).sum() / (total - 1) if total > 1 else None
+    return _summary(
+        weighted, total, mean, variance, _median(values, totals), values[np.argmax(totals)],
+        values[0], values[-1]
+    )
+
+
+def _concat_ranges(starts: np.ndarray, stops: np.ndarray) -> np.ndarray:
+    """Return the concatenation of the ranges [start, stop) as one index array."""
+    lengths = stops - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return np.arange(lengths.sum()) + offsets
+
+
+class WideQuestion:
+    """Moments and sparse code histogram of one question per cube group."""
+
+    __slots__ = ("center", "moments", "groups", "positions", "counts", "weights")
+
+    def __init__(
+        self, center: float, moments: np.ndarray, groups: np.ndarray,
+        positions: np.ndarray, counts: np.ndarray, weights: np.ndarray
+    ):
+        """
+        Initialize the question.
+
+        Args:
+            center: Value subtracted from the answers before taking moments,
+                so sums of squares do not lose precision
+            moments: float64 prefix sums over the groups, of shape
+                (n_groups + 1, 6): n, sum x, sum x^2, sum w, sum wx, sum wx^2
+            groups: Sorted group of every histogram entry
+            positions: Position in the answer domain of every entry
+            counts: Number of rows of every entry
+            weights: Weight sum of every entry
+        """
+        self.center = center
+        self.moments = moments
+        self.groups = groups
+        self.positions = positions
+        self.counts = counts
+        self.weights = weights
+
+    @property
+    def nbytes(self) -> int:
+        """Return the size of the moments and the histogram in bytes."""
+        return sum(
+            array.nbytes
+            for array in (self.moments, self.groups, self.positions, self.counts, self.weights)
+        )
+
+
+class StatisticsCube:
+    """Per-cell sufficient statistics of the numeric questions left out of the response cube."""
+
+    def __init__(self, cube: ResponseCube, questions: Dict[str, WideQuestion]):
+        """
+        Initialize the statistics cube.
+
+        Args:
+            cube: Response cube whose groups the statistics are kept for
+            questions: Mapping of question to its WideQuestion
+        """
+        self.cube = cube
+        self.questions = questions
+
+    @classmethod
+    def build(
+        cls, store: ColumnStore, engine: CountingEngine, cube: ResponseCube,
+        weights: Optional[np.ndarray] = None
+    ) -> "StatisticsCube":
+        """
+        Build the statistics of every numeric coded question not in the cube.
+
+        Args:
+            store: Column store of the dataset
+            engine: Counting engine of the dataset
+            cube: Response cube of the dataset, defining the groups
+            weights: Optional expansion weight of every row. Defaults to 1.
+
+        Returns:
+            The StatisticsCube
+        """
+        n_groups = len(cube.group_keys)
+        if weights is None:
+            weights = np.ones(store.n_rows, dtype=np.float64)
+
+        questions = {}
+        for name, column in store.fetch(q for q in store.columns if q not in cube).items():
+            counter = engine.counter(name, column)
+            if counter is None or not is_numeric(counter.values) or len(counter.values) == 0:
+                continue
+            n_values = len(counter.values)
+            valid, positions = counter.positions(column)
+            row_groups = cube.row_groups[valid]
+            row_weights = weights[valid]
+            values = counter.values.astype(np.float64)
+            x = values[positions]
+            center = float(x.mean())
+            x = x - center
+
+            moments = np.zeros((n_groups + 1, 2 * _MOMENTS), dtype=np.float64)
+            for slot, row_values in enumerate(
+                (None, x, x * x, row_weights, row_weights * x, row_weights * x * x)
+            ):
+                moments[1:, slot] = np.bincount(row_groups, weights=row_values, minlength=n_groups)
+            np.cumsum(moments, axis=0, out=moments)
+
+            entries, inverse = np.unique(
+                row_groups.astype(np.int64) * n_values + positions, return_inverse=True
+            )
+            questions[name] = WideQuestion(
+                center, moments,
+                (entries // n_values).astype(np.int32), (entries % n_values).astype(np.int32),
+                np.bincount(inverse, minlength=len(entries)).astype(np.int64),
+                np.bincount(inverse, weights=row_weights, minlength=len(entries)),
+            )
+        return cls(cube, questions)
+
+    @property
+    def nbytes(self) -> int:
+        """Return the size of the statistics in bytes."""
+        return sum(question.nbytes for question in self.questions.values())
+
+    def __contains__(self, question: str) -> bool:
+        return question in self.questions
+
+    def describe(
+        self, question: str, values: np.ndarray, runs: Optional[Tuple[np.ndarray, np.ndarray]],
+        weighted: bool = False
+    ) -> Dict[str, Optional[float]]:
+        """
+        Describe a question over the selected runs of groups.
+
+        The mean and standard deviation come from the merged moments and
+        the median, mode and range from the merged histogram.
+
+        Args:
+            question: Question in the statistics cube
+            values: Answer domain of the question (its counter's values)
+            runs: (starts, ends) group runs (see ResponseCube.group_runs), or
+                None for every group
+            weighted: Whether to use the expansion weights
+
+        Returns:
+            Statistics dictionary (see describe)
+        """
+        wide = self.questions[question]
+        columns = slice(_MOMENTS, 2 * _MOMENTS) if weighted else slice(0, _MOMENTS)
+        if runs is None:
+            total, first, second = wide.moments[-1, columns]
+            entries = slice(None)
+        else:
+            starts, ends = runs
+            total, first, second = (
+                wide.moments[ends, columns] - wide.moments[starts, columns]
+            ).sum(axis=0)
+            entries = _concat_ranges(
+                np.searchsorted(wide.groups, starts), np.searchsorted(wide.groups, ends)
+            )
+
+        totals = np.bincount(
+            wide.positions[entries],
+            weights=(wide.weights if weighted else wide.counts)[entries],
+            minlength=len(values)
+        )
+        present = totals > 0
+        if not present.any():
+            return _summary(weighted, 0, None, None, None, None, None, None)
+
+        present_values = values[present].astype(np.float64)
+        variance = (second - first * first / total) / (total - 1) if total > 1 else None
+        return _summary(
+            weighted, total, wide.center + first / total, variance,
+            _median(present_values, totals[present]),
+            present_values[np.argmax(totals[present])],
+            present_values[0], present_values[-1]
+        )
@@ -0,0 +1,218 @@
+"""
+TURF Module
+
+This module runs TURF (Total Unduplicated Reach and Frequency) analysis over
+the option bitsets of a multiple-response set (see services.multiresponse):
+which combinations of k options reach the most respondents.
+
+The reach of a combination is the popcount of the union (bitwise OR) of its
+option bitsets, or the weight of the rows in the union when weighted. Its
+frequency is the number of selections of its options, so frequency / reach
+is how many of the options a reached respondent named on average.
+
+Combinations are searched exhaustively, in batches of vectorized unions,
+while there are at most MAX_EXHAUSTIVE_COMBINATIONS of them; beyond that a
+greedy search adds, k times, the option that reaches the most new
+respondents. Large exhaustive searches are split by first option across a
+process pool.
+"""
+
+import itertools
+import math
+from concurrent.futures import Executor
+from functools import partial
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from services.indexes import count_rows
+
+
+# Most combinations searched exhaustively; more switch to the greedy search
+MAX_EXHAUSTIVE_COMBINATIONS = 2_000_000
+
+# Fewest combinations worth splitting across the process pool
+PARALLEL_MIN_COMBINATIONS = 100_000
+
+# Decimals of the weighted reach and frequency compared when ranking
+_RANK_DECIMALS = 6
+
+# Bytes of gathered bitsets (plus unpacked rows, when weighted) built per batch
+_BATCH_BYTES = 16 * 1024 * 1024
+
+
+class TurfResult:
+    """Best combinations found by a TURF search."""
+
+    def __init__(
+        self, combinations: np.ndarray, reach: np.ndarray, frequency: np.ndarray, method: str
+    ):
+        """
+        Initialize the result.
+
+        Args:
+            combinations: Option positions of every combination (n x k), best first
+            reach: Reach of every combination
+            frequency: Frequency of every combination
+            method: "exhaustiva" or "voraz"
+        """
+        self.combinations = combinations
+        self.reach = reach
+        self.frequency = frequency
+        self.method = method
+
+    @property
+    def nbytes(self) -> int:
+        """Return the size of the result in bytes."""
+        return self.combinations.nbytes + self.reach.nbytes + self.frequency.nbytes
+
+
+def combination_reach(
+    bitsets: np.ndarray, combinations: np.ndarray, n_rows: int,
+    weights: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Get the reach of combinations of options.
+
+    Args:
+        bitsets: Option bitsets as uint64 words (n_options x n_words)
+        combinations: Option positions of every combination (n x k)
+        n_rows: Number of rows of the bitsets
+        weights: Optional weight of every row; weights are summed instead
+            of counting rows
+
+    Returns:
+        Reach of every combination, int64 or float64 when weighted
+    """
+    unions = np.bitwise_or.reduce(bitsets[combinations], axis=1)
+    if weights is None:
+        return count_rows(unions)
+    return np.unpackbits(unions.view(np.uint8), axis=1, count=n_rows) @ weights
+
+
+def _rank(reach: np.ndarray, frequency: np.ndarray, top: int) -> np.ndarray:
+    """
+    Order of the top combinations: most reach, then most frequency, then first found.
+
+    Weighted reaches of the same rows can differ in the last bits, depending
+    on how the product summed them, so they are compared rounded.
+    """
+    order = np.lexsort(
+        (-np.round(frequency, _RANK_DECIMALS), -np.round(reach, _RANK_DECIMALS))
+    )
+    return order[:top]
+
+
+def _batch_size(bitsets: np.ndarray, n_rows: int, k: int, weighted: bool) -> int:
+    """Combinations per batch so a batch builds about _BATCH_BYTES."""
+    row_bytes = bitsets.shape[1] * 8 * k + (n_rows if weighted else 0)
+    return max(1, _BATCH_BYTES // max(row_bytes, 1))
+
+
+def _search_first(
+    bitsets: np.ndarray, selections: np.ndarray, n_rows: int,
+    weights: Optional[np.ndarray], k: int, top: int, first: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Search every combination of k options whose first option is first.
+
+    Runs in the process pool, so it takes and returns plain arrays.
+
+    Returns:
+        Tuple of (combinations, reach, frequency) of the best top
+        combinations, best first
+    """
+    n_options = len(bitsets)
+    rests = itertools.combinations(range(first + 1, n_options), k - 1)
+    batch_size = _batch_size(bitsets, n_rows, k, weights is not None)
+
+    best_combinations = np.empty((0, k), dtype=np.int64)
+    best_reach = np.empty(0, dtype=np.int64 if weights is None else np.float64)
+    best_frequency = np.empty(0, dtype=selections.dtype)
+    while True:
+        batch = list(itertools.islice(rests, batch_size))
+        if not batch:
+            break
+        combinations = np.empty((len(batch), k), dtype=np.int64)
+        combinations[:, 0] = first
+        combinations[:, 1:] = np.array(batch, dtype=np.int64).reshape(len(batch), k - 1)
+
+        combinations = np.concatenate([best_combinations, combinations])
+        reach = np.concatenate(
+            [best_reach, combination_reach(bitsets, combinations[len(best_reach):], n_rows, weights)]
+        )
+        frequency = selections[combinations].sum(axis=1)
+        order = _rank(reach, frequency, top)
+        best_combinations, best_reach, best_frequency = (
+            combinations[order], reach[order], frequency[order]
+        )
+    return best_combinations, best_reach, best_frequency
+
+
+def _exhaustive(
+    bitsets: np.ndarray, selections: np.ndarray, n_rows: int,
+    weights: Optional[np.ndarray], k: int, top: int, executor: Optional[Executor]
+) -> TurfResult:
+    """Search every combination of k options, split by first option."""
+    firsts = range(len(bitsets) - k + 1)
+    search_first = partial(_search_first, bitsets, selections, n_rows, weights, k, top)
+    if executor is not None and math.comb(len(bitsets), k) >= PARALLEL_MIN_COMBINATIONS:
+        parts = list(executor.map(search_first, firsts))
+    else:
+        parts = [search_first(first) for first in firsts]
+
+    combinations, reach, frequency = (np.concatenate(arrays) for arrays in zip(*parts))
+    order = _rank(reach, frequency, top)
+    return TurfResult(combinations[order], reach[order], frequency[order], "exhaustiva")
+
+
+def _greedy(
+    bitsets: np.ndarray, selections: np.ndarray, n_rows: int,
+    weights: Optional[np.ndarray], k: int, top: int
+) -> TurfResult:
+    """
+    Add, k times, the option that reaches the most new respondents.
+
+    The top combinations are the k - 1 chosen options with each candidate
+    for the last one.
+    """
+    chosen: List[int] = []
+    remaining = np.arange(len(bitsets))
+    for _ in range(k):
+        combinations = np.column_stack(
+            [np.tile(np.array(chosen, dtype=np.int64), (len(remaining), 1)), remaining]
+        )
+        reach = combination_reach(bitsets, combinations, n_rows, weights)
+        frequency = selections[combinations].sum(axis=1)
+        order = _rank(reach, frequency, top)
+        best = int(remaining[order[0]])
+        chosen.append(best)
+        remaining = remaining[remaining != best]
+    return TurfResult(combinations[order], reach[order], frequency[order], "voraz")
+
+
+def search(
+    bitsets: np.ndarray, selections: np.ndarray, n_rows: int, k: int, top: int,
+    weights: Optional[np.ndarray] = None, executor: Optional[Executor] = None
+) -> TurfResult:
+    """
+    Find the combinations of k options with the most reach.
+
+    Args:
+        bitsets: Option bitsets as uint64 words (n_options x n_words),
+            already intersected with the filtered rows
+        selections: Selections of every option (weighted when weights are given)
+        n_rows: Number of rows of the bitsets
+        k: Options per combination, between 1 and n_options
+        top: Number of combinations to return
+        weights: Optional weight of every row; weights are summed instead
+            of counting rows
+        executor: Optional process pool for large exhaustive searches
+
+    Returns:
+        The TurfResult; exhaustive up to MAX_EXHAUSTIVE_COMBINATIONS
+        combinations, greedy beyond
+    """
+    if math.comb(len(bitsets), k) <= MAX_EXHAUSTIVE_COMBINATIONS:
+        return _exhaustive(bitsets, selections, n_rows, weights, k, top, executor)
+    return _greedy(bitsets, selections, n_rows, weights, k, top)
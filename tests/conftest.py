@@ -0,0 +1,26 @@
+"""Shared fixtures: datos.sav read by the SAV reader and by pandas."""
+
+import os
+
+import pyreadstat
+import pytest
+
+from services.sav_reader import SAVReader
+
+
+DATA_FILE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "datos.sav")
+
+
+@pytest.fixture(scope="session")
+def frame():
+    """Rows of datos.sav as a pandas DataFrame, the reference for every engine."""
+    df, _ = pyreadstat.read_sav(DATA_FILE_PATH)
+    return df
+
+
+@pytest.fixture(scope="session")
+def reader(tmp_path_factory):
+    """SAV reader over datos.sav, with its snapshots in a temporary directory."""
+    sav_reader = SAVReader(DATA_FILE_PATH, cache_dir=str(tmp_path_factory.mktemp("sav_cache")))
+    yield sav_reader
+    sav_reader.shutdown_workers()
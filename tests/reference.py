@@ -0,0 +1,87 @@
+"""Reference results computed with plain pandas."""
+
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+
+# Column of every simple filter of SAVReader
+FILTER_COLUMNS = {
+    "calidad_vida": "CALIDAD_VIDA",
+    "municipio": "Q_94",
+    "sexo": "SEXO",
+    "escolaridad": "ESC",
+    "nse": "NSE2024_C",
+}
+
+AGE_COLUMN = "Q_75"
+
+
+def range_mask(column: pd.Series, low=None, high=None) -> np.ndarray:
+    """Non-missing rows of a column within an inclusive range."""
+    mask = column.notna()
+    if low is not None:
+        mask = mask & (column >= low)
+    if high is not None:
+        mask = mask & (column <= high)
+    return mask.to_numpy()
+
+
+def expression_mask(frame: pd.DataFrame, expression: dict) -> np.ndarray:
+    """Rows matching a filter expression (see services.filters)."""
+    if "y" in expression:
+        return np.logical_and.reduce([expression_mask(frame, child) for child in expression["y"]])
+    if "o" in expression:
+        return np.logical_or.reduce([expression_mask(frame, child) for child in expression["o"]])
+    if "no" in expression:
+        return ~expression_mask(frame, expression["no"])
+
+    column = frame[expression["variable"]]
+    if "valores" in expression:
+        return column.isin(expression["valores"]).to_numpy()
+    return range_mask(column, expression.get("min"), expression.get("max"))
+
+
+def filter_mask(frame: pd.DataFrame, filtros: dict) -> np.ndarray:
+    """Rows matching the filters of SAVReader (simple filters and expresion)."""
+    mask = np.ones(len(frame), dtype=bool)
+    for name, value in filtros.items():
+        if name == "edad":
+            mask = mask & range_mask(frame[AGE_COLUMN], value.get("min"), value.get("max"))
+        elif name == "expresion":
+            mask = mask & expression_mask(frame, value)
+        else:
+            mask = mask & (frame[FILTER_COLUMNS[name]] == value).to_numpy()
+    return mask
+
+
+def as_expression(filtros: dict) -> dict:
+    """The filter expression equivalent to simple filters."""
+    children = []
+    for name, value in filtros.items():
+        if name == "edad":
+            children.append({"variable": AGE_COLUMN, **value})
+        else:
+            children.append({"variable": FILTER_COLUMNS[name], "valores": [value]})
+    return {"y": children}
+
+
+def value_counts(
+    frame: pd.DataFrame, question: str, mask: np.ndarray, weighted: bool = False
+) -> Dict[float, float]:
+    """Answer counts (or FACTOR sums when weighted) of a question over the masked rows."""
+    rows = frame.loc[mask & frame[question].notna().to_numpy()]
+    if weighted:
+        counts = rows.groupby(question)["FACTOR"].sum()
+        return {value: round(float(total), 2) for value, total in counts.items() if total > 0}
+    counts = rows[question].value_counts()
+    return {value: int(count) for value, count in counts.items()}
+
+
+def response_counts(response: dict) -> dict:
+    """Answer counts of a SAVReader response, without the answers nobody gave."""
+    return {
+        answer["valor"]: answer["cantidad"]
+        for answer in response["respuestas"] if answer["cantidad"]
+    }
@@ -0,0 +1,106 @@
+"""Streaming mode: counts from per-segment aggregates against pandas."""
+
+import os
+
+import pyreadstat
+import pytest
+
+from services.aggregates import aggregates_path_for, read_aggregates, write_aggregates
+from services.column_store import file_fingerprint
+from services.sav_reader import QuestionNotFoundError, SAVReader, UnsupportedInModeError
+from tests.conftest import DATA_FILE_PATH
+from tests.reference import filter_mask, response_counts, value_counts
+
+
+QUESTIONS = ["Q_1", "Q_4", "Q_95", "T_Q_12_1", "T_Q_25_1", "Q_34_O1", "Q_45", "Q_75"]
+
+FILTERS = [
+    {},
+    {"sexo": 2},
+    {"municipio": 3, "nse": 2},
+    {"edad": {"min": 18, "max": 30}},
+    {"escolaridad": 3, "calidad_vida": 3, "edad": {"min": 60}},
+    {"municipio": 99},
+]
+
+
+@pytest.fixture(scope="module")
+def cache_dir(tmp_path_factory):
+    return str(tmp_path_factory.mktemp("aggregates"))
+
+
+@pytest.fixture(scope="module")
+def streaming_reader(cache_dir):
+    """SAV reader in streaming mode, reading the file in small chunks."""
+    return SAVReader(DATA_FILE_PATH, cache_dir=cache_dir, streaming=True, chunksize=500)
+
+
+@pytest.mark.parametrize("ponderado", [False, True])
+@pytest.mark.parametrize("filtros", FILTERS)
+@pytest.mark.parametrize("question", QUESTIONS)
+def test_streaming_counts_match_pandas(streaming_reader, frame, question, filtros, ponderado):
+    response = streaming_reader.get_question_responses_with_filters(
+        question, filtros=filtros, ponderado=ponderado
+    )
+    expected = value_counts(frame, question, filter_mask(frame, filtros), weighted=ponderado)
+
+    assert response_counts(response) == pytest.approx(expected, abs=0.01)
+
+
+def test_unfiltered_counts_match_pandas(streaming_reader, frame):
+    response = streaming_reader.get_question_responses("Q_1")
+
+    assert response_counts(response) == value_counts(frame, "Q_1", filter_mask(frame, {}))
+
+
+def test_aggregates_are_reused_after_restart(streaming_reader, cache_dir, frame, monkeypatch):
+    streaming_reader.get_question_responses("Q_1")
+
+    def read_file_in_chunks(*args, **kwargs):
+        raise AssertionError("the file was streamed again")
+
+    monkeypatch.setattr(pyreadstat, "read_file_in_chunks", read_file_in_chunks)
+    restarted = SAVReader(DATA_FILE_PATH, cache_dir=cache_dir, streaming=True)
+    response = restarted.get_question_responses_with_filters("Q_4", filtros={"sexo": 1})
+
+    assert response_counts(response) == value_counts(frame, "Q_4", filter_mask(frame, {"sexo": 1}))
+
+
+def test_new_aggregates_are_published_through_the_pointer(streaming_reader, cache_dir):
+    streaming_reader.get_question_responses("Q_1")
+    path = aggregates_path_for(DATA_FILE_PATH, cache_dir)
+    aggregates = read_aggregates(path, DATA_FILE_PATH)
+    with open(path, encoding="utf-8") as f:
+        current = f.read()
+
+    # Aggregates of other contents of the file replace the current version
+    write_aggregates(aggregates, path, dict(file_fingerprint(DATA_FILE_PATH), sha256="0" * 64))
+
+    with open(path, encoding="utf-8") as f:
+        published = f.read()
+    assert published != current
+    versions = [entry for entry in os.listdir(cache_dir) if entry.startswith("datos.sav.aggregates.v")]
+    assert versions == [published]
+    write_aggregates(aggregates, path, file_fingerprint(DATA_FILE_PATH))
+    assert read_aggregates(path, DATA_FILE_PATH) is not None
+
+
+@pytest.mark.parametrize("question", ["SbjNum", "Date", "Duration", "T_Q_92_2"])
+def test_wide_columns_are_not_available(streaming_reader, question):
+    with pytest.raises(UnsupportedInModeError):
+        streaming_reader.get_question_responses(question)
+    with pytest.raises(QuestionNotFoundError):
+        streaming_reader.get_question_responses("NOPE")
+
+
+def test_wide_columns_are_a_client_error(streaming_reader, monkeypatch):
+    fastapi_testclient = pytest.importorskip("fastapi.testclient")
+    import main
+
+    monkeypatch.setattr(main, "sav_reader", streaming_reader)
+    client = fastapi_testclient.TestClient(main.app)
+
+    assert client.get("/respuestas/SbjNum").status_code == 422
+    assert client.post("/respuestas/SbjNum/filtros", json={"sexo": 1}).status_code == 422
+    assert client.post("/respuestas/batch", json={"preguntas": ["Q_1", "SbjNum"]}).status_code == 422
+    assert client.get("/respuestas/NOPE").status_code == 404
@@ -0,0 +1,90 @@
+"""Rating batteries against pandas."""
+
+import numpy as np
+import pytest
+
+from services.sav_reader import QuestionNotFoundError, SAVReader, UnsupportedInModeError
+from tests.conftest import DATA_FILE_PATH
+from tests.reference import filter_mask
+
+
+BATTERIES = ["T_Q_12", "T_Q_25", "T_Q_72"]
+
+FILTERS = [
+    {},
+    {"sexo": 2},
+    {"municipio": 3, "nse": 2},
+    {"edad": {"min": 18, "max": 30}},
+    {"expresion": {"variable": "Q_1", "valores": [4, 5]}},
+]
+
+
+def reference(frame, columns, values, filtros, weighted):
+    """Item x scale-point counts (or FACTOR sums) of the filtered rows."""
+    rows = frame.loc[filter_mask(frame, filtros)]
+    weights = rows["FACTOR"].to_numpy() if weighted else np.ones(len(rows))
+    return np.array([
+        [weights[(rows[column] == value).to_numpy()].sum() for value in values]
+        for column in columns
+    ])
+
+
+@pytest.mark.parametrize("ponderado", [False, True])
+@pytest.mark.parametrize("filtros", FILTERS)
+@pytest.mark.parametrize("base_id", BATTERIES)
+def test_battery_matches_pandas(reader, frame, base_id, filtros, ponderado):
+    battery = reader.get_battery(base_id, filtros=filtros, ponderado=ponderado)
+    columns = [item["identificador"] for item in battery["items"]]
+    values = [point["valor"] for point in battery["escala"]]
+
+    answered = frame[columns].stack().dropna().unique()
+    assert set(answered) <= set(values)
+    expected = reference(frame, columns, values, filtros, ponderado)
+    assert np.allclose(battery["cantidades"], expected, atol=0.01)
+    assert np.allclose(battery["total_items"], expected.sum(axis=1), atol=0.05)
+
+
+def test_percentages_add_up_per_item(reader):
+    battery = reader.get_battery("T_Q_25")
+
+    assert np.allclose(np.sum(battery["porcentajes"], axis=1), 100, atol=0.1)
+
+
+def test_listing_names_the_items(reader, frame):
+    listing = {battery["identificador"]: battery["columnas"] for battery in reader.get_batteries()}
+
+    assert listing["T_Q_25"] == [f"T_Q_25_{item}" for item in range(1, 7)]
+    assert all(set(columns) <= set(frame.columns) for columns in listing.values())
+
+
+def test_listing_reads_only_the_metadata(tmp_path, monkeypatch):
+    fresh_reader = SAVReader(DATA_FILE_PATH, cache_dir=str(tmp_path))
+
+    def load_dataset():
+        raise AssertionError("the rows were loaded")
+
+    monkeypatch.setattr(fresh_reader, "_load_dataset", load_dataset)
+    listing = [battery["identificador"] for battery in fresh_reader.get_batteries()]
+
+    assert "T_Q_25" in listing and "T_Q_92" not in listing
+
+
+def test_every_listed_battery_can_be_requested(reader):
+    listing = [battery["identificador"] for battery in reader.get_batteries()]
+
+    assert "T_Q_92" not in listing
+    for base_id in listing:
+        assert reader.get_battery(base_id)["cantidades"]
+
+
+@pytest.mark.parametrize("base_id", ["T_Q_999", "T_Q_92"])
+def test_unknown_and_text_batteries_are_rejected(reader, base_id):
+    with pytest.raises(QuestionNotFoundError):
+        reader.get_battery(base_id)
+
+
+def test_streaming_mode_is_rejected(tmp_path):
+    streaming_reader = SAVReader(DATA_FILE_PATH, cache_dir=str(tmp_path), streaming=True)
+
+    with pytest.raises(UnsupportedInModeError):
+        streaming_reader.get_battery("T_Q_25")
@@ -0,0 +1,61 @@
+"""Column stores: eager and on-demand columns against pandas."""
+
+import pytest
+
+from services.sav_reader import SAVReader
+from tests.conftest import DATA_FILE_PATH
+from tests.reference import filter_mask, response_counts, value_counts
+
+
+BUDGET_BYTES = 20_000
+
+QUESTIONS = ["Q_1", "Q_4", "Q_95", "T_Q_12_1", "T_Q_25_1", "Q_34_O1", "Q_45", "SEXO"]
+
+FILTERS = [
+    {"sexo": 2},
+    {"municipio": 3, "nse": 2},
+    {"edad": {"min": 18, "max": 30}},
+    {"escolaridad": 3, "calidad_vida": 3, "edad": {"min": 60}},
+]
+
+
+@pytest.fixture(scope="module")
+def lazy_reader():
+    """SAV reader that loads columns on demand under a small budget."""
+    return SAVReader(DATA_FILE_PATH, column_budget_bytes=BUDGET_BYTES)
+
+
+@pytest.mark.parametrize("question", QUESTIONS)
+def test_responses_match_pandas(reader, lazy_reader, frame, question):
+    expected = value_counts(frame, question, filter_mask(frame, {}))
+
+    assert response_counts(reader.get_question_responses(question)) == expected
+    assert response_counts(lazy_reader.get_question_responses(question)) == expected
+
+
+@pytest.mark.parametrize("filtros", FILTERS)
+@pytest.mark.parametrize("question", QUESTIONS)
+def test_filtered_responses_match_pandas(reader, lazy_reader, frame, question, filtros):
+    expected = value_counts(frame, question, filter_mask(frame, filtros))
+
+    eager = reader.get_question_responses_with_filters(question, filtros=filtros)
+    lazy = lazy_reader.get_question_responses_with_filters(question, filtros=filtros)
+
+    assert response_counts(eager) == expected
+    assert response_counts(lazy) == expected
+    assert lazy["filtros_aplicados"] == filtros
+
+
+def test_lazy_columns_stay_within_budget(lazy_reader):
+    for question in QUESTIONS:
+        lazy_reader.get_question_responses_with_filters(question, filtros=FILTERS[-1])
+
+    stats = lazy_reader.get_column_cache_stats()
+    assert 0 < stats["bytes"] <= BUDGET_BYTES
+    assert stats["desalojos"] > 0
+
+
+def test_eager_reader_has_no_column_cache(reader):
+    reader.load_data()
+
+    assert reader.get_column_cache_stats() is None
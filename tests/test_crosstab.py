@@ -0,0 +1,45 @@
+"""Contingency tables against pandas.crosstab."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.sav_reader import InvalidVariableError, QuestionNotFoundError
+from tests.reference import filter_mask
+
+
+CASES = [
+    ("SEXO", "Q_1", {}),
+    ("Q_94", "T_Q_12_1", {"sexo": 2}),
+    ("ESC", "Q_4", {"edad": {"min": 18, "max": 30}}),
+    ("Q_34_O1", "NSE2024_C", {"expresion": {"variable": "Q_1", "valores": [4, 5]}}),
+]
+
+
+def reference(frame, var1, var2, weight, filtros):
+    rows = frame.loc[filter_mask(frame, filtros)].dropna(subset=[var1, var2])
+    if weight is None:
+        table = pd.crosstab(rows[var1], rows[var2])
+    else:
+        table = pd.crosstab(rows[var1], rows[var2], values=rows[weight], aggfunc="sum").fillna(0)
+    return table.loc[table.sum(axis=1) > 0, table.sum(axis=0) > 0]
+
+
+@pytest.mark.parametrize("weight", [None, "FACTOR"])
+@pytest.mark.parametrize("var1,var2,filtros", CASES)
+def test_crosstab_matches_pandas(reader, frame, var1, var2, filtros, weight):
+    table = reader.get_crosstab(var1, var2, weight=weight, filtros=filtros)
+    expected = reference(frame, var1, var2, weight, filtros)
+
+    assert [row["valor"] for row in table["filas"]] == list(expected.index)
+    assert [column["valor"] for column in table["columnas"]] == list(expected.columns)
+    assert np.allclose(table["cantidades"], expected.to_numpy(), atol=0.01)
+    assert table["total"] == pytest.approx(expected.to_numpy().sum(), abs=0.01)
+    assert np.allclose(np.sum(table["porcentaje_fila"], axis=1), 100, atol=0.1)
+
+
+def test_crosstab_rejects_unknown_variables(reader):
+    with pytest.raises(QuestionNotFoundError):
+        reader.get_crosstab("SEXO", "NOPE")
+    with pytest.raises(InvalidVariableError):
+        reader.get_crosstab("SEXO", "FACTOR")
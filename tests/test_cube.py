@@ -0,0 +1,85 @@
+"""Response cube counts against row-mask counts and pandas."""
+
+import pytest
+
+from services.sav_reader import SAVReader
+from tests.conftest import DATA_FILE_PATH
+from tests.reference import as_expression, filter_mask, response_counts, value_counts
+
+
+FILTERS = [
+    {"sexo": 2},
+    {"municipio": 3, "nse": 2},
+    {"edad": {"min": 18, "max": 30}},
+    {"escolaridad": 3, "edad": {"min": 45}},
+    {"calidad_vida": 1, "sexo": 1, "edad": {"max": 25}},
+    {"municipio": 6, "sexo": 2, "escolaridad": 1, "nse": 4},
+]
+
+QUESTIONS = ["Q_1", "Q_4", "T_Q_12_1", "Q_34_O1"]
+
+
+@pytest.fixture(scope="module")
+def mask_reader():
+    """SAV reader without a cube (columns on demand), which counts over row masks."""
+    return SAVReader(DATA_FILE_PATH, column_budget_bytes=10_000_000)
+
+
+def test_questions_are_counted_from_the_cube(reader, mask_reader):
+    cube = reader._load_dataset().cube
+
+    assert cube is not None
+    assert all(question in cube for question in QUESTIONS)
+    assert mask_reader._load_dataset().cube is None
+
+
+@pytest.mark.parametrize("ponderado", [False, True])
+@pytest.mark.parametrize("filtros", FILTERS)
+@pytest.mark.parametrize("question", QUESTIONS)
+def test_cube_counts_match_mask_counts(reader, mask_reader, frame, question, filtros, ponderado):
+    from_cube = reader.get_question_responses_with_filters(question, filtros=filtros, ponderado=ponderado)
+    from_mask = mask_reader.get_question_responses_with_filters(
+        question, filtros=filtros, ponderado=ponderado
+    )
+    expected = value_counts(frame, question, filter_mask(frame, filtros), weighted=ponderado)
+
+    assert response_counts(from_cube) == pytest.approx(expected, abs=0.01)
+    assert response_counts(from_mask) == pytest.approx(expected, abs=0.01)
+
+
+@pytest.mark.parametrize("ponderado", [False, True])
+@pytest.mark.parametrize("filtros", FILTERS)
+@pytest.mark.parametrize("question", QUESTIONS)
+def test_cube_counts_match_expression_counts(reader, frame, question, filtros, ponderado):
+    # The simple filters are answered by the cube, the equivalent expression
+    # by the row mask of its compiled plan
+    from_cube = reader.get_question_responses_with_filters(question, filtros=filtros, ponderado=ponderado)
+    from_plan = reader.get_question_responses_with_filters(
+        question, filtros={"expresion": as_expression(filtros)}, ponderado=ponderado
+    )
+    expected = value_counts(frame, question, filter_mask(frame, filtros), weighted=ponderado)
+
+    assert response_counts(from_plan) == pytest.approx(response_counts(from_cube), abs=0.01)
+    assert response_counts(from_plan) == pytest.approx(expected, abs=0.01)
+
+
+def test_filter_without_rows_counts_nothing(reader):
+    response = reader.get_question_responses_with_filters("Q_1", filtros={"municipio": 99})
+
+    assert response_counts(response) == {}
+
+
+def test_weight_sums_are_built_by_the_first_weighted_count(tmp_path, frame):
+    fresh_reader = SAVReader(DATA_FILE_PATH, cache_dir=str(tmp_path))
+    fresh_reader.get_question_responses_with_filters("Q_1", filtros={"sexo": 2})
+    cube = fresh_reader._load_dataset().cube
+    unweighted_nbytes = cube.nbytes
+
+    assert cube._weighted_cumulative is None
+    response = fresh_reader.get_question_responses_with_filters(
+        "Q_1", filtros={"sexo": 2}, ponderado=True
+    )
+
+    expected = value_counts(frame, "Q_1", filter_mask(frame, {"sexo": 2}), weighted=True)
+    assert response_counts(response) == pytest.approx(expected, abs=0.01)
+    assert cube.nbytes == unweighted_nbytes + cube.weighted_cumulative.nbytes
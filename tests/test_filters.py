@@ -0,0 +1,94 @@
+"""Filter expressions: normalization and results against pandas."""
+
+import pytest
+
+from services.filters import FilterExpressionError, canonical_text, normalize
+from services.sav_reader import InvalidFilterError
+from tests.reference import expression_mask, response_counts, value_counts
+
+
+COLUMNS = {"Q_1", "Q_45", "Q_75", "SEXO"}
+
+
+def test_normalize_flattens_sorts_and_deduplicates():
+    expression = {"y": [
+        {"variable": "SEXO", "valores": [1.0]},
+        {"y": [{"variable": "Q_1", "valores": [5, 4, 4.0]}, {"variable": "SEXO", "valores": [1]}]},
+    ]}
+    reordered = {"y": [
+        {"variable": "Q_1", "valores": [4, 5]},
+        {"variable": "SEXO", "valores": [1]},
+    ]}
+
+    normalized = normalize(expression, COLUMNS)
+
+    assert normalized == normalize(reordered, COLUMNS)
+    assert len(normalized["y"]) == 2
+    assert {"variable": "Q_1", "valores": [4, 5]} in normalized["y"]
+    assert canonical_text(normalized) == canonical_text(normalize(reordered, COLUMNS))
+
+
+def test_normalize_collapses_single_operand_groups():
+    condition = {"variable": "Q_75", "min": 18.0, "max": 30}
+
+    assert normalize({"o": [condition, condition]}, COLUMNS) == {"variable": "Q_75", "min": 18, "max": 30}
+
+
+def test_double_negation_cancels():
+    condition = {"variable": "Q_1", "valores": [1, 2]}
+
+    assert normalize({"no": {"no": condition}}, COLUMNS) == normalize(condition, COLUMNS)
+    assert normalize({"no": {"no": {"no": condition}}}, COLUMNS) == {"no": normalize(condition, COLUMNS)}
+
+
+@pytest.mark.parametrize("expression", [
+    {"variable": "NOPE", "valores": [1]},
+    {"variable": "Q_1"},
+    {"variable": "Q_1", "valores": []},
+    {"variable": "Q_1", "valores": [1], "min": 1},
+    {"variable": "Q_1", "min": True},
+    {"y": []},
+    {"x": 1},
+    {"y": [{"variable": "Q_1", "valores": [1]}], "o": []},
+])
+def test_normalize_rejects_invalid_expressions(expression):
+    with pytest.raises(FilterExpressionError):
+        normalize(expression, COLUMNS)
+
+
+def test_invalid_expression_is_an_invalid_filter(reader):
+    with pytest.raises(InvalidFilterError):
+        reader.get_question_responses_with_filters("Q_1", filtros={"expresion": {"x": 1}})
+
+
+def test_missing_answers_match_negation(reader, frame):
+    # Q_45 is only asked to some respondents
+    condition = {"variable": "Q_45", "valores": [1]}
+    negation = {"no": condition}
+    assert frame["Q_45"].isna().any()
+
+    matched = reader.get_question_responses_with_filters("Q_1", filtros={"expresion": condition})
+    negated = reader.get_question_responses_with_filters("Q_1", filtros={"expresion": negation})
+
+    assert response_counts(negated) == value_counts(frame, "Q_1", expression_mask(frame, negation))
+    assert matched["total_respuestas"] + negated["total_respuestas"] == len(frame)
+
+
+@pytest.mark.parametrize("expression", [
+    {"variable": "Q_1", "valores": [4, 5]},
+    {"variable": "Q_75", "min": 18, "max": 30},
+    {"variable": "T_Q_25_1", "max": 2},
+    {"no": {"variable": "T_Q_25_1", "min": 3}},
+    {"no": {"no": {"variable": "SEXO", "valores": [2]}}},
+    {"y": [{"variable": "SEXO", "valores": [1]}, {"o": [
+        {"variable": "Q_94", "valores": [2, 6]},
+        {"no": {"variable": "Q_45", "valores": [1, 2]}},
+    ]}]},
+    {"o": [{"variable": "Q_75", "max": 25}, {"variable": "Q_75", "min": 60}, {"variable": "ESC", "valores": [3]}]},
+])
+@pytest.mark.parametrize("question", ["Q_4", "T_Q_12_1"])
+def test_expressions_match_pandas(reader, frame, expression, question):
+    response = reader.get_question_responses_with_filters(question, filtros={"expresion": expression})
+
+    assert response_counts(response) == value_counts(frame, question, expression_mask(frame, expression))
+    assert response["filtros_aplicados"]["expresion"] == normalize(expression, frame.columns)
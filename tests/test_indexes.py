@@ -0,0 +1,38 @@
+"""Range bitsets of the sorted age index against pandas."""
+
+import numpy as np
+import pytest
+
+from services import indexes
+from services.indexes import SortedIndex, unpack_rows
+from tests.reference import AGE_COLUMN, range_mask
+
+
+RANGES = [
+    (None, None),
+    (18, 30),
+    (30.5, 45),
+    (60, None),
+    (None, 25),
+    (-2, 18),
+    (40, 39),
+    (200, None),
+]
+
+
+@pytest.fixture(scope="module")
+def age_column(reader):
+    return reader._load_dataset().store[AGE_COLUMN]
+
+
+@pytest.mark.parametrize("low, high", RANGES)
+def test_cumulative_and_scattered_ranges_match_pandas(frame, age_column, monkeypatch, low, high):
+    expected = range_mask(frame[AGE_COLUMN], low, high)
+    cumulative = SortedIndex.build(age_column)
+    monkeypatch.setattr(indexes, "MAX_CUMULATIVE_BITSETS", 0)
+    scattered = SortedIndex.build(age_column)
+
+    for index in (cumulative, scattered):
+        rows = unpack_rows(index.rows_between(low, high), len(frame))
+        assert np.array_equal(rows, expected)
+    assert cumulative.nbytes > scattered.nbytes
@@ -0,0 +1,116 @@
+"""Multiple-response sets against pandas."""
+
+import numpy as np
+import pytest
+
+from services.multiresponse import MultiResponseSet
+from services.sav_reader import QuestionNotFoundError, SAVReader, UnsupportedInModeError
+from tests.conftest import DATA_FILE_PATH
+from tests.reference import filter_mask
+
+
+SETS = ["Q_23", "Q_34", "Q_46", "Q_67"]
+
+FILTERS = [
+    {},
+    {"sexo": 2},
+    {"municipio": 3, "nse": 2},
+    {"edad": {"min": 18, "max": 30}},
+    {"expresion": {"variable": "Q_1", "valores": [4, 5]}},
+]
+
+
+@pytest.fixture(scope="module")
+def lazy_reader():
+    """SAV reader loading columns on demand."""
+    return SAVReader(DATA_FILE_PATH, column_budget_bytes=10_000_000)
+
+
+def mentions(frame, base_id, filtros):
+    """Mention columns of a set over the filtered rows, and the rows' weights."""
+    rows = frame.loc[filter_mask(frame, filtros)]
+    columns = [column for column in frame.columns if column.startswith(f"{base_id}_O")]
+    return rows[columns].to_numpy(), rows["FACTOR"].to_numpy()
+
+
+@pytest.mark.parametrize("ponderado", [False, True])
+@pytest.mark.parametrize("filtros", FILTERS)
+@pytest.mark.parametrize("base_id", SETS)
+def test_selections_match_pandas(reader, lazy_reader, frame, base_id, filtros, ponderado):
+    answers, weights = mentions(frame, base_id, filtros)
+    if not ponderado:
+        weights = np.ones(len(weights))
+    present = np.unique(answers[~np.isnan(answers)])
+    respondents = weights[(~np.isnan(answers)).any(axis=1)].sum()
+
+    for sav_reader in (reader, lazy_reader):
+        result = sav_reader.get_multi_response(base_id, filtros=filtros, ponderado=ponderado)
+        selections = {option["valor"]: option["selecciones"] for option in result["opciones"]}
+
+        assert set(present) <= set(selections)
+        for value, selected in selections.items():
+            assert selected == pytest.approx(weights[(answers == value).any(axis=1)].sum(), abs=0.01)
+        assert result["total_encuestados"] == pytest.approx(respondents, abs=0.01)
+        assert result["total_menciones"] == pytest.approx(sum(selections.values()), abs=0.05)
+
+
+def test_percentages_of_respondents_and_mentions(reader):
+    result = reader.get_multi_response("Q_34")
+
+    for option in result["opciones"]:
+        assert option["porcentaje_encuestados"] == pytest.approx(
+            100 * option["selecciones"] / result["total_encuestados"], abs=0.01
+        )
+        assert option["porcentaje_menciones"] == pytest.approx(
+            100 * option["selecciones"] / result["total_menciones"], abs=0.01
+        )
+
+
+def test_unknown_sets_are_not_found(reader):
+    with pytest.raises(QuestionNotFoundError):
+        reader.get_multi_response("Q_1")
+
+
+def test_streaming_mode_is_rejected(tmp_path):
+    streaming_reader = SAVReader(DATA_FILE_PATH, cache_dir=str(tmp_path), streaming=True)
+
+    with pytest.raises(UnsupportedInModeError):
+        streaming_reader.get_multi_response("Q_34")
+
+
+@pytest.mark.parametrize("ponderado", [False, True])
+@pytest.mark.parametrize("filtros", FILTERS)
+@pytest.mark.parametrize("base_id", SETS)
+def test_cooccurrence_matches_pandas(reader, frame, base_id, filtros, ponderado):
+    answers, weights = mentions(frame, base_id, filtros)
+    if not ponderado:
+        weights = np.ones(len(weights))
+
+    result = reader.get_multi_response_cooccurrence(base_id, filtros=filtros, ponderado=ponderado)
+    values = [option["valor"] for option in result["opciones"]]
+    selected = np.array([(answers == value).any(axis=1) for value in values])
+    pairs = (selected[:, None, :] & selected[None, :, :]) @ weights
+    respondents = weights[(~np.isnan(answers)).any(axis=1)].sum()
+    selections = np.diag(pairs)
+
+    assert np.allclose(result["coocurrencias"], pairs, atol=0.01)
+    assert np.allclose([option["selecciones"] for option in result["opciones"]], selections, atol=0.01)
+    assert result["total_encuestados"] == pytest.approx(respondents, abs=0.01)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lift = pairs * respondents / np.outer(selections, selections)
+    for row, expected_row in zip(result["lift"], lift):
+        for value, expected in zip(row, expected_row):
+            if np.isfinite(expected):
+                assert value == pytest.approx(expected, abs=1e-3)
+            else:
+                assert value is None
+
+
+def test_non_substantive_options_are_matched_without_accents():
+    labels = ["Votar", "Ningún", "NINGUNA de las anteriores", "No sabe/No contestó", "No aplica", "Ninguneo"]
+    options = MultiResponseSet(
+        np.arange(len(labels), dtype=np.float64), np.array(labels, dtype=object),
+        np.zeros((len(labels) + 1, 1), dtype=np.uint64), 0
+    )
+
+    assert options.non_substantive().tolist() == [False, True, True, True, True, False]
@@ -0,0 +1,113 @@
+"""Change detection of the SAV file and reloads."""
+
+import os
+import shutil
+
+import pyreadstat
+import pytest
+
+from services.sav_reader import SAVReader, SAVReaderError
+from tests.conftest import DATA_FILE_PATH
+
+
+@pytest.fixture
+def copy_reader(tmp_path):
+    """SAV reader over a copy of datos.sav, with its data loaded."""
+    file_path = tmp_path / "datos.sav"
+    shutil.copyfile(DATA_FILE_PATH, file_path)
+    sav_reader = SAVReader(str(file_path), cache_dir=str(tmp_path / "sav_cache"))
+    sav_reader.get_question_responses("Q_1")
+    return sav_reader
+
+
+def total(sav_reader) -> int:
+    return sav_reader.get_question_responses("SEXO")["total_respuestas"]
+
+
+def replace_with_rows(file_path: str, n_rows: int):
+    """Overwrite the SAV file with its first n_rows rows."""
+    df, meta = pyreadstat.read_sav(file_path)
+    pyreadstat.write_sav(
+        df.head(n_rows), file_path, column_labels=meta.column_labels,
+        variable_value_labels=meta.variable_value_labels
+    )
+
+
+def touch(file_path: str):
+    """Move the mtime of the file forward without changing its contents."""
+    stat = os.stat(file_path)
+    os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_unchanged_file_is_not_reloaded(copy_reader):
+    assert copy_reader.check_for_changes() is False
+    assert copy_reader.check_for_changes() is False
+
+
+def test_touched_file_is_not_reloaded(copy_reader):
+    # The first check records the SHA-256 of the loaded file
+    assert copy_reader.check_for_changes() is False
+    touch(copy_reader.file_path)
+
+    # Once for the stat to settle, once to compare the contents
+    assert copy_reader.check_for_changes() is False
+    assert copy_reader.check_for_changes() is False
+
+
+def test_changed_file_is_reloaded_once_stable(copy_reader):
+    before = total(copy_reader)
+    replace_with_rows(copy_reader.file_path, 100)
+
+    assert copy_reader.check_for_changes() is False
+    assert total(copy_reader) == before
+    assert copy_reader.check_for_changes() is True
+    assert total(copy_reader) == 100
+    assert copy_reader.check_for_changes() is False
+
+
+def test_reload_swaps_in_the_new_file(copy_reader):
+    replace_with_rows(copy_reader.file_path, 100)
+
+    copy_reader.reload()
+
+    assert total(copy_reader) == 100
+
+
+def test_unreadable_file_keeps_current_data(copy_reader):
+    before = total(copy_reader)
+    with open(copy_reader.file_path, "r+b") as sav_file:
+        sav_file.truncate(1000)
+
+    assert copy_reader.check_for_changes() is False
+    with pytest.raises(SAVReaderError):
+        copy_reader.check_for_changes()
+    # Not retried until the file changes again
+    assert copy_reader.check_for_changes() is False
+    with pytest.raises(SAVReaderError):
+        copy_reader.reload()
+    assert total(copy_reader) == before
+
+
+def test_reload_if_changed_skips_same_contents(copy_reader):
+    assert copy_reader.reload(if_changed=True) is False
+    # Records the SHA-256 of the loaded file
+    assert copy_reader.check_for_changes() is False
+    touch(copy_reader.file_path)
+    assert copy_reader.reload(if_changed=True) is False
+
+    replace_with_rows(copy_reader.file_path, 100)
+    assert copy_reader.reload(if_changed=True) is True
+    assert total(copy_reader) == 100
+    assert copy_reader.reload(if_changed=True) is False
+
+
+def test_recargar_rejects_a_second_reload():
+    fastapi_testclient = pytest.importorskip("fastapi.testclient")
+    import main
+
+    client = fastapi_testclient.TestClient(main.app)
+    assert main.reload_lock.acquire(blocking=False)
+    try:
+        assert client.post("/recargar").status_code == 409
+    finally:
+        main.reload_lock.release()
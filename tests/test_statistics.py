@@ -0,0 +1,105 @@
+"""Descriptive statistics against pandas."""
+
+import numpy as np
+import pytest
+
+from services.sav_reader import InvalidVariableError, SAVReader, SAVReaderError
+from tests.conftest import DATA_FILE_PATH
+from tests.reference import filter_mask
+
+
+QUESTIONS = ["Q_75", "Q_1", "T_Q_25_1", "Q_4"]
+
+FILTERS = [
+    {},
+    {"sexo": 2},
+    {"municipio": 3, "nse": 2},
+    {"edad": {"min": 30, "max": 45}},
+    {"expresion": {"variable": "Q_1", "valores": [4, 5]}},
+]
+
+STATISTICS = ["media", "mediana", "moda", "min", "max", "rango", "desviacion_std"]
+
+
+@pytest.fixture(scope="module", params=["cubo", "columnas", "streaming"])
+def mode(request):
+    return request.param
+
+
+@pytest.fixture(scope="module")
+def mode_reader(mode, reader, tmp_path_factory):
+    """The shared reader, a reader loading columns on demand or one in streaming mode."""
+    if mode == "cubo":
+        return reader
+    if mode == "columnas":
+        return SAVReader(DATA_FILE_PATH, column_budget_bytes=10_000_000)
+    return SAVReader(
+        DATA_FILE_PATH, cache_dir=str(tmp_path_factory.mktemp("aggregates")), streaming=True
+    )
+
+
+def reference(frame, question, filtros, weighted):
+    """Statistics of the filtered answers computed with pandas."""
+    rows = frame.loc[filter_mask(frame, filtros) & frame[question].notna().to_numpy()]
+    answers = rows[question]
+    if not weighted:
+        return {
+            "total_respuestas": len(answers),
+            "media": answers.mean(),
+            "mediana": answers.median(),
+            "moda": answers.mode().iloc[0],
+            "min": answers.min(),
+            "max": answers.max(),
+            "rango": answers.max() - answers.min(),
+            "desviacion_std": answers.std(),
+        }
+
+    totals = rows.groupby(question)["FACTOR"].sum()
+    values, weights = totals.index.to_numpy(), totals.to_numpy()
+    total = weights.sum()
+    mean = np.average(values, weights=weights)
+    cumulative = np.cumsum(weights)
+    middle = np.searchsorted(cumulative, total / 2)
+    median = values[middle]
+    if np.isclose(cumulative[middle], total / 2):
+        median = (values[middle] + values[middle + 1]) / 2
+    return {
+        "total_respuestas": total,
+        "media": mean,
+        "mediana": median,
+        "moda": values[np.argmax(weights)],
+        "min": values[0],
+        "max": values[-1],
+        "rango": values[-1] - values[0],
+        "desviacion_std": np.sqrt((weights * (values - mean) ** 2).sum() / (total - 1)),
+    }
+
+
+@pytest.mark.parametrize("ponderado", [False, True])
+@pytest.mark.parametrize("filtros", FILTERS)
+@pytest.mark.parametrize("question", QUESTIONS)
+def test_statistics_match_pandas(mode, mode_reader, frame, question, filtros, ponderado):
+    if mode == "streaming" and "expresion" in filtros:
+        # Streaming mode keeps no rows to evaluate expressions on
+        with pytest.raises(SAVReaderError):
+            mode_reader.get_statistics(question, filtros=filtros, ponderado=ponderado)
+        return
+
+    estadisticas = mode_reader.get_statistics(question, filtros=filtros, ponderado=ponderado)
+    expected = reference(frame, question, filtros, ponderado)
+
+    assert estadisticas["total_respuestas"] == pytest.approx(expected["total_respuestas"], abs=0.01)
+    for name in STATISTICS:
+        assert estadisticas[name] == pytest.approx(expected[name], abs=1e-4), name
+
+
+def test_empty_selection_has_no_statistics(reader):
+    estadisticas = reader.get_statistics("Q_75", filtros={"municipio": 99})
+
+    assert estadisticas["total_respuestas"] == 0
+    assert all(estadisticas[name] is None for name in STATISTICS)
+
+
+def test_text_questions_are_rejected(reader):
+    with pytest.raises(InvalidVariableError):
+        reader.get_statistics("T_Q_92_1")
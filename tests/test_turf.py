@@ -0,0 +1,100 @@
+"""TURF searches against brute force over pandas rows."""
+
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+from services import turf
+from services.indexes import as_words
+from services.sav_reader import InvalidVariableError
+from tests.reference import filter_mask
+
+
+TOP = 5
+
+
+def option_rows(frame, base_id, filtros):
+    """Rows of the filtered respondents selecting every option, and their weights."""
+    rows = frame.loc[filter_mask(frame, filtros)]
+    answers = rows[[column for column in frame.columns if column.startswith(f"{base_id}_O")]].to_numpy()
+    values = np.unique(answers[~np.isnan(answers)])
+    selected = {value: (answers == value).any(axis=1) for value in values}
+    return selected, rows["FACTOR"].to_numpy()
+
+
+def brute_force(selected, weights, k):
+    """(reach, frequency) of the TOP best combinations of k options."""
+    ranked = []
+    for combination in itertools.combinations(selected, k):
+        reached = np.logical_or.reduce([selected[value] for value in combination])
+        frequency = sum(weights[selected[value]].sum() for value in combination)
+        ranked.append((weights[reached].sum(), frequency))
+    ranked.sort(key=lambda pair: (-round(pair[0], 6), -round(pair[1], 6)))
+    return ranked[:TOP]
+
+
+@pytest.mark.parametrize("ponderado", [False, True])
+@pytest.mark.parametrize("filtros", [{}, {"sexo": 2}, {"municipio": 3, "nse": 2}])
+@pytest.mark.parametrize("k", [1, 2, 3])
+@pytest.mark.parametrize("base_id", ["Q_34", "Q_67"])
+def test_turf_matches_brute_force(reader, frame, base_id, k, filtros, ponderado):
+    result = reader.get_multi_response_turf(base_id, k, top=TOP, filtros=filtros, ponderado=ponderado)
+
+    selected, weights = option_rows(frame, base_id, filtros)
+    if not ponderado:
+        weights = np.ones(len(weights))
+    excluded = {option["valor"] for option in result["excluidas"]}
+    candidates = {value: rows for value, rows in selected.items() if value not in excluded}
+
+    assert result["metodo"] == "exhaustiva"
+    got = [(combination["alcance"], combination["frecuencia"]) for combination in result["combinaciones"]]
+    assert np.allclose(got, brute_force(candidates, weights, k), atol=0.01)
+    for combination in result["combinaciones"]:
+        values = [option["valor"] for option in combination["opciones"]]
+        assert not excluded.intersection(values)
+        reached = np.logical_or.reduce([selected[value] for value in values])
+        assert combination["alcance"] == pytest.approx(weights[reached].sum(), abs=0.01)
+
+
+def test_turf_excludes_non_substantive_and_requested_options(reader):
+    result = reader.get_multi_response_turf("Q_34", 2, excluir=[1])
+
+    excluded = {option["valor"]: option["etiqueta"] for option in result["excluidas"]}
+    assert 1 in excluded
+    assert any(label.startswith("No sabe") for label in excluded.values())
+    for combination in result["combinaciones"]:
+        assert not excluded.keys() & {option["valor"] for option in combination["opciones"]}
+
+
+@pytest.mark.parametrize("arguments", [
+    {"k": 0},
+    {"k": 30},
+    {"k": 2, "top": 0},
+    {"k": 2, "excluir": [999]},
+])
+def test_turf_rejects_invalid_arguments(reader, arguments):
+    with pytest.raises(InvalidVariableError):
+        reader.get_multi_response_turf("Q_34", **arguments)
+
+
+def test_parallel_search_matches_serial(monkeypatch):
+    rng = np.random.default_rng(7)
+    n_rows, n_options = 500, 12
+    rows = rng.random((n_options, n_rows)) < rng.uniform(0.05, 0.4, (n_options, 1))
+    bitsets = as_words(np.packbits(rows, axis=1))
+    selections = rows.sum(axis=1)
+
+    serial = turf.search(bitsets, selections, n_rows, 4, TOP)
+    monkeypatch.setattr(turf, "PARALLEL_MIN_COMBINATIONS", 1)
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        parallel = turf.search(bitsets, selections, n_rows, 4, TOP, executor=executor)
+
+    assert np.array_equal(serial.reach, parallel.reach)
+    assert np.array_equal(serial.combinations, parallel.combinations)
+    expected = sorted(
+        (-(rows[list(combination)].any(axis=0).sum()), -selections[list(combination)].sum())
+        for combination in itertools.combinations(range(n_options), 4)
+    )[:TOP]
+    assert [(-reach, -frequency) for reach, frequency in expected] == list(zip(serial.reach, serial.frequency))